@@ -1,35 +1,28 @@
 import streamlit as st
-from src.config import APP_MODE, CLIENT_MENU, ADMIN_MENU
-from src.ui.layout import render_sidebar
-
-from src.ui.pages.lista_do_dia import page_lista_fixa
-from src.ui.pages.campanha_pontual import page_campanha_pontual
-
-# páginas extras (opcionais, só para ADMIN)
-try:
-    from src.ui.pages.crm import page_crm
-except Exception:
-    page_crm = None
-
-try:
-    from src.ui.pages.admin import page_admin
-except Exception:
-    page_admin = None
+from src.config import APP_MODE, WRITE_BEHIND
+from src.services.tracing import rerun
+from src.ui.paginas import carregar_pagina, importar
 
 st.set_page_config(page_title="Flow Food", layout="wide")
 
-PAGES = {
-    "Lista Fixa": page_lista_fixa,
-    "Campanha Pontual": page_campanha_pontual,
-}
-
-if APP_MODE == "ADMIN":
-    if page_crm: PAGES["CRM"] = page_crm
-    if page_admin: PAGES["Admin"] = page_admin
-
-menu_list = CLIENT_MENU if APP_MODE == "CLIENT" else ADMIN_MENU
-
-
-selected = render_sidebar(menu_list)
-
-PAGES[selected]()
+# write-behind: sobe o worker (e reenvia o que ficou pendente no journal)
+if WRITE_BEHIND:
+    from src.services.fila_escrita import iniciar_worker
+    iniciar_worker(st)
+
+# menu: CLIENT_MENU/ADMIN_MENU ou o MENU da loja escolhida (src/services/lojas.py)
+selected = importar("src.ui.layout").render_sidebar()
+
+# cada rerun vira um registro de spans (painel Admin > Rastreamento)
+# a página (e o que ela importa) só carrega quando é aberta
+with rerun(selected):
+    try:
+        page = carregar_pagina(selected, APP_MODE)
+    except KeyError:
+        st.error(f"Página '{selected}' não existe.")
+        st.stop()
+    except Exception as e:
+        # página opcional quebrada não derruba o app
+        st.error(f"Não foi possível carregar a página '{selected}': {type(e).__name__}: {e}")
+        st.stop()
+    page()
@@ -0,0 +1,135 @@
+# benchmarks/dados_sinteticos.py
+"""
+Gera as abas do Sheets (CRM_GERAL, CONFIGURACAO, LOG_ENVIO, CONTROLE_APP,
+LISTA_PONTUAL) como list[list[str]], no mesmo formato do get_all_values().
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import numpy as np
+
+
+STATUS = [
+    "PROSPECT",
+    "ATIVO",
+    "ATIVO_VIP",
+    "ESFRIANDO",
+    "ESFRIANDO_VIP",
+    "INATIVO",
+    "INATIVO_VIP",
+    "SUMIDO",
+    "SUMIDO_VIP",
+]
+
+CRM_HEADER = [
+    "WHATSAPP",
+    "NOME",
+    "STATUS",
+    "PRIORIDADE",
+    "ELEGIVEL",
+    "PROXIMO CONTATO PERMITIDO",
+    "TOTAL DE PEDIDOS",
+    "DIAS DE INATIVIDADE",
+    "ULTIMO CONTATO",
+    "CAMPANHA DO DIA",
+    # colunas auxiliares/fórmulas que a geração de lista não usa
+    "AUX TICKET MEDIO",
+    "AUX BAIRRO",
+    "AUX OBS",
+]
+
+LOG_HEADER = ["DATA ENVIO", "WHATSAPP", "STATUS DO DIA", "CAMPANHA"]
+
+
+def _datas(rng: np.random.Generator, n: int, hoje: date) -> np.ndarray:
+    # 40% vazio, 45% ISO, 15% BR; espalhadas em hoje ± 30 dias
+    offsets = rng.integers(-30, 31, size=n)
+    base = np.datetime64(hoje.isoformat()) + offsets.astype("timedelta64[D]")
+    iso = base.astype(str).astype(object)
+
+    br = np.array(
+        [f"{d[8:10]}/{d[5:7]}/{d[0:4]}" for d in iso],
+        dtype=object,
+    ) if n else iso
+
+    sorteio = rng.random(n)
+    out = np.where(sorteio < 0.40, "", np.where(sorteio < 0.85, iso, br))
+    return out.astype(object)
+
+
+def gerar_crm(n: int, seed: int = 42, hoje: date | None = None) -> list[list[str]]:
+    rng = np.random.default_rng(seed)
+    hoje = hoje or date.today()
+
+    wpp = (85_900_000_000 + np.arange(n)).astype(str).astype(object)
+    invalidos = rng.random(n) < 0.01
+    wpp[invalidos] = "859999"  # curto demais: cai na validação
+
+    cols = [
+        wpp,
+        np.char.add("Cliente ", np.arange(n).astype(str)).astype(object),
+        np.array(STATUS, dtype=object)[rng.integers(0, len(STATUS), size=n)],
+        rng.integers(1, 6, size=n).astype(str).astype(object),
+        np.where(rng.random(n) < 0.85, "SIM", "NAO").astype(object),
+        _datas(rng, n, hoje),
+        rng.integers(0, 51, size=n).astype(str).astype(object),
+        rng.integers(0, 366, size=n).astype(str).astype(object),
+        np.full(n, "", dtype=object),
+        np.full(n, "", dtype=object),
+        rng.integers(20, 200, size=n).astype(str).astype(object),
+        np.array(["Centro", "Aldeota", "Meireles", "Benfica"], dtype=object)[rng.integers(0, 4, size=n)],
+        np.full(n, "", dtype=object),
+    ]
+
+    rows = [list(r) for r in zip(*[c.tolist() for c in cols])]
+    return [list(CRM_HEADER)] + rows
+
+
+def gerar_configuracao(qtd_por_status: int = 10) -> list[list[str]]:
+    header = ["STATUS", "QTD POR DIA", "CAMPANHA", "MENSAGEM"]
+    rows = [
+        [s, str(qtd_por_status), f"FIXA_{s}", f"Oi! Saudade de você por aqui ({s}) 🥟"]
+        for s in STATUS
+    ]
+    return [header] + rows
+
+
+def gerar_log(n: int, seed: int = 7, hoje: date | None = None) -> list[list[str]]:
+    rng = np.random.default_rng(seed)
+    hoje = hoje or date.today()
+    rows = []
+    for i in range(n):
+        d = hoje - timedelta(days=int(rng.integers(0, 365)))
+        rows.append([
+            d.isoformat(),
+            str(85_900_000_000 + int(rng.integers(0, max(n, 1)))),
+            STATUS[int(rng.integers(0, len(STATUS)))],
+            f"CAMP_{int(rng.integers(0, 12))}",
+        ])
+    return [list(LOG_HEADER)] + rows
+
+
+def gerar_controle() -> list[list[str]]:
+    return [
+        ["CHAVE", "VALOR"],
+        ["LISTA_FIXA_LAST_DATE", ""],
+        ["LISTA_PONTUAL_LAST_DATE", ""],
+    ]
+
+
+def gerar_lista_pontual(crm: list[list[str]], n: int = 37) -> list[list[str]]:
+    header = ["WHATSAPP", "NOME", "STATUS", "CAMPANHA", "ENVIADO?"]
+    rows = [[r[0], r[1], r[2], "PONTUAL", "FALSE"] for r in crm[1:n + 1]]
+    return [header] + rows
+
+
+def gerar_planilha(n_crm: int, seed: int = 42) -> dict[str, list[list[str]]]:
+    crm = gerar_crm(n_crm, seed=seed)
+    return {
+        "CRM_GERAL": crm,
+        "CONFIGURACAO": gerar_configuracao(),
+        "LOG_ENVIO": gerar_log(max(10, n_crm // 100)),
+        "CONTROLE_APP": gerar_controle(),
+        "LISTA_PONTUAL": gerar_lista_pontual(crm),
+    }
@@ -0,0 +1,303 @@
+# benchmarks/fake_gspread.py
+"""
+Fake em memória da parte da API do gspread que o app usa
+(Client.open_by_key, Spreadsheet, Worksheet), com latência e 429 configuráveis.
+Conta as chamadas por método para o relatório dos benchmarks.
+"""
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from gspread.exceptions import APIError, WorksheetNotFound
+
+
+# ==========================
+# 429 fake
+# ==========================
+class _Resposta429:
+    status_code = 429
+    text = "Quota exceeded for quota metric 'Read requests'"
+
+    def __init__(self, retry_after: float | None = None):
+        self.headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+
+    def json(self):
+        return {
+            "error": {
+                "code": 429,
+                "message": self.text,
+                "status": "RESOURCE_EXHAUSTED",
+            }
+        }
+
+
+class Backend:
+    """
+    Estado compartilhado do fake: latência, taxa de 429 e contadores.
+    """
+
+    def __init__(self, latencia_s: float = 0.0, taxa_429: float = 0.0, retry_after: float | None = None, seed: int = 0):
+        self.latencia_s = latencia_s
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.chamadas: Counter = Counter()
+        self.erros_429 = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.revisao = 0
+
+    def chamada(self, nome: str, escrita: bool = False) -> None:
+        with self._lock:
+            self.chamadas[nome] += 1
+            dispara_429 = self.taxa_429 > 0 and self._rng.random() < self.taxa_429
+            if dispara_429:
+                self.erros_429 += 1
+            elif escrita:
+                self.revisao += 1
+        if self.latencia_s:
+            time.sleep(self.latencia_s)
+        if dispara_429:
+            raise APIError(_Resposta429(self.retry_after))
+
+    def zerar(self) -> None:
+        with self._lock:
+            self.chamadas.clear()
+            self.erros_429 = 0
+
+
+# ==========================
+# A1
+# ==========================
+_RE_A1 = re.compile(r"^([A-Z]*)(\d*)$")
+
+
+def _col_num(letras: str) -> int:
+    n = 0
+    for c in letras:
+        n = n * 26 + (ord(c) - 64)
+    return n
+
+
+def _parse_a1(a1: str) -> tuple[str | None, int, int, int | None, int | None]:
+    """
+    'ABA'!A1:B2 -> (aba, linha0, col0, linha1, col1) 1-based, fim None = aberto.
+    """
+    aba = None
+    if "!" in a1:
+        aba, a1 = a1.rsplit("!", 1)
+        aba = aba.strip("'")
+    elif a1.startswith("'"):
+        return a1.strip("'"), 1, 1, None, None  # 'ABA' = aba inteira
+    ini, _, fim = a1.partition(":")
+    fim = fim or ini
+
+    c0, r0 = _RE_A1.match(ini.upper()).groups()
+    c1, r1 = _RE_A1.match(fim.upper()).groups()
+    return (
+        aba,
+        int(r0) if r0 else 1,
+        _col_num(c0) if c0 else 1,
+        int(r1) if r1 else None,
+        _col_num(c1) if c1 else None,
+    )
+
+
+def _valor_celula(cell: dict) -> str:
+    v = (cell or {}).get("userEnteredValue") or {}
+    if "stringValue" in v:
+        return str(v["stringValue"])
+    if "numberValue" in v:
+        num = v["numberValue"]
+        fmt = ((cell.get("userEnteredFormat") or {}).get("numberFormat") or {}).get("type")
+        if fmt == "DATE":
+            return (date(1899, 12, 30) + timedelta(days=int(num))).isoformat()
+        return str(int(num)) if float(num).is_integer() else str(num)
+    return ""
+
+
+# ==========================
+# Worksheet / Spreadsheet / Client
+# ==========================
+class FakeWorksheet:
+    def __init__(self, backend: Backend, spreadsheet, sheet_id: int, title: str, values: list[list[str]]):
+        self._backend = backend
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self._values = values
+
+    # --- helpers internos (sem contar chamada) ---
+    def _largura(self) -> int:
+        return max((len(r) for r in self._values), default=0)
+
+    def _garantir(self, linha: int, col: int) -> None:
+        while len(self._values) < linha:
+            self._values.append([])
+        row = self._values[linha - 1]
+        if len(row) < col:
+            row.extend([""] * (col - len(row)))
+
+    def _set(self, linha: int, col: int, valor) -> None:
+        self._garantir(linha, col)
+        self._values[linha - 1][col - 1] = "" if valor is None else str(valor)
+
+    def _recorte(self, r0: int, c0: int, r1: int | None, c1: int | None) -> list[list[str]]:
+        r1 = len(self._values) if r1 is None else min(r1, len(self._values))
+        c1 = self._largura() if c1 is None else c1
+        out = []
+        for row in self._values[r0 - 1:r1]:
+            out.append(list(row[c0 - 1:c1]))
+        # API do Sheets corta linhas/colunas vazias no fim
+        while out and not any(out[-1]):
+            out.pop()
+        for row in out:
+            while row and row[-1] == "":
+                row.pop()
+        return out
+
+    # --- API gspread ---
+    def get_all_values(self, **kwargs):
+        self._backend.chamada("get_all_values")
+        w = self._largura()
+        return [list(r) + [""] * (w - len(r)) for r in self._values]
+
+    def get_all_records(self, **kwargs):
+        self._backend.chamada("get_all_records")
+        if not self._values:
+            return []
+        header = self._values[0]
+        return [dict(zip(header, list(r) + [""] * (len(header) - len(r)))) for r in self._values[1:]]
+
+    def row_values(self, row: int, **kwargs):
+        self._backend.chamada("row_values")
+        return self._recorte(row, 1, row, None)[0] if len(self._values) >= row else []
+
+    def col_values(self, col: int, **kwargs):
+        self._backend.chamada("col_values")
+        return [r[col - 1] if len(r) >= col else "" for r in self._values]
+
+    def get(self, range_name: str, **kwargs):
+        self._backend.chamada("get")
+        _, r0, c0, r1, c1 = _parse_a1(range_name)
+        return self._recorte(r0, c0, r1, c1)
+
+    def batch_update(self, data: list[dict], **kwargs):
+        self._backend.chamada("ws.batch_update", escrita=True)
+        for item in data:
+            _, r0, c0, _, _ = _parse_a1(item["range"])
+            for i, row in enumerate(item["values"]):
+                for j, v in enumerate(row):
+                    self._set(r0 + i, c0 + j, v)
+
+    def update_cells(self, cells, **kwargs):
+        self._backend.chamada("update_cells", escrita=True)
+        for c in cells:
+            self._set(c.row, c.col, c.value)
+
+    def update_cell(self, row: int, col: int, value, **kwargs):
+        self._backend.chamada("update_cell", escrita=True)
+        self._set(row, col, value)
+
+    def append_rows(self, rows, **kwargs):
+        self._backend.chamada("append_rows", escrita=True)
+        self._values.extend([["" if v is None else str(v) for v in r] for r in rows])
+
+    def append_row(self, row, **kwargs):
+        self._backend.chamada("append_row", escrita=True)
+        self._values.append(["" if v is None else str(v) for v in row])
+
+
+class FakeSpreadsheet:
+    def __init__(self, backend: Backend, spreadsheet_id: str, abas: dict[str, list[list[str]]]):
+        self._backend = backend
+        self.id = spreadsheet_id
+        self._abas = {
+            nome: FakeWorksheet(backend, self, i, nome, values)
+            for i, (nome, values) in enumerate(abas.items())
+        }
+
+    def worksheet(self, title: str):
+        self._backend.chamada("worksheet")
+        if title not in self._abas:
+            raise WorksheetNotFound(title)
+        return self._abas[title]
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26, **kwargs):
+        self._backend.chamada("add_worksheet", escrita=True)
+        ws = FakeWorksheet(self._backend, self, len(self._abas), title, [])
+        self._abas[title] = ws
+        return ws
+
+    def get_lastUpdateTime(self) -> str:
+        self._backend.chamada("get_lastUpdateTime")
+        return f"rev-{self._backend.revisao}"
+
+    def values_batch_get(self, ranges, params=None):
+        self._backend.chamada("values_batch_get")
+        out = []
+        for a1 in ranges:
+            aba, r0, c0, r1, c1 = _parse_a1(a1)
+            out.append({"range": a1, "values": self._abas[aba]._recorte(r0, c0, r1, c1)})
+        return {"spreadsheetId": self.id, "valueRanges": out}
+
+    def values_batch_update(self, body: dict):
+        self._backend.chamada("values_batch_update", escrita=True)
+        for item in body.get("data", []):
+            aba, r0, c0, _, _ = _parse_a1(item["range"])
+            ws = self._abas[aba]
+            for i, row in enumerate(item.get("values", [])):
+                for j, v in enumerate(row):
+                    if v is not None:
+                        ws._set(r0 + i, c0 + j, v)
+        return {"spreadsheetId": self.id}
+
+    def values_append(self, range: str, params=None, body=None):
+        self._backend.chamada("values_append", escrita=True)
+        aba, *_ = _parse_a1(range)
+        ws = self._abas[aba]
+        for row in (body or {}).get("values", []):
+            ws._values.append(["" if v is None else str(v) for v in row])
+        return {"spreadsheetId": self.id}
+
+    def batch_update(self, body: dict):
+        self._backend.chamada("batch_update", escrita=True)
+        por_id = {ws.id: ws for ws in self._abas.values()}
+        for req in body.get("requests", []):
+            if "updateCells" in req:
+                r = req["updateCells"]
+                g = r["range"]
+                ws = por_id[g["sheetId"]]
+                for i, row in enumerate(r.get("rows", [])):
+                    for j, cell in enumerate(row.get("values", [])):
+                        ws._set(g["startRowIndex"] + 1 + i, g["startColumnIndex"] + 1 + j, _valor_celula(cell))
+            elif "appendCells" in req:
+                r = req["appendCells"]
+                ws = por_id[r["sheetId"]]
+                for row in r.get("rows", []):
+                    ws._values.append([_valor_celula(c) for c in row.get("values", [])])
+            elif "deleteDimension" in req:
+                g = req["deleteDimension"]["range"]
+                ws = por_id[g["sheetId"]]
+                if g.get("dimension", "ROWS") == "ROWS":
+                    del ws._values[g["startIndex"]:g["endIndex"]]
+        return {"spreadsheetId": self.id, "replies": []}
+
+
+class FakeClient:
+    def __init__(self, backend: Backend):
+        self._backend = backend
+        self._planilhas: dict[str, FakeSpreadsheet] = {}
+
+    def adicionar_planilha(self, spreadsheet_id: str, abas: dict[str, list[list[str]]]) -> FakeSpreadsheet:
+        sh = FakeSpreadsheet(self._backend, spreadsheet_id, abas)
+        self._planilhas[spreadsheet_id] = sh
+        return sh
+
+    def open_by_key(self, key: str):
+        self._backend.chamada("open_by_key")
+        return self._planilhas[key]
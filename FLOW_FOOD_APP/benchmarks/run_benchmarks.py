@@ -0,0 +1,247 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmarks offline dos serviços (sem rede).
+
+Uso (de dentro de FLOW_FOOD_APP):
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --tamanhos 1000 100000 --latencia 0.05 --taxa-429 0.02
+    python -m benchmarks.run_benchmarks --salvar base.json
+    python -m benchmarks.run_benchmarks --comparar base.json --tolerancia 0.25
+
+Para cada operação reporta tempo de parede, pico de memória (tracemalloc)
+e chamadas à API (por método). Com --comparar, sai com código 1 se alguma
+operação ficou mais lenta que a tolerância ou passou a fazer mais chamadas.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+SPREADSHEET_ID = "bench-sheet"
+CONTA = "bench@flowfood.fake"
+
+
+def _fake_st():
+    def _stop():
+        raise RuntimeError("st.stop() chamado no benchmark")
+
+    return SimpleNamespace(
+        secrets={
+            "gcp_service_account": {"client_email": CONTA},
+            "SPREADSHEET_ID": SPREADSHEET_ID,
+        },
+        error=print,
+        info=print,
+        warning=print,
+        stop=_stop,
+    )
+
+
+def _medir(nome: str, linhas: int, fn, backend, com_memoria: bool) -> dict:
+    backend.zerar()
+    gc.collect()
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    chamadas = dict(backend.chamadas)
+    erros_429 = backend.erros_429
+
+    pico_mb = None
+    if com_memoria:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        pico_mb = round(pico / 1024 / 1024, 2)
+
+    return {
+        "operacao": nome,
+        "linhas": linhas,
+        "wall_s": round(wall, 4),
+        "pico_mb": pico_mb,
+        "chamadas_api": sum(chamadas.values()),
+        "por_metodo": chamadas,
+        "erros_429": erros_429,
+    }
+
+
+def rodar(tamanhos, latencia: float, taxa_429: float, quota_real: bool, com_memoria: bool) -> list[dict]:
+    # imports aqui: FLOWFOOD_CACHE_DIR precisa estar setado antes do src.config
+    import pandas as pd
+
+    from benchmarks.dados_sinteticos import gerar_planilha
+    from benchmarks.fake_gspread import Backend, FakeClient
+    from src import mock_backend
+    from src.services import quota
+    from src.services.indice_elegiveis import IndiceElegiveis, indice_elegiveis
+    from src.services.limites_geracao import reservar_geracao_hoje
+    from src.services.pontual_backend import (
+        atualizar_crm_por_lista_real,
+        gerar_lista_pontual_por_status_real,
+    )
+    from src.services.sheets import gerar_lista_fixa
+    from src.services.sheets_pool import registrar_cliente
+    from src.services.snapshot import ler_aba
+
+    if not quota_real:
+        # sem cota local: mede o código, não o limitador
+        quota.limitador = quota.LimitadorQuota(
+            leituras_por_minuto=10**9,
+            escritas_por_minuto=10**9,
+            backoff_base=0.01,
+            backoff_max=0.1,
+        )
+
+    st = _fake_st()
+    resultados = []
+
+    for n in tamanhos:
+        print(f"\n== CRM com {n:,} linhas ==", file=sys.stderr)
+        backend = Backend(latencia_s=latencia, taxa_429=taxa_429)
+        client = FakeClient(backend)
+        sid = f"{SPREADSHEET_ID}-{n}"  # snapshot/caches separados por tamanho
+        client.adicionar_planilha(sid, gerar_planilha(n))
+        registrar_cliente(CONTA, client)
+
+        ops = [
+            ("snapshot_frio", lambda: ler_aba(st, sid, "CRM_GERAL", forcar=True)),
+            ("snapshot_quente", lambda: ler_aba(st, sid, "CRM_GERAL")),
+        ]
+        for nome, fn in ops:
+            resultados.append(_medir(nome, n, fn, backend, com_memoria))
+
+        df_crm = ler_aba(st, sid, "CRM_GERAL")
+        df_cfg = ler_aba(st, sid, "CONFIGURACAO")
+
+        resultados.append(_medir(
+            "gerar_lista_fixa", n,
+            lambda: gerar_lista_fixa(df_crm, df_cfg),
+            backend, com_memoria,
+        ))
+        resultados.append(_medir(
+            "indice_montar", n,
+            lambda: IndiceElegiveis(df_crm),
+            backend, com_memoria,
+        ))
+        indice = indice_elegiveis(st, sid)
+        resultados.append(_medir(
+            "gerar_lista_fixa_indice", n,
+            lambda: gerar_lista_fixa(indice.df, df_cfg, indice=indice),
+            backend, com_memoria,
+        ))
+        resultados.append(_medir(
+            "pontual_por_status", n,
+            lambda: gerar_lista_pontual_por_status_real(st, sid, "ATIVO", total=37),
+            backend, com_memoria,
+        ))
+
+        for qtd in (37, 500):
+            amostra = df_crm.head(qtd)
+            lista = pd.DataFrame({
+                "whatsapp": amostra["WHATSAPP"],
+                "nome": amostra["NOME"],
+                "status": amostra["STATUS"],
+                "campanha": "BENCH",
+                "enviado": True,
+            })
+            resultados.append(_medir(
+                f"atualizar_crm_{qtd}", n,
+                lambda lista=lista: atualizar_crm_por_lista_real(st, sid, lista),
+                backend, com_memoria,
+            ))
+
+        resultados.append(_medir(
+            "limites_reservar", n,
+            lambda: reservar_geracao_hoje(st, sid, "LISTA_FIXA_LAST_DATE", True),
+            backend, com_memoria,
+        ))
+
+        # motor em memória (mock_backend) sobre os mesmos dados
+        mock = mock_backend.state_from_abas(gerar_planilha(n))
+        lista_mock = pd.DataFrame({
+            "whatsapp": df_crm["WHATSAPP"].head(500),
+            "status": df_crm["STATUS"].head(500),
+            "campanha": "BENCH",
+            "enviado": True,
+        })
+        resultados.append(_medir(
+            "mock_atualizar_crm_500", n,
+            lambda: mock_backend.atualizar_crm_por_lista(mock, lista_mock),
+            backend, com_memoria,
+        ))
+
+    return resultados
+
+
+def _imprimir(resultados: list[dict]) -> None:
+    print(f"{'operacao':<22}{'linhas':>10}{'wall_s':>10}{'pico_mb':>10}{'api':>6}{'429':>6}")
+    for r in resultados:
+        pico = "-" if r["pico_mb"] is None else f"{r['pico_mb']:.1f}"
+        print(
+            f"{r['operacao']:<22}{r['linhas']:>10}{r['wall_s']:>10.3f}"
+            f"{pico:>10}{r['chamadas_api']:>6}{r['erros_429']:>6}"
+        )
+
+
+def _comparar(resultados: list[dict], baseline: list[dict], tolerancia: float) -> list[str]:
+    base = {(b["operacao"], b["linhas"]): b for b in baseline}
+    regressoes = []
+    for r in resultados:
+        b = base.get((r["operacao"], r["linhas"]))
+        if b is None:
+            continue
+        if r["wall_s"] > b["wall_s"] * (1 + tolerancia) and r["wall_s"] - b["wall_s"] > 0.01:
+            regressoes.append(f"{r['operacao']}@{r['linhas']}: {b['wall_s']}s -> {r['wall_s']}s")
+        if r["chamadas_api"] > b["chamadas_api"]:
+            regressoes.append(f"{r['operacao']}@{r['linhas']}: {b['chamadas_api']} -> {r['chamadas_api']} chamadas")
+    return regressoes
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Benchmarks offline do Flow Food")
+    p.add_argument("--tamanhos", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    p.add_argument("--latencia", type=float, default=0.0, help="segundos por chamada à API fake")
+    p.add_argument("--taxa-429", type=float, default=0.0, help="probabilidade de 429 por chamada")
+    p.add_argument("--quota-real", action="store_true", help="usa o limitador com a cota real do config")
+    p.add_argument("--sem-memoria", action="store_true", help="não mede pico de memória (roda cada op 1x)")
+    p.add_argument("--salvar", help="grava os resultados em JSON")
+    p.add_argument("--comparar", help="JSON de baseline para detectar regressão")
+    p.add_argument("--tolerancia", type=float, default=0.25)
+    args = p.parse_args(argv)
+
+    os.environ.setdefault("FLOWFOOD_CACHE_DIR", tempfile.mkdtemp(prefix="flowfood-bench-"))
+
+    resultados = rodar(
+        args.tamanhos,
+        latencia=args.latencia,
+        taxa_429=args.taxa_429,
+        quota_real=args.quota_real,
+        com_memoria=not args.sem_memoria,
+    )
+    _imprimir(resultados)
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = _comparar(resultados, json.load(f), args.tolerancia)
+        if regressoes:
+            print("\nREGRESSÕES:", *regressoes, sep="\n  ")
+            return 1
+        print("\nSem regressões.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
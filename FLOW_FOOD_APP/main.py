@@ -1 +1,94 @@
-print("Projeto Flow Food iniciado")
+"""
+Entrada headless do Flow Food (sem Streamlit rodando).
+
+Uso (de dentro de FLOW_FOOD_APP, mesma pasta do app: usa o mesmo
+.streamlit/secrets.toml e o mesmo cache local):
+    python main.py pre-gerar                  # todas as lojas
+    python main.py pre-gerar --lojas centro   # só algumas
+    python main.py pre-gerar --sem-pontual    # só a Lista Fixa
+    python main.py compactar-log              # LOG_ENVIO velho -> arquivo local
+    python main.py compactar-log --janela-dias 30
+
+Exemplo de cron (06:00, antes de abrir):
+    0 6 * * * cd /caminho/FLOW_FOOD_APP && python main.py pre-gerar
+    0 3 * * 0 cd /caminho/FLOW_FOOD_APP && python main.py compactar-log
+"""
+import argparse
+import sys
+
+
+def _lojas(st, ids):
+    from src.services.lojas import carregar_lojas
+
+    lojas = carregar_lojas(st)
+    if ids:
+        faltando = [loja_id for loja_id in ids if loja_id not in lojas]
+        if faltando:
+            print(f"Lojas não encontradas: {', '.join(faltando)}", file=sys.stderr)
+            return None
+        lojas = {k: v for k, v in lojas.items() if k in ids}
+    return lojas
+
+
+def _relatorio(res: dict) -> int:
+    falhas = 0
+    for loja_id, r in res.items():
+        if isinstance(r, Exception):
+            falhas += 1
+            print(f"[{loja_id}] ERRO: {type(r).__name__}: {r}", file=sys.stderr)
+        else:
+            resumo = ", ".join(f"{k}={v}" for k, v in r.items())
+            print(f"[{loja_id}] ok: {resumo}")
+    return 1 if falhas else 0
+
+
+def _pre_gerar(args) -> int:
+    import streamlit as st
+
+    from src.services.listas_prontas import pre_gerar
+
+    lojas = _lojas(st, args.lojas)
+    if lojas is None:
+        return 2
+    return _relatorio(pre_gerar(st, lojas.values(), com_pontual=not args.sem_pontual))
+
+
+def _compactar_log(args) -> int:
+    import streamlit as st
+
+    from src.services.arquivo_log import compactar_logs
+
+    lojas = _lojas(st, args.lojas)
+    if lojas is None:
+        return 2
+    return _relatorio(compactar_logs(st, lojas.values(), janela_dias=args.janela_dias))
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Flow Food (headless)")
+    sub = p.add_subparsers(dest="comando")
+
+    pg = sub.add_parser("pre-gerar", help="pré-gera as listas do dia no cache local")
+    pg.add_argument("--lojas", nargs="+", help="ids das lojas (padrão: todas)")
+    pg.add_argument("--sem-pontual", action="store_true", help="não pré-gera as listas pontuais por STATUS")
+
+    cl = sub.add_parser("compactar-log", help="move o LOG_ENVIO antigo para o arquivo local")
+    cl.add_argument("--lojas", nargs="+", help="ids das lojas (padrão: todas)")
+    cl.add_argument("--janela-dias", type=int, default=None, help="dias mantidos na planilha (padrão: LOG_JANELA_DIAS)")
+
+    args = p.parse_args(argv)
+
+    if args.comando == "pre-gerar":
+        return _pre_gerar(args)
+    if args.comando == "compactar-log":
+        if args.janela_dias is None:
+            from src.config import LOG_JANELA_DIAS
+            args.janela_dias = LOG_JANELA_DIAS
+        return _compactar_log(args)
+
+    print("Projeto Flow Food iniciado")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
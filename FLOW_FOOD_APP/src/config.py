@@ -1,5 +1,73 @@
 # src/config.py
+import os
+
 APP_MODE = "CLIENT"  # "CLIENT" ou "ADMIN"
 
 CLIENT_MENU = ["Lista Fixa", "Campanha Pontual"]
-ADMIN_MENU = ["Lista Fixa", "Campanha Pontual", "CRM", "Admin"]
+ADMIN_MENU = ["Lista Fixa", "Campanha Pontual", "Painel", "CRM", "Admin"]
+
+# STATUS do CRM (Campanha Pontual "POR STATUS" e pré-geração)
+STATUS_LISTA = [
+    "PROSPECT",
+    "ATIVO",
+    "ATIVO_VIP",
+    "ESFRIANDO",
+    "ESFRIANDO_VIP",
+    "INATIVO",
+    "INATIVO_VIP",
+    "SUMIDO",
+    "SUMIDO_VIP",
+]
+
+# Cache local (snapshot das abas do Sheets)
+CACHE_DIR = os.environ.get("FLOWFOOD_CACHE_DIR", ".flowfood_cache")
+SNAPSHOT_CHECK_SECONDS = 60  # intervalo mínimo entre checagens de revisão
+
+# Write-behind: "Atualizar CRM" só grava no journal local e um worker
+# em background descarrega no CRM_GERAL/LOG_ENVIO em lotes
+WRITE_BEHIND = False
+WRITE_BEHIND_FLUSH_SECONDS = 5
+WRITE_BEHIND_MAX_LOTE = 500
+WRITE_BEHIND_MAX_TENTATIVAS = 5  # erro permanente: depois disso o lote vai para envios_falhos
+
+# Cota da API do Sheets (por usuário/conta de serviço, por minuto)
+SHEETS_LEITURAS_POR_MINUTO = 60
+SHEETS_ESCRITAS_POR_MINUTO = 60
+SHEETS_MAX_TENTATIVAS = 6
+
+# Rastreamento (painel Admin + export JSON lines)
+TRACE_MAX_RERUNS = 50
+TRACE_JSONL_PATH = os.environ.get("FLOWFOOD_TRACE_JSONL", "")  # vazio = não grava em arquivo
+
+# Editores de lista (Lista Fixa / Campanha Pontual): linhas por página
+LISTA_TAMANHO_PAGINA = 50
+LISTA_TAMANHOS_PAGINA = [25, 50, 100, 200]
+
+# Multi-loja (registro em st.secrets["LOJAS"], ver src/services/lojas.py)
+LOJAS_MAX_WORKERS = 4  # lojas processadas em paralelo (a cota do Sheets é a mesma)
+
+# Projeção das leituras: só estas colunas são baixadas de cada aba
+# (achadas pelo nome no cabeçalho). Aba fora daqui = aba inteira.
+COLUNAS_LEITURA = {
+    "CRM_GERAL": [
+        "WHATSAPP",
+        "NOME",
+        "STATUS",
+        "ELEGIVEL",
+        "PRIORIDADE",
+        "TOTAL DE PEDIDOS",
+        "DIAS DE INATIVIDADE",
+        "PROXIMO CONTATO PERMITIDO",
+        "ULTIMO CONTATO",
+        "CAMPANHA DO DIA",
+    ],
+    "LISTA_PONTUAL": ["WHATSAPP", "NOME", "STATUS", "CAMPANHA", "ENVIADO?"],
+}
+
+# Compactação do LOG_ENVIO (python main.py compactar-log): linhas mais
+# velhas que isso vão para o arquivo local (src/services/arquivo_log.py)
+LOG_JANELA_DIAS = 90
+
+# Painel (agregados incrementais em src/services/agregados.py)
+PAINEL_ATUALIZAR_SECONDS = 60  # intervalo mínimo entre leituras do LOG_ENVIO
+REATIVACAO_JANELA_DIAS = 30  # pedido até N dias depois do contato conta como reativação
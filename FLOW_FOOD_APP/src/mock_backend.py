@@ -1,29 +1,129 @@
 # src/mock_backend.py
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import date
+import numpy as np
 import pandas as pd
 
+from src.services.pontual_backend import (
+    ABA_CRM,
+    ABA_LOG,
+    COL_CAMPANHA_DIA,
+    COL_ULTIMO_CONTATO,
+    COL_WPP,
+    LOG_COL_CAMPANHA,
+    LOG_COL_DATA,
+    LOG_COL_STATUS,
+    LOG_COL_WPP,
+    selecionar_por_status,
+)
+from src.services.snapshot import values_to_df
+from src.services.telefones import digitos_series, normalizar_series
+
+
+LOG_COLUNAS = [LOG_COL_DATA, LOG_COL_WPP, LOG_COL_STATUS, LOG_COL_CAMPANHA]
+
+
+class LogBuffer:
+    """
+    LOG_ENVIO append-only em blocos: cada append só guarda o bloco novo;
+    o DataFrame completo é montado (e compactado num bloco só) quando alguém lê.
+    """
+
+    def __init__(self, colunas: list[str]):
+        self.colunas = list(colunas)
+        self._blocos: list[pd.DataFrame] = []
+        self._linhas = 0
+
+    def append(self, bloco: pd.DataFrame) -> None:
+        if len(bloco):
+            self._blocos.append(bloco[self.colunas].reset_index(drop=True))
+            self._linhas += len(bloco)
+
+    def __len__(self) -> int:
+        return self._linhas
+
+    def to_frame(self) -> pd.DataFrame:
+        if not self._blocos:
+            return pd.DataFrame(columns=self.colunas)
+        if len(self._blocos) > 1:
+            self._blocos = [pd.concat(self._blocos, ignore_index=True)]
+        return self._blocos[0]
+
 
 @dataclass
 class MockState:
+    """
+    CRM em memória no mesmo formato das abas do Sheets (colunas com os
+    nomes da planilha: WHATSAPP, ULTIMO CONTATO, CAMPANHA DO DIA...),
+    indexado pelo whatsapp canônico (55 + DDD + número, telefones.py)
+    para aplicar envios em lote.
+    log_envio é só leitura (o LOG inteiro num DataFrame); para anexar,
+    state.log.append(bloco).
+    """
     crm_geral: pd.DataFrame
-    log_envio: pd.DataFrame
-
-
-def init_state() -> MockState:
-    crm = pd.DataFrame(
+    log: LogBuffer = field(default_factory=lambda: LogBuffer(LOG_COLUNAS))
+    abas: dict[str, pd.DataFrame] = field(default_factory=dict)
+    controle: dict[str, str] = field(default_factory=dict)
+    _indice: pd.Series | None = field(default=None, repr=False)
+
+    @property
+    def log_envio(self) -> pd.DataFrame:
+        return self.log.to_frame()
+
+    def indice(self) -> pd.Series:
+        """whatsapp canônico -> posição no crm_geral (duplicado: vale a última)."""
+        if self._indice is None:
+            wpps = normalizar_series(self.crm_geral[COL_WPP]).to_numpy()
+            idx = pd.Series(np.arange(len(wpps)), index=wpps)
+            idx = idx[idx.index != ""]
+            self._indice = idx[~idx.index.duplicated(keep="last")]
+        return self._indice
+
+
+def _crm_exemplo() -> pd.DataFrame:
+    base = {
+        "PRIORIDADE": "1",
+        "ELEGIVEL": "SIM",
+        "PROXIMO CONTATO PERMITIDO": "",
+        "TOTAL DE PEDIDOS": "0",
+        "DIAS DE INATIVIDADE": "0",
+        COL_ULTIMO_CONTATO: "",
+        COL_CAMPANHA_DIA: "",
+    }
+    return pd.DataFrame(
         [
-            {"whatsapp": "85999990001", "nome": "Cliente A", "status": "7-15", "ultimo_contato": "", "campanha_do_dia": ""},
-            {"whatsapp": "85999990002", "nome": "Cliente B", "status": "16-30", "ultimo_contato": "", "campanha_do_dia": ""},
-            {"whatsapp": "85999990003", "nome": "Cliente C", "status": "31-60", "ultimo_contato": "", "campanha_do_dia": ""},
-            {"whatsapp": "85999990004", "nome": "Cliente D", "status": "61-90", "ultimo_contato": "", "campanha_do_dia": ""},
+            {COL_WPP: "85999990001", "NOME": "Cliente A", "STATUS": "7-15", **base},
+            {COL_WPP: "85999990002", "NOME": "Cliente B", "STATUS": "16-30", **base},
+            {COL_WPP: "85999990003", "NOME": "Cliente C", "STATUS": "31-60", **base},
+            {COL_WPP: "85999990004", "NOME": "Cliente D", "STATUS": "61-90", **base},
         ]
     )
 
-    log = pd.DataFrame(columns=["data", "whatsapp", "status", "campanha"])
-    return MockState(crm_geral=crm, log_envio=log)
+
+def init_state() -> MockState:
+    return MockState(crm_geral=_crm_exemplo())
+
+
+def state_from_abas(abas: dict[str, list[list]]) -> MockState:
+    """
+    Monta o estado a partir de abas no formato get_all_values()
+    (ex.: benchmarks.dados_sinteticos.gerar_planilha).
+    """
+    dfs = {nome: values_to_df(values) for nome, values in abas.items()}
+    state = MockState(crm_geral=dfs.pop(ABA_CRM))
+
+    log = dfs.pop(ABA_LOG, None)
+    if log is not None and not log.empty:
+        state.log.append(log.reindex(columns=LOG_COLUNAS, fill_value=""))
+
+    controle = dfs.pop("CONTROLE_APP", None)
+    if controle is not None and not controle.empty:
+        state.controle = dict(zip(controle.iloc[:, 0].astype(str), controle.iloc[:, 1].astype(str)))
+
+    state.abas = dfs
+    return state
 
 
 def ensure_session_state(st) -> None:
@@ -31,49 +131,93 @@ def ensure_session_state(st) -> None:
         st.session_state["mock_state"] = init_state()
 
 
+# ==========================
+# MESMAS OPERAÇÕES DOS SERVIÇOS DO SHEETS
+# ==========================
+def ler_aba(state: MockState, aba: str) -> pd.DataFrame:
+    if aba == ABA_CRM:
+        return state.crm_geral
+    if aba == ABA_LOG:
+        return state.log_envio
+    return state.abas.get(aba, pd.DataFrame())
+
+
+def gerar_lista_fixa(state: MockState) -> pd.DataFrame:
+    # mesmo motor do Sheets (sheets.gerar_lista_fixa) sobre o CRM em memória
+    from src.services.sheets import gerar_lista_fixa as _gerar
+
+    return _gerar(state.crm_geral, state.abas.get("CONFIGURACAO", pd.DataFrame(columns=["STATUS", "QTD POR DIA"])))
+
+
+def gerar_lista_pontual_por_status(state: MockState, status_escolhido: str, total: int = 37, campanha: str = "") -> pd.DataFrame:
+    return selecionar_por_status(state.crm_geral, status_escolhido, total=total, campanha=campanha)
+
+
+def reservar_geracao_hoje(state: MockState, chave: str, is_admin: bool) -> tuple[bool, str]:
+    hoje = date.today().isoformat()
+    anterior = state.controle.get(chave, "")
+    if not is_admin and anterior == hoje:
+        return False, anterior
+    state.controle[chave] = hoje
+    return True, anterior
+
+
+def _lista_padrao(state: MockState, campanha: str) -> pd.DataFrame:
+    crm = state.crm_geral
+    return pd.DataFrame({
+        "whatsapp": crm[COL_WPP],
+        "nome": crm.get("NOME"),
+        "status": crm.get("STATUS"),
+        "campanha": campanha,
+        "enviado": False,
+    })
+
+
 def gerar_lista_fixa_mock(state: MockState) -> pd.DataFrame:
     # Emula "gerar lista fixa": pega alguns do CRM e monta uma lista
-    lista = state.crm_geral.copy()
-    lista["campanha"] = "FIXA"
-    lista["enviado"] = False
-    return lista[["whatsapp", "nome", "status", "campanha", "enviado"]].head(2)
+    return _lista_padrao(state, "FIXA").head(2)
 
 
 def gerar_lista_pontual_mock(state: MockState, campanha: str) -> pd.DataFrame:
-    lista = state.crm_geral.copy()
-    lista["campanha"] = campanha
-    lista["enviado"] = False
-    return lista[["whatsapp", "nome", "status", "campanha", "enviado"]].head(2)
+    return _lista_padrao(state, campanha).head(2)
 
 
 def atualizar_crm_por_lista(state: MockState, lista_df: pd.DataFrame) -> dict:
-    # Emula "atualizarCRM_*": só pega enviados=True
-    enviados = lista_df[lista_df["enviado"] == True].copy()
+    """
+    Emula atualizar_crm_por_lista_real: só pega enviados=True, atualiza
+    ULTIMO CONTATO / CAMPANHA DO DIA em lote (via índice) e anexa no LOG.
+    """
+    enviados = lista_df[lista_df["enviado"] == True]
     if enviados.empty:
         return {"updated": 0, "log_added": 0}
 
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    hoje = date.today().isoformat()
+    vazio = pd.Series("", index=enviados.index)
 
-    # Atualiza CRM_GERAL
-    for _, row in enviados.iterrows():
-        wpp = str(row["whatsapp"])
-        campanha = str(row.get("campanha", ""))
+    campanha = enviados.get("campanha", vazio).fillna("").astype(str).str.strip().to_numpy()
+    status = enviados.get("status", vazio).fillna("").astype(str).str.strip().to_numpy()
 
-        state.crm_geral.loc[state.crm_geral["whatsapp"] == wpp, "ultimo_contato"] = now
-        state.crm_geral.loc[state.crm_geral["whatsapp"] == wpp, "campanha_do_dia"] = campanha
+    # CRM_GERAL: join pelo índice + escrita vetorizada (mesma linha 2x: vale a última)
+    pos = pd.Series(normalizar_series(enviados["whatsapp"]).to_numpy()).map(state.indice())
+    achou = pos.notna().to_numpy()
 
-    # LOG_ENVIO
-    new_logs = pd.DataFrame(
-        [
-            {
-                "data": now,
-                "whatsapp": str(r["whatsapp"]),
-                "status": str(r.get("status", "")),
-                "campanha": str(r.get("campanha", "")),
-            }
-            for _, r in enviados.iterrows()
-        ]
-    )
-    state.log_envio = pd.concat([state.log_envio, new_logs], ignore_index=True)
+    # LOG com os dígitos do WHATSAPP do CRM (igual ao real)
+    wpp = digitos_series(enviados["whatsapp"]).to_numpy(dtype=object)
+    wpp[achou] = digitos_series(state.crm_geral[COL_WPP]).to_numpy()[pos[achou].astype(int).to_numpy()]
+    plano = pd.DataFrame({"pos": pos[achou].astype(int).to_numpy(), "campanha": campanha[achou]})
+    plano = plano.drop_duplicates("pos", keep="last")
+
+    crm = state.crm_geral
+    linhas = plano["pos"].to_numpy()
+    crm.iloc[linhas, crm.columns.get_loc(COL_ULTIMO_CONTATO)] = hoje
+    crm.iloc[linhas, crm.columns.get_loc(COL_CAMPANHA_DIA)] = plano["campanha"].to_numpy()
+
+    # LOG_ENVIO (append em bloco)
+    state.log.append(pd.DataFrame({
+        LOG_COL_DATA: hoje,
+        LOG_COL_WPP: wpp,
+        LOG_COL_STATUS: status,
+        LOG_COL_CAMPANHA: campanha,
+    }))
 
-    return {"updated": len(enviados), "log_added": len(enviados)}
+    return {"updated": int(achou.sum()), "log_added": len(enviados)}
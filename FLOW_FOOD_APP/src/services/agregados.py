@@ -0,0 +1,339 @@
+# src/services/agregados.py
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from src.config import CACHE_DIR, PAINEL_ATUALIZAR_SECONDS, REATIVACAO_JANELA_DIAS
+from src.services.pontual_backend import (
+    ABA_LOG,
+    LOG_COL_CAMPANHA,
+    LOG_COL_DATA,
+    LOG_COL_STATUS,
+    LOG_COL_WPP,
+)
+from src.services.quota import com_quota
+from src.services.sheets_pool import get_worksheet
+from src.services.snapshot import _letra, baixar_aba, ler_aba, versao_aba
+from src.services.telefones import chave_series, normalizar_series
+from src.services.tipos import _parse_dates_series
+from src.services.tracing import rastrear
+
+
+# ==========================
+# AGREGADOS DO PAINEL (materializados, incrementais)
+# ==========================
+# SQLite em CACHE_DIR com, por planilha:
+#   agregado_dia  (dia, status, campanha) -> envios, contatos, reativados
+#   contatos      1 por (whatsapp, dia, campanha); reativado_em quando o
+#                 cliente fez pedido depois do contato
+#   pedidos       TOTAL DE PEDIDOS por whatsapp na última versão do CRM vista
+#   marcas        marca d'água do LOG_ENVIO: última linha processada
+#                 (+ a própria linha, para conferir que a planilha não mudou
+#                 por baixo) e o cabeçalho
+#
+# LOG_ENVIO: lê só da marca em diante ('LOG_ENVIO'!A<marca>:<última col>).
+# Se a linha da marca não bate (linhas apagadas/inseridas por fora), baixa
+# a aba e reencontra a marca; sem achar, segue pelas linhas com data
+# posterior à última processada.
+#
+# CRM_GERAL: a cada versão nova do snapshot, quem teve TOTAL DE PEDIDOS
+# aumentado marca como reativados os contatos dos últimos
+# REATIVACAO_JANELA_DIAS (uma vez por contato).
+#
+# O Painel só lê agregado_dia: custo fixo, não importa o tamanho do log.
+
+_DB_NOME = "agregados.sqlite"
+
+_lock = threading.Lock()
+_crm_visto: dict[str, int] = {}  # spreadsheet_id -> versao_aba do CRM já processada
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    con = sqlite3.connect(os.path.join(CACHE_DIR, _DB_NOME), timeout=30)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS agregado_dia ("
+        " spreadsheet_id TEXT NOT NULL, dia TEXT NOT NULL, status TEXT NOT NULL,"
+        " campanha TEXT NOT NULL, envios INTEGER DEFAULT 0, contatos INTEGER DEFAULT 0,"
+        " reativados INTEGER DEFAULT 0,"
+        " PRIMARY KEY (spreadsheet_id, dia, status, campanha))"
+    )
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS contatos ("
+        " spreadsheet_id TEXT NOT NULL, whatsapp TEXT NOT NULL, dia TEXT NOT NULL,"
+        " campanha TEXT NOT NULL, status TEXT NOT NULL, reativado_em TEXT,"
+        " PRIMARY KEY (spreadsheet_id, whatsapp, dia, campanha))"
+    )
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS pedidos ("
+        " spreadsheet_id TEXT NOT NULL, whatsapp TEXT NOT NULL, total REAL,"
+        " PRIMARY KEY (spreadsheet_id, whatsapp))"
+    )
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS marcas ("
+        " spreadsheet_id TEXT PRIMARY KEY, linha INTEGER, assinatura TEXT,"
+        " cabecalho TEXT, ultimo_dia TEXT, checado_em REAL)"
+    )
+    return con
+
+
+# ==========================
+# LOG_ENVIO (da marca em diante)
+# ==========================
+def _assinatura(row: list) -> str:
+    return json.dumps([str(v) for v in row])
+
+
+def _completar(row: list, largura: int) -> list:
+    return list(row) + [""] * (largura - len(row))
+
+
+def _novas_linhas(st, spreadsheet_id: str, marca) -> tuple[list, list, int, str]:
+    """
+    Retorna (cabeçalho, linhas novas, número da 1ª linha nova na planilha,
+    assinatura da linha logo antes dela).
+    """
+    if marca is not None:
+        linha, assinatura, cabecalho_json, ultimo_dia = marca
+        cabecalho = json.loads(cabecalho_json or "[]")
+        if cabecalho:
+            ws = get_worksheet(st, spreadsheet_id, ABA_LOG)
+            faixa = f"A{linha}:{_letra(len(cabecalho) - 1)}"
+            valores = com_quota(lambda: ws.get(faixa), nome=f"get:{ABA_LOG}!{faixa}")
+            valores = [_completar(r, len(cabecalho)) for r in valores]
+            if valores and _assinatura(valores[0]) == assinatura:
+                return cabecalho, valores[1:], linha + 1, assinatura
+
+    # sem marca ou a marca não bate: aba inteira
+    valores = baixar_aba(st, spreadsheet_id, ABA_LOG)
+    if not valores:
+        return [], [], 2, _assinatura([])
+    cabecalho = [str(h).strip() for h in valores[0]]
+    if marca is None:
+        return cabecalho, valores[1:], 2, _assinatura(valores[0])
+
+    for i in range(len(valores) - 1, -1, -1):
+        if _assinatura(valores[i]) == marca[1]:
+            return cabecalho, valores[i + 1:], i + 2, marca[1]
+
+    # marca sumiu da planilha: segue pelo que tem data depois da última vista
+    pos = list(range(1, len(valores)))
+    if marca[3] and LOG_COL_DATA in cabecalho:
+        i_data = cabecalho.index(LOG_COL_DATA)
+        datas = _parse_dates_series(pd.Series([valores[i][i_data] for i in pos], dtype=object))
+        pos = [i for i, d in zip(pos, (datas > pd.Timestamp(marca[3])).to_numpy()) if d]
+    # a marca fica na última linha de antes das novas
+    inicio = pos[0] if pos else len(valores)
+    return cabecalho, [valores[i] for i in pos], inicio + 1, _assinatura(valores[inicio - 1])
+
+
+def _aplicar_log(con, spreadsheet_id: str, cabecalho: list, rows: list) -> str | None:
+    # incrementa envios/contatos; devolve o último dia processado
+    faltam = [c for c in [LOG_COL_DATA, LOG_COL_WPP, LOG_COL_STATUS, LOG_COL_CAMPANHA] if c not in cabecalho]
+    if faltam:
+        raise ValueError(f"LOG_ENVIO: coluna '{faltam[0]}' não encontrada no cabeçalho.")
+    if not rows:
+        return None
+
+    df = pd.DataFrame(rows, columns=cabecalho)
+    datas = _parse_dates_series(df[LOG_COL_DATA])
+    validas = datas.notna().to_numpy()
+    if not validas.any():
+        return None
+
+    novos = pd.DataFrame({
+        "dia": datas[validas].dt.strftime("%Y-%m-%d").to_numpy(),
+        "whatsapp": chave_series(df.loc[validas, LOG_COL_WPP]).to_numpy(),
+        "status": df.loc[validas, LOG_COL_STATUS].astype(str).str.strip().to_numpy(),
+        "campanha": df.loc[validas, LOG_COL_CAMPANHA].astype(str).str.strip().to_numpy(),
+    })
+
+    # contato novo = 1ª vez do (whatsapp, dia, campanha)
+    contatos_novos: dict[tuple, int] = {}
+    for r in novos.drop_duplicates(["whatsapp", "dia", "campanha"]).itertuples(index=False):
+        cur = con.execute(
+            "INSERT OR IGNORE INTO contatos (spreadsheet_id, whatsapp, dia, campanha, status)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (spreadsheet_id, r.whatsapp, r.dia, r.campanha, r.status),
+        )
+        if cur.rowcount:
+            k = (r.dia, r.status, r.campanha)
+            contatos_novos[k] = contatos_novos.get(k, 0) + 1
+
+    envios = novos.groupby(["dia", "status", "campanha"], sort=False).size()
+    con.executemany(
+        "INSERT INTO agregado_dia (spreadsheet_id, dia, status, campanha, envios, contatos)"
+        " VALUES (?, ?, ?, ?, ?, ?)"
+        " ON CONFLICT (spreadsheet_id, dia, status, campanha) DO UPDATE SET"
+        " envios = envios + excluded.envios, contatos = contatos + excluded.contatos",
+        [
+            (spreadsheet_id, dia, status, campanha, int(n), contatos_novos.get((dia, status, campanha), 0))
+            for (dia, status, campanha), n in envios.items()
+        ],
+    )
+    return str(novos["dia"].max())
+
+
+# ==========================
+# CRM_GERAL (reativação)
+# ==========================
+def _aplicar_crm(con, spreadsheet_id: str, df_crm: pd.DataFrame, hoje: date) -> int:
+    if "WHATSAPP" not in df_crm.columns or "TOTAL DE PEDIDOS" not in df_crm.columns:
+        return 0
+
+    atual = pd.DataFrame({
+        "whatsapp": normalizar_series(df_crm["WHATSAPP"]).to_numpy(),
+        "total": pd.to_numeric(df_crm["TOTAL DE PEDIDOS"], errors="coerce").fillna(0).to_numpy(dtype=float),
+    })
+    atual = atual[atual["whatsapp"] != ""].drop_duplicates("whatsapp", keep="last")
+
+    antes = pd.read_sql_query(
+        "SELECT whatsapp, total AS total_antes FROM pedidos WHERE spreadsheet_id = ?",
+        con,
+        params=(spreadsheet_id,),
+    )
+    m = atual.merge(antes, on="whatsapp", how="left")
+    mudou = m["total_antes"].isna() | (m["total"] != m["total_antes"])
+    aumentou = m.loc[m["total_antes"].notna() & (m["total"] > m["total_antes"]), "whatsapp"]
+
+    con.executemany(
+        "INSERT OR REPLACE INTO pedidos (spreadsheet_id, whatsapp, total) VALUES (?, ?, ?)",
+        [(spreadsheet_id, w, float(t)) for w, t in m.loc[mudou, ["whatsapp", "total"]].itertuples(index=False)],
+    )
+    if aumentou.empty:
+        return 0
+
+    dia_hoje = hoje.isoformat()
+    desde = (hoje - timedelta(days=REATIVACAO_JANELA_DIAS)).isoformat()
+    reativados: dict[tuple, int] = {}
+    for w in aumentou:
+        abertos = con.execute(
+            "SELECT dia, status, campanha FROM contatos WHERE spreadsheet_id = ? AND whatsapp = ?"
+            " AND reativado_em IS NULL AND dia BETWEEN ? AND ?",
+            (spreadsheet_id, w, desde, dia_hoje),
+        ).fetchall()
+        if not abertos:
+            continue
+        con.execute(
+            "UPDATE contatos SET reativado_em = ? WHERE spreadsheet_id = ? AND whatsapp = ?"
+            " AND reativado_em IS NULL AND dia BETWEEN ? AND ?",
+            (dia_hoje, spreadsheet_id, w, desde, dia_hoje),
+        )
+        for k in abertos:
+            reativados[k] = reativados.get(k, 0) + 1
+
+    con.executemany(
+        "UPDATE agregado_dia SET reativados = reativados + ?"
+        " WHERE spreadsheet_id = ? AND dia = ? AND status = ? AND campanha = ?",
+        [(n, spreadsheet_id, *k) for k, n in reativados.items()],
+    )
+    return sum(reativados.values())
+
+
+# ==========================
+# API
+# ==========================
+@rastrear()
+def atualizar_agregados(st, spreadsheet_id: str, forcar: bool = False) -> dict:
+    """
+    Aplica o que entrou no LOG_ENVIO desde a marca e, se o snapshot do
+    CRM mudou, as reativações. No máximo 1x a cada PAINEL_ATUALIZAR_SECONDS
+    (forcar=True ignora). Retorna {"linhas_log", "reativados"}.
+    """
+    with _lock:
+        con = _connect()
+        try:
+            marca = con.execute(
+                "SELECT linha, assinatura, cabecalho, ultimo_dia, checado_em FROM marcas"
+                " WHERE spreadsheet_id = ?",
+                (spreadsheet_id,),
+            ).fetchone()
+            if marca and not forcar and time.time() - (marca[4] or 0) < PAINEL_ATUALIZAR_SECONDS:
+                return {"linhas_log": 0, "reativados": 0}
+
+            cabecalho, rows, primeira, anterior = _novas_linhas(
+                st, spreadsheet_id, marca[:4] if marca else None
+            )
+            rows = [_completar(r, len(cabecalho)) for r in rows]
+            ultimo_dia = _aplicar_log(con, spreadsheet_id, cabecalho, rows) if cabecalho else None
+
+            # marca = última linha processada
+            if rows:
+                linha, assinatura = primeira + len(rows) - 1, _assinatura(rows[-1])
+            else:
+                linha, assinatura = primeira - 1, anterior
+            con.execute(
+                "INSERT OR REPLACE INTO marcas"
+                " (spreadsheet_id, linha, assinatura, cabecalho, ultimo_dia, checado_em)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    spreadsheet_id,
+                    linha,
+                    assinatura,
+                    json.dumps(cabecalho),
+                    ultimo_dia or (marca[3] if marca else None),
+                    time.time(),
+                ),
+            )
+
+            reativados = 0
+            df_crm = ler_aba(st, spreadsheet_id, "CRM_GERAL")
+            versao = versao_aba(spreadsheet_id, "CRM_GERAL")
+            if _crm_visto.get(spreadsheet_id) != versao:
+                reativados = _aplicar_crm(con, spreadsheet_id, df_crm, date.today())
+                _crm_visto[spreadsheet_id] = versao
+
+            con.commit()
+            return {"linhas_log": len(rows), "reativados": reativados}
+        finally:
+            con.close()
+
+
+def recuar_marca(spreadsheet_id: str, linhas_removidas) -> None:
+    """
+    Linhas apagadas do LOG_ENVIO (compactação): a marca desce junto.
+    linhas_removidas: números das linhas na planilha (cabeçalho na 1).
+    """
+    with _lock:
+        con = _connect()
+        try:
+            row = con.execute(
+                "SELECT linha FROM marcas WHERE spreadsheet_id = ?", (spreadsheet_id,)
+            ).fetchone()
+            if row is None:
+                return
+            acima = sum(1 for n in linhas_removidas if n <= row[0])
+            con.execute(
+                "UPDATE marcas SET linha = ? WHERE spreadsheet_id = ?",
+                (max(1, row[0] - acima), spreadsheet_id),
+            )
+            con.commit()
+        finally:
+            con.close()
+
+
+def agregados(spreadsheet_id: str, desde: str | None = None) -> pd.DataFrame:
+    """
+    agregado_dia da planilha (dia >= desde): dia, status, campanha,
+    envios, contatos, reativados.
+    """
+    sql = (
+        "SELECT dia, status, campanha, envios, contatos, reativados FROM agregado_dia"
+        " WHERE spreadsheet_id = ?"
+    )
+    params: tuple = (spreadsheet_id,)
+    if desde:
+        sql += " AND dia >= ?"
+        params += (desde,)
+    con = _connect()
+    try:
+        return pd.read_sql_query(sql + " ORDER BY dia", con, params=params)
+    finally:
+        con.close()
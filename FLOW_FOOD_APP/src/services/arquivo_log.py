@@ -0,0 +1,335 @@
+# src/services/arquivo_log.py
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from gspread.exceptions import WorksheetNotFound
+
+from src.config import CACHE_DIR, LOG_JANELA_DIAS
+from src.services.agregados import atualizar_agregados, recuar_marca
+from src.services.pontual_backend import (
+    ABA_LOG,
+    LOG_COL_CAMPANHA,
+    LOG_COL_DATA,
+    LOG_COL_STATUS,
+    LOG_COL_WPP,
+    _blocos_contiguos,
+)
+from src.services.lojas import para_cada_loja
+from src.services.quota import ESCRITA, com_quota
+from src.services.sheets_pool import get_spreadsheet, get_worksheet
+from src.services.snapshot import baixar_aba, invalidar_snapshot, values_to_df
+from src.services.telefones import chave_series
+from src.services.tipos import ESQUEMA_LOG, _parse_dates_series, compactar
+from src.services.tracing import rastrear
+
+
+# ==========================
+# ARQUIVO LOCAL DO LOG_ENVIO
+# ==========================
+# O LOG_ENVIO só cresce (um append por envio). O job de compactação
+# (python main.py compactar-log) tira da planilha as linhas com DATA ENVIO
+# anterior à janela (LOG_JANELA_DIAS) e guarda no arquivo local:
+#
+#   CACHE_DIR/log_arquivo/<planilha>/AAAA-MM/<campanha>.sqlite
+#     uma partição por mês e campanha (tabela envios, índice por data)
+#
+# Consulta de histórico abre só as partições do intervalo (e só a da
+# campanha, se pedida). Na planilha ficam a janela recente + a aba
+# LOG_RESUMO (envios por dia/status/campanha de tudo que já foi arquivado).
+#
+# Ordem do job: grava o arquivo, depois um batch_update só (atômico no
+# Sheets) com o LOG_RESUMO + a remoção das linhas. Se cair no meio, rodar
+# de novo não duplica: a chave inclui a ocorrência (n) da linha repetida.
+
+ABA_RESUMO = "LOG_RESUMO"
+RESUMO_HEADER = ["DATA", "STATUS", "CAMPANHA", "ENVIOS"]
+
+
+def _pasta(spreadsheet_id: str) -> str:
+    nome = re.sub(r"[^A-Za-z0-9_-]", "_", spreadsheet_id)
+    pasta = os.path.join(CACHE_DIR, "log_arquivo", nome)
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def _arquivo_campanha(campanha: str) -> str:
+    # nome legível + hash curto (campanhas diferentes nunca dividem arquivo)
+    legivel = re.sub(r"[^A-Za-z0-9_-]", "_", campanha)[:40] or "_sem_campanha"
+    return f"{legivel}-{hashlib.md5(campanha.encode()).hexdigest()[:8]}.sqlite"
+
+
+def _caminho(spreadsheet_id: str, mes: str, campanha: str) -> str:
+    pasta = os.path.join(_pasta(spreadsheet_id), mes)
+    os.makedirs(pasta, exist_ok=True)
+    return os.path.join(pasta, _arquivo_campanha(campanha))
+
+
+def _connect(caminho: str) -> sqlite3.Connection:
+    con = sqlite3.connect(caminho, timeout=30)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS envios ("
+        " data TEXT NOT NULL, whatsapp TEXT NOT NULL, status TEXT NOT NULL,"
+        " campanha TEXT NOT NULL, n INTEGER NOT NULL,"
+        " PRIMARY KEY (data, whatsapp, status, campanha, n))"
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS envios_data ON envios (data)")
+    return con
+
+
+def _mes(caminho: str) -> str:
+    return os.path.basename(os.path.dirname(caminho))
+
+
+def _particoes(
+    spreadsheet_id: str,
+    inicio: str | None = None,
+    fim: str | None = None,
+    campanha: str | None = None,
+) -> list[str]:
+    # partições existentes dentro do intervalo (AAAA-MM, comparação de texto)
+    arquivo = "*.sqlite" if campanha is None else _arquivo_campanha(campanha)
+    caminhos = sorted(glob.glob(os.path.join(_pasta(spreadsheet_id), "????-??", arquivo)))
+    if inicio:
+        caminhos = [p for p in caminhos if _mes(p) >= inicio[:7]]
+    if fim:
+        caminhos = [p for p in caminhos if _mes(p) <= fim[:7]]
+    return caminhos
+
+
+def arquivar(spreadsheet_id: str, envios: pd.DataFrame) -> int:
+    """
+    envios: data (ISO), whatsapp, status, campanha. Grava cada (mês, campanha)
+    na sua partição; linha igual a uma já arquivada (mesma ocorrência) é
+    sobrescrita.
+    """
+    if envios.empty:
+        return 0
+
+    envios = envios[["data", "whatsapp", "status", "campanha"]].astype(str)
+    envios = envios.assign(n=envios.groupby(list(envios.columns), sort=False).cumcount())
+
+    for (mes, campanha), parte in envios.groupby([envios["data"].str[:7], envios["campanha"]], sort=True):
+        con = _connect(_caminho(spreadsheet_id, mes, campanha))
+        try:
+            con.executemany(
+                "INSERT OR REPLACE INTO envios (data, whatsapp, status, campanha, n)"
+                " VALUES (?, ?, ?, ?, ?)",
+                parte.itertuples(index=False, name=None),
+            )
+            con.commit()
+        finally:
+            con.close()
+    return len(envios)
+
+
+def ler_historico(
+    spreadsheet_id: str,
+    inicio: str | None = None,
+    fim: str | None = None,
+    campanha: str | None = None,
+    whatsapp: str | None = None,
+) -> pd.DataFrame:
+    """
+    Envios arquivados (mesmas colunas do LOG_ENVIO, tipos compactos).
+    inicio/fim: datas ISO (inclusive). Só abre as partições do intervalo
+    (e da campanha, se pedida).
+    """
+    where, params = [], []
+    if inicio:
+        where.append("data >= ?")
+        params.append(inicio)
+    if fim:
+        where.append("data <= ?")
+        params.append(fim)
+    if campanha is not None:
+        where.append("campanha = ?")
+        params.append(campanha)
+    if whatsapp is not None:
+        where.append("whatsapp = ?")
+        params.append(re.sub(r"\D", "", str(whatsapp)))
+    sql = "SELECT data, whatsapp, status, campanha FROM envios"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+
+    partes = []
+    for caminho in _particoes(spreadsheet_id, inicio, fim, campanha):
+        con = _connect(caminho)
+        try:
+            partes.append(pd.read_sql_query(sql, con, params=params))
+        finally:
+            con.close()
+
+    df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(
+        columns=["data", "whatsapp", "status", "campanha"]
+    )
+    df.columns = [LOG_COL_DATA, LOG_COL_WPP, LOG_COL_STATUS, LOG_COL_CAMPANHA]
+    return compactar(df, ESQUEMA_LOG)
+
+
+def resumo(spreadsheet_id: str) -> pd.DataFrame:
+    """
+    Envios por dia/status/campanha de todo o arquivo (GROUP BY em cada partição).
+    """
+    partes = []
+    for caminho in _particoes(spreadsheet_id):
+        con = _connect(caminho)
+        try:
+            partes.append(pd.read_sql_query(
+                "SELECT data, status, campanha, COUNT(*) AS envios FROM envios"
+                " GROUP BY data, status, campanha",
+                con,
+            ))
+        finally:
+            con.close()
+
+    if not partes:
+        return pd.DataFrame(columns=RESUMO_HEADER)
+    df = pd.concat(partes, ignore_index=True).sort_values(["data", "status", "campanha"])
+    df.columns = RESUMO_HEADER
+    return df.reset_index(drop=True)
+
+
+# ==========================
+# JOB DE COMPACTAÇÃO
+# ==========================
+_DATA_ZERO_SHEETS = date(1899, 12, 30)
+_RE_ISO = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _cell_user_entered(valor) -> dict:
+    """
+    CellData do LOG_RESUMO (aba que o próprio app cria, o formato é nosso):
+    data ISO vira data (yyyy-mm-dd), só dígitos vira número, resto vira
+    texto. Não é o parser do USER_ENTERED: nas abas do usuário (CRM_GERAL,
+    LOG_ENVIO) a escrita vai pela API de valores com USER_ENTERED.
+    """
+    v = "" if valor is None else str(valor)
+    if not v:
+        return {}
+    if _RE_ISO.match(v):
+        serial = (date.fromisoformat(v) - _DATA_ZERO_SHEETS).days
+        return {
+            "userEnteredValue": {"numberValue": serial},
+            "userEnteredFormat": {"numberFormat": {"type": "DATE", "pattern": "yyyy-mm-dd"}},
+        }
+    if v.isdigit():
+        return {"userEnteredValue": {"numberValue": int(v)}}
+    return {"userEnteredValue": {"stringValue": v}}
+
+
+def _aba_resumo(st, spreadsheet_id: str):
+    try:
+        return get_worksheet(st, spreadsheet_id, ABA_RESUMO)
+    except WorksheetNotFound:
+        sh = get_spreadsheet(st, spreadsheet_id)
+        com_quota(
+            lambda: sh.add_worksheet(title=ABA_RESUMO, rows=1000, cols=len(RESUMO_HEADER)),
+            ESCRITA,
+            nome=f"add_worksheet:{ABA_RESUMO}",
+        )
+        return get_worksheet(st, spreadsheet_id, ABA_RESUMO)
+
+
+@rastrear()
+def compactar_log(st, spreadsheet_id: str, janela_dias: int = LOG_JANELA_DIAS) -> dict:
+    """
+    Move para o arquivo local as linhas do LOG_ENVIO mais velhas que a
+    janela e atualiza o LOG_RESUMO. Linha sem data válida fica na planilha.
+    Retorna {"arquivadas", "restantes", "resumo_linhas"}.
+    """
+    # o Painel processa o que ainda não viu antes das linhas saírem da planilha
+    atualizar_agregados(st, spreadsheet_id, forcar=True)
+
+    df = values_to_df(baixar_aba(st, spreadsheet_id, ABA_LOG))
+    for col in [LOG_COL_DATA, LOG_COL_WPP, LOG_COL_STATUS, LOG_COL_CAMPANHA]:
+        if col not in df.columns:
+            raise ValueError(f"LOG_ENVIO: coluna '{col}' não encontrada no cabeçalho.")
+
+    corte = pd.Timestamp(date.today() - timedelta(days=int(janela_dias)))
+    datas = _parse_dates_series(df[LOG_COL_DATA])
+    velhas = (datas < corte).to_numpy()  # NaT -> False: fica na planilha
+
+    if not velhas.any():
+        return {"arquivadas": 0, "restantes": len(df), "resumo_linhas": 0}
+
+    arquivar(spreadsheet_id, pd.DataFrame({
+        "data": datas[velhas].dt.strftime("%Y-%m-%d").to_numpy(),
+        "whatsapp": chave_series(df.loc[velhas, LOG_COL_WPP]).to_numpy(),
+        "status": df.loc[velhas, LOG_COL_STATUS].astype(str).str.strip().to_numpy(),
+        "campanha": df.loc[velhas, LOG_COL_CAMPANHA].astype(str).str.strip().to_numpy(),
+    }))
+
+    # -------------------------
+    # LOG_RESUMO (sobrescreve a partir de A1: o resumo só cresce)
+    # -------------------------
+    df_resumo = resumo(spreadsheet_id)
+    ws_resumo = _aba_resumo(st, spreadsheet_id)
+    linhas_resumo = [RESUMO_HEADER] + df_resumo.astype(str).values.tolist()
+
+    # updateCells não aumenta a grade (o appendCells aumenta): a aba passa a
+    # ter exatamente as linhas do resumo antes de escrever
+    requests = [{
+        "updateSheetProperties": {
+            "properties": {
+                "sheetId": ws_resumo.id,
+                "gridProperties": {"rowCount": len(linhas_resumo), "columnCount": len(RESUMO_HEADER)},
+            },
+            "fields": "gridProperties.rowCount,gridProperties.columnCount",
+        }
+    }, {
+        "updateCells": {
+            "range": {"sheetId": ws_resumo.id, "startRowIndex": 0, "startColumnIndex": 0},
+            "rows": [{"values": [_cell_user_entered(v) for v in row]} for row in linhas_resumo],
+            "fields": "userEnteredValue,userEnteredFormat.numberFormat",
+        }
+    }]
+
+    # -------------------------
+    # LOG_ENVIO: remove as linhas arquivadas (de baixo para cima, para os
+    # índices dos blocos de cima não mudarem)
+    # -------------------------
+    ws_log = get_worksheet(st, spreadsheet_id, ABA_LOG)
+    linhas = np.flatnonzero(velhas) + 1  # 0-based na planilha (cabeçalho = 0)
+    for b in reversed(_blocos_contiguos(linhas)):
+        bloco = linhas[b]
+        requests.append({
+            "deleteDimension": {
+                "range": {
+                    "sheetId": ws_log.id,
+                    "dimension": "ROWS",
+                    "startIndex": int(bloco[0]),
+                    "endIndex": int(bloco[-1]) + 1,
+                }
+            }
+        })
+
+    sh = get_spreadsheet(st, spreadsheet_id)
+    com_quota(lambda: sh.batch_update({"requests": requests}), ESCRITA, nome="batch_update:compactar_log")
+
+    invalidar_snapshot(spreadsheet_id, ABA_LOG)
+    invalidar_snapshot(spreadsheet_id, ABA_RESUMO)
+    recuar_marca(spreadsheet_id, (linhas + 1).tolist())  # 1-based
+
+    arquivadas = int(velhas.sum())
+    return {
+        "arquivadas": arquivadas,
+        "restantes": len(df) - arquivadas,
+        "resumo_linhas": len(df_resumo),
+    }
+
+
+@rastrear()
+def compactar_logs(st, lojas, janela_dias: int = LOG_JANELA_DIAS) -> dict[str, object]:
+    """
+    compactar_log de várias lojas em paralelo.
+    Retorna {loja.id: resumo ou a exceção}.
+    """
+    return para_cada_loja(st, lojas, lambda st, loja: compactar_log(st, loja.spreadsheet_id, janela_dias))
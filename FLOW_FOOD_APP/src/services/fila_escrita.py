@@ -0,0 +1,302 @@
+# src/services/fila_escrita.py
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+
+from src.config import (
+    CACHE_DIR,
+    WRITE_BEHIND_FLUSH_SECONDS,
+    WRITE_BEHIND_MAX_LOTE,
+    WRITE_BEHIND_MAX_TENTATIVAS,
+)
+from src.services.indice_elegiveis import registrar_envios
+from src.services.pontual_backend import gravar_envios
+from src.services.quota import eh_erro_transitorio
+from src.services.telefones import chave_series
+from src.services.tracing import rastrear
+
+
+# ==========================
+# WRITE-BEHIND (journal SQLite em WAL)
+# ==========================
+# "Atualizar CRM" grava cada envio confirmado no journal e volta na hora.
+# Um worker (thread daemon, 1 por processo) descarrega o journal no Sheets
+# em lotes por planilha (um gravar_envios = custo fixo de API por lote).
+#
+# Crash-safe: a linha só sai do journal depois que o batch_update deu certo;
+# ao subir de novo o worker reenvia o que ficou. Se o processo cair entre o
+# batch_update e o DELETE o lote é reenviado (at-least-once: pode duplicar LOG).
+#
+# Erro transitório (cota, 5xx, rede) só adia: o worker tenta de novo mais
+# devagar. Erro permanente (célula protegida, cabeçalho faltando, linha ruim)
+# conta tentativa; passou de WRITE_BEHIND_MAX_TENTATIVAS o lote vai para
+# envios_falhos (dead-letter, visível no Admin) e a fila da loja segue.
+# Uma loja com erro não segura as outras.
+
+_DB_NOME = "fila_escrita.sqlite"
+
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+_acordar = threading.Event()
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    con = sqlite3.connect(os.path.join(CACHE_DIR, _DB_NOME), timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=FULL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS envios_pendentes ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " spreadsheet_id TEXT NOT NULL,"
+        " whatsapp TEXT, status TEXT, campanha TEXT, data TEXT,"
+        " criado_em REAL, tentativas INTEGER DEFAULT 0, erro TEXT)"
+    )
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS envios_falhos ("
+        " id INTEGER PRIMARY KEY,"
+        " spreadsheet_id TEXT NOT NULL,"
+        " whatsapp TEXT, status TEXT, campanha TEXT, data TEXT,"
+        " criado_em REAL, tentativas INTEGER, erro TEXT, falhou_em REAL)"
+    )
+    return con
+
+
+@rastrear()
+def enfileirar_envios(st, spreadsheet_id: str, lista_df: pd.DataFrame) -> dict:
+    """
+    Registra no journal quem está com enviado == True e acorda o worker.
+    Retorna no formato do atualizar_crm_por_lista_real + 'pendentes'.
+    """
+    enviados = lista_df[lista_df["enviado"] == True]
+    if enviados.empty:
+        return {"updated": 0, "log_added": 0, "pendentes": contar_pendentes(spreadsheet_id)}
+
+    hoje = date.today().isoformat()
+    vazio = pd.Series("", index=enviados.index)
+    rows = list(zip(
+        [spreadsheet_id] * len(enviados),
+        chave_series(enviados["whatsapp"]),
+        enviados.get("status", vazio).fillna("").astype(str).str.strip(),
+        enviados.get("campanha", vazio).fillna("").astype(str).str.strip(),
+        [hoje] * len(enviados),
+        [time.time()] * len(enviados),
+    ))
+
+    con = _connect()
+    try:
+        con.executemany(
+            "INSERT INTO envios_pendentes"
+            " (spreadsheet_id, whatsapp, status, campanha, data, criado_em)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        con.commit()
+    finally:
+        con.close()
+
+    # já sai das filas de elegíveis, antes mesmo de chegar no Sheets
+    registrar_envios(spreadsheet_id, [r[1] for r in rows])
+
+    iniciar_worker(st)
+    _acordar.set()
+
+    return {
+        "updated": len(rows),
+        "log_added": len(rows),
+        "pendentes": contar_pendentes(spreadsheet_id),
+    }
+
+
+def contar_pendentes(spreadsheet_id: str | None = None) -> int:
+    con = _connect()
+    try:
+        if spreadsheet_id is None:
+            row = con.execute("SELECT COUNT(*) FROM envios_pendentes").fetchone()
+        else:
+            row = con.execute(
+                "SELECT COUNT(*) FROM envios_pendentes WHERE spreadsheet_id = ?",
+                (spreadsheet_id,),
+            ).fetchone()
+        return int(row[0])
+    finally:
+        con.close()
+
+
+def contar_falhos() -> int:
+    con = _connect()
+    try:
+        return int(con.execute("SELECT COUNT(*) FROM envios_falhos").fetchone()[0])
+    finally:
+        con.close()
+
+
+def ultimo_erro() -> str:
+    con = _connect()
+    try:
+        row = con.execute(
+            "SELECT erro FROM envios_pendentes WHERE erro IS NOT NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else ""
+    finally:
+        con.close()
+
+
+def listar_falhos() -> pd.DataFrame:
+    """
+    Envios que desistimos de gravar (dead-letter), mais recentes primeiro.
+    """
+    con = _connect()
+    try:
+        return pd.read_sql_query(
+            "SELECT id, spreadsheet_id, whatsapp, status, campanha, data, tentativas, erro, falhou_em"
+            " FROM envios_falhos ORDER BY falhou_em DESC, id DESC",
+            con,
+        )
+    finally:
+        con.close()
+
+
+def reenfileirar_falhos(st, ids: list[int] | None = None) -> int:
+    """
+    Devolve envios_falhos para a fila (todos, ou só os ids). Use depois de
+    corrigir a planilha (ex.: cabeçalho, proteção). Retorna quantos voltaram.
+    """
+    con = _connect()
+    try:
+        filtro, params = ("", []) if ids is None else (
+            f" WHERE id IN ({','.join('?' * len(ids))})", [int(i) for i in ids]
+        )
+        cur = con.execute(
+            "INSERT INTO envios_pendentes (spreadsheet_id, whatsapp, status, campanha, data, criado_em)"
+            " SELECT spreadsheet_id, whatsapp, status, campanha, data, criado_em FROM envios_falhos"
+            + filtro + " ORDER BY id",
+            params,
+        )
+        con.execute("DELETE FROM envios_falhos" + filtro, params)
+        con.commit()
+        voltaram = cur.rowcount
+    finally:
+        con.close()
+
+    if voltaram:
+        iniciar_worker(st)
+        _acordar.set()
+    return voltaram
+
+
+def descartar_falhos(ids: list[int] | None = None) -> int:
+    con = _connect()
+    try:
+        if ids is None:
+            cur = con.execute("DELETE FROM envios_falhos")
+        else:
+            cur = con.execute(
+                f"DELETE FROM envios_falhos WHERE id IN ({','.join('?' * len(ids))})",
+                [int(i) for i in ids],
+            )
+        con.commit()
+        return cur.rowcount
+    finally:
+        con.close()
+
+
+def _registrar_falha(con, ids: list[tuple[int]], erro: Exception) -> None:
+    # erro permanente: conta tentativa; estourou o limite -> envios_falhos
+    con.executemany(
+        "UPDATE envios_pendentes SET tentativas = tentativas + 1, erro = ? WHERE id = ?",
+        [(str(erro)[:500], i) for (i,) in ids],
+    )
+    con.execute(
+        "INSERT INTO envios_falhos"
+        " (id, spreadsheet_id, whatsapp, status, campanha, data, criado_em, tentativas, erro, falhou_em)"
+        " SELECT id, spreadsheet_id, whatsapp, status, campanha, data, criado_em, tentativas, erro, ?"
+        " FROM envios_pendentes WHERE tentativas >= ?",
+        (time.time(), WRITE_BEHIND_MAX_TENTATIVAS),
+    )
+    con.execute("DELETE FROM envios_pendentes WHERE tentativas >= ?", (WRITE_BEHIND_MAX_TENTATIVAS,))
+    con.commit()
+
+
+@rastrear()
+def flush(st, max_lote: int = WRITE_BEHIND_MAX_LOTE) -> int:
+    """
+    Descarrega o journal no Sheets (um lote por planilha). Retorna quantos
+    envios foram gravados. Erro de uma planilha fica anotado no journal e
+    não impede as outras; no fim sobe só o primeiro erro transitório.
+    """
+    con = _connect()
+    gravados = 0
+    transitorio = None
+    try:
+        planilhas = [r[0] for r in con.execute("SELECT DISTINCT spreadsheet_id FROM envios_pendentes")]
+        for sid in planilhas:
+            lote = pd.read_sql_query(
+                "SELECT id, whatsapp, status, campanha, data FROM envios_pendentes"
+                " WHERE spreadsheet_id = ? ORDER BY id LIMIT ?",
+                con,
+                params=(sid, max_lote),
+            )
+            if lote.empty:
+                continue
+
+            ids = [(int(i),) for i in lote["id"]]
+            try:
+                gravar_envios(st, sid, lote.drop(columns=["id"]))
+            except Exception as e:
+                if eh_erro_transitorio(e):
+                    # só adia (não conta tentativa): o worker volta mais devagar
+                    con.executemany(
+                        "UPDATE envios_pendentes SET erro = ? WHERE id = ?",
+                        [(str(e)[:500], i) for (i,) in ids],
+                    )
+                    con.commit()
+                    transitorio = transitorio or e
+                else:
+                    _registrar_falha(con, ids, e)
+                continue
+
+            con.executemany("DELETE FROM envios_pendentes WHERE id = ?", ids)
+            con.commit()
+            gravados += len(ids)
+    finally:
+        con.close()
+
+    if transitorio is not None:
+        raise transitorio
+    return gravados
+
+
+def _loop(st) -> None:
+    espera = WRITE_BEHIND_FLUSH_SECONDS
+    while True:
+        _acordar.wait(timeout=espera)
+        _acordar.clear()
+        try:
+            # journal vazio: nem abre o span do flush (a cada poucos segundos)
+            while contar_pendentes() and flush(st) > 0:
+                pass
+            espera = WRITE_BEHIND_FLUSH_SECONDS
+        except Exception:
+            # erro transitório já anotado no journal; tenta de novo mais devagar
+            espera = min(espera * 2, 300)
+
+
+def iniciar_worker(st) -> None:
+    """
+    Sobe o worker do processo (uma vez). Como ele começa lendo o journal,
+    também serve de replay do que ficou pendente num crash.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_loop, args=(st,), name="flowfood-write-behind", daemon=True)
+        _worker.start()
+        _acordar.set()
@@ -0,0 +1,200 @@
+# src/services/indice_crm.py
+from __future__ import annotations
+
+import re
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.services.indice_elegiveis import (
+    COL_ELEGIVEL,
+    COL_STATUS,
+    COL_WPP,
+    IndiceElegiveis,
+    _dia,
+    indice_elegiveis,
+)
+from src.services.telefones import PAIS, normalizar, normalizar_series
+from src.services.tracing import rastrear
+
+
+# ==========================
+# ÍNDICE DE BUSCA DO CRM (página CRM)
+# ==========================
+# Montado uma vez por snapshot do CRM_GERAL, em cima do índice de
+# elegíveis (mesmo DataFrame; reaproveita o cooldown em dias e os
+# bloqueados de hoje). Guarda:
+#   - WHATSAPP canônico, ordenado        -> exato/prefixo por searchsorted
+#   - tokens do NOME sem acento/caixa,
+#     ordenados (token, linha)           -> prefixo por token, E entre tokens
+#   - STATUS (sem caixa, em códigos) e ELEGIVEL=SIM -> máscaras
+#
+# Busca devolve posições na ordem do CRM; a página só manda para o
+# navegador a fatia da página atual.
+
+COL_NOME = "NOME"
+
+_FIM = "\U0010ffff"  # maior caractere: prefixo + _FIM fecha o intervalo
+_RE_TOKEN = r"[A-Z0-9]+"
+
+
+def _dobrar_series(s: pd.Series) -> pd.Series:
+    # sem acento e em maiúsculas ("João" -> "JOAO"); o que não vira ASCII sai
+    return (
+        s.fillna("").astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", "ignore")
+        .str.decode("ascii")
+        .str.upper()
+    )
+
+
+def dobrar(texto: str) -> str:
+    """
+    _dobrar_series para um valor só (busca usa a mesma regra do índice).
+    """
+    return _dobrar_series(pd.Series([texto], dtype=object)).iloc[0]
+
+
+def _intervalo(ordenado: np.ndarray, prefixo: str) -> slice:
+    lo = np.searchsorted(ordenado, prefixo, side="left")
+    hi = np.searchsorted(ordenado, prefixo + _FIM, side="left")
+    return slice(int(lo), int(hi))
+
+
+class IndiceCRM:
+    def __init__(self, base: IndiceElegiveis):
+        self.base = base
+        self.df = df = base.df
+        n = len(df)
+
+        # WHATSAPP ordenado (vazio fica de fora)
+        wpp = (normalizar_series(df[COL_WPP]) if COL_WPP in df.columns else pd.Series("", index=df.index)).to_numpy(dtype=str)
+        pos = np.flatnonzero(wpp != "")
+        ordem = pos[np.argsort(wpp[pos], kind="stable")]
+        self._wpp, self._wpp_pos = wpp[ordem], ordem
+
+        # tokens do NOME: (token, linha) ordenados por token
+        if COL_NOME in df.columns:
+            tokens = _dobrar_series(df[COL_NOME]).reset_index(drop=True).str.findall(_RE_TOKEN).explode().dropna()
+        else:
+            tokens = pd.Series(dtype=object)
+        tok = tokens.to_numpy(dtype=str)
+        tok_pos = tokens.index.to_numpy(dtype=np.intp)
+        ordem = np.argsort(tok, kind="stable")
+        self._tok, self._tok_pos = tok[ordem], tok_pos[ordem]
+
+        status = df[COL_STATUS].astype(str).str.strip().str.upper() if COL_STATUS in df.columns else pd.Series("", index=df.index)
+        # STATUS como códigos inteiros (filtro por np.isin sem comparar strings)
+        cat = pd.Categorical(status.to_numpy(dtype=object))
+        self._status = cat.codes
+        self._status_cod = {s: i for i, s in enumerate(cat.categories)}
+        if COL_ELEGIVEL in df.columns:
+            self._elegivel = df[COL_ELEGIVEL].astype(str).str.upper().str.strip().eq("SIM").to_numpy()
+        else:
+            self._elegivel = np.ones(n, dtype=bool)
+
+    # ---------------------------
+    # CONSULTAS
+    # ---------------------------
+    def por_whatsapp(self, prefixo: str) -> np.ndarray:
+        """
+        Linhas cujo WHATSAPP começa com prefixo (só dígitos; número completo
+        = busca exata). O índice guarda o canônico (55 + DDD + número), então
+        o prefixo vale com ou sem o 55 e o número completo sem o 9 também acha.
+        """
+        digitos = re.sub(r"\D", "", str(prefixo)).lstrip("0")
+        if not digitos:
+            return np.empty(0, dtype=np.intp)
+
+        variantes = {PAIS + digitos}
+        if digitos.startswith(PAIS):
+            variantes.add(digitos)
+        completo = normalizar(digitos)
+        if completo:
+            variantes.add(completo)
+
+        partes = [self._wpp_pos[_intervalo(self._wpp, v)] for v in variantes]
+        return np.unique(np.concatenate(partes))
+
+    def por_nome(self, texto: str) -> np.ndarray:
+        """
+        Cada palavra do texto é prefixo de alguma palavra do NOME (todas
+        precisam bater). Sem acento e sem caixa.
+        """
+        termos = re.findall(_RE_TOKEN, dobrar(texto))
+        if not termos:
+            return np.empty(0, dtype=np.intp)
+
+        # o termo mais longo costuma ser o mais seletivo: começa por ele
+        achados = None
+        for t in sorted(set(termos), key=len, reverse=True):
+            pos = np.unique(self._tok_pos[_intervalo(self._tok, t)])
+            achados = pos if achados is None else np.intersect1d(achados, pos, assume_unique=True)
+            if not len(achados):
+                break
+        return achados
+
+    def buscar(
+        self,
+        texto: str = "",
+        status: list[str] | None = None,
+        elegivel: bool | None = None,
+        liberados: bool = False,
+        hoje=None,
+    ) -> np.ndarray:
+        """
+        Posições (ordem do CRM) que batem com o texto (telefone ou nome) e
+        os filtros. liberados=True: só quem pode receber mensagem hoje
+        (cooldown vencido e sem envio hoje).
+        """
+        texto = str(texto or "").strip()
+        if not texto:
+            pos = np.arange(len(self.df))
+        elif re.fullmatch(r"[\d\s()+\-.]+", texto):
+            pos = self.por_whatsapp(texto)
+        else:
+            pos = self.por_nome(texto)
+
+        if status:
+            cods = [self._status_cod.get(str(s).strip().upper(), -2) for s in status]
+            pos = pos[np.isin(self._status[pos], cods)]
+        if elegivel is not None:
+            pos = pos[self._elegivel[pos] == elegivel]
+        if liberados:
+            pos = pos[self.base._livres(pos, _dia(hoje or date.today()))]
+        return pos
+
+    def pagina(self, pos: np.ndarray, inicio: int, tamanho: int, colunas: list[str]) -> pd.DataFrame:
+        """
+        Só as linhas da página, só as colunas pedidas.
+        """
+        colunas = [c for c in colunas if c in self.df.columns]
+        return self.df.iloc[pos[inicio:inicio + tamanho]][colunas]
+
+
+_lock = threading.Lock()
+_indices: dict[str, IndiceCRM] = {}
+
+
+@rastrear()
+def indice_crm(st, spreadsheet_id: str) -> IndiceCRM:
+    """
+    Índice de busca do snapshot atual do CRM_GERAL (remonta só quando o
+    índice de elegíveis muda, ou seja, quando o snapshot muda).
+    """
+    base = indice_elegiveis(st, spreadsheet_id)
+    with _lock:
+        atual = _indices.get(spreadsheet_id)
+        if atual is not None and atual.base is base:
+            return atual
+
+    novo = IndiceCRM(base)
+    with _lock:
+        atual = _indices.get(spreadsheet_id)
+        if atual is not None and atual.base is base:
+            return atual  # outra sessão montou primeiro
+        _indices[spreadsheet_id] = novo
+    return novo
@@ -0,0 +1,209 @@
+# src/services/indice_elegiveis.py
+from __future__ import annotations
+
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.services.snapshot import ler_aba
+from src.services.telefones import normalizar_series
+from src.services.tipos import _parse_dates_series
+from src.services.tracing import rastrear
+
+
+# ==========================
+# ÍNDICE DE ELEGÍVEIS POR STATUS
+# ==========================
+# Montado uma vez por snapshot do CRM_GERAL (mesmo objeto devolvido pelo
+# ler_aba = mesma revisão). Guarda, por STATUS:
+#   - lista fixa:   posições com ELEGIVEL=SIM, na ordem do CRM (o sorteio
+#                   diário depende dessa ordem)
+#   - pontual:      posições com whatsapp válido, já na ordem final
+#                   (PRIORIDADE DESC, DIAS DE INATIVIDADE DESC, linha ASC)
+# e, para cada linha, o PROXIMO CONTATO PERMITIDO em dias.
+#
+# A data de hoje só entra na hora de consultar. Envio registrado
+# (gravar_envios / fila de escrita) bloqueia o cliente no índice até
+# o fim do dia, sem esperar o snapshot novo trazer o cooldown da planilha.
+
+COL_STATUS = "STATUS"
+COL_WPP = "WHATSAPP"
+COL_ELEGIVEL = "ELEGIVEL"
+COL_PRIO = "PRIORIDADE"
+COL_DIAS = "DIAS DE INATIVIDADE"
+COL_PROX = "PROXIMO CONTATO PERMITIDO"
+
+_SEM_DATA = np.iinfo(np.int64).min  # vazio = pode contatar
+
+
+def _dia(d) -> int:
+    return int(np.datetime64(pd.Timestamp(d).date(), "D").astype(np.int64))
+
+
+def _numeros(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+
+class IndiceElegiveis:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        n = len(df)
+
+        status = df[COL_STATUS].astype(str).str.strip() if COL_STATUS in df.columns else pd.Series("", index=df.index)
+        status_np = status.to_numpy()
+
+        prox = _parse_dates_series(df[COL_PROX]) if COL_PROX in df.columns else pd.Series(pd.NaT, index=df.index)
+        prox_dias = prox.to_numpy(dtype="datetime64[D]").astype(np.int64)
+        prox_dias[prox.isna().to_numpy()] = _SEM_DATA
+        self.prox = prox_dias
+
+        # canônico (telefones.py); "" = inválido, não entra nas filas
+        wpp = normalizar_series(df[COL_WPP]) if COL_WPP in df.columns else pd.Series("", index=df.index)
+        wpp_ok = wpp.ne("").to_numpy()
+
+        if COL_ELEGIVEL in df.columns:
+            elegivel = df[COL_ELEGIVEL].astype(str).str.upper().str.strip().eq("SIM").to_numpy()
+        else:
+            elegivel = np.ones(n, dtype=bool)
+
+        # lista fixa: STATUS exato, ordem original
+        pos = np.flatnonzero(elegivel)
+        self._fixa = {
+            s: pos[i]
+            for s, i in pd.Series(status_np[pos]).groupby(status_np[pos], sort=False).indices.items()
+        }
+
+        # pontual: STATUS sem caixa, já ordenado (prio DESC, dias DESC, linha ASC)
+        pos = np.flatnonzero(wpp_ok)
+        prio, dias = _numeros(df, COL_PRIO)[pos], _numeros(df, COL_DIAS)[pos]
+        pos = pos[np.lexsort((pos, -dias, -prio))]
+        upper = status.str.upper().to_numpy()[pos]
+        self._pontual = {
+            s: pos[i]
+            for s, i in pd.Series(upper).groupby(upper, sort=False).indices.items()
+        }
+
+        # whatsapp -> linha (duplicado: vale a última, igual ao gravar_envios)
+        idx = pd.Series(np.arange(n), index=wpp.to_numpy())
+        idx = idx[idx.index != ""]
+        self._linha_por_wpp = idx[~idx.index.duplicated(keep="last")]
+
+        self._bloqueado = np.zeros(n, dtype=bool)
+        self.enviados_hoje: set[str] = set()
+        self.dia = date.today()
+
+    # ---------------------------
+    # CONSULTAS
+    # ---------------------------
+    def _virar_dia(self) -> None:
+        # bloqueio de envio vale só no dia: virou o dia, todo mundo volta
+        # (o cooldown da planilha, em self.prox, continua valendo)
+        hoje = date.today()
+        if self.dia != hoje:
+            self._bloqueado[:] = False
+            self.enviados_hoje = set()
+            self.dia = hoje
+
+    def _livres(self, pos: np.ndarray, hoje: int) -> np.ndarray:
+        self._virar_dia()
+        return (self.prox[pos] <= hoje) & ~self._bloqueado[pos]
+
+    def elegiveis_fixa(self, status: str, hoje=None) -> np.ndarray:
+        """
+        Posições (ordem do CRM) de ELEGIVEL=SIM do status, liberadas hoje.
+        """
+        pos = self._fixa.get(status)
+        if pos is None:
+            return np.empty(0, dtype=np.intp)
+        return pos[self._livres(pos, _dia(hoje or date.today()))]
+
+    def top_k_status(self, status: str, k: int, hoje=None) -> np.ndarray:
+        """
+        Os k melhores do status liberados hoje. A fila já está na ordem
+        final: só anda até achar k livres (blocos crescentes).
+        """
+        fila = self._pontual.get(str(status).strip().upper())
+        if fila is None or k <= 0:
+            return np.empty(0, dtype=np.intp)
+
+        hoje = _dia(hoje or date.today())
+        achados, inicio, bloco = [], 0, max(2 * k, 64)
+        falta = k
+        while falta > 0 and inicio < len(fila):
+            pos = fila[inicio:inicio + bloco]
+            pos = pos[self._livres(pos, hoje)][:falta]
+            achados.append(pos)
+            falta -= len(pos)
+            inicio += bloco
+            bloco *= 2
+        return np.concatenate(achados) if achados else np.empty(0, dtype=np.intp)
+
+    def ja_enviados(self, whatsapps: pd.Series) -> np.ndarray:
+        """
+        Máscara (mesma ordem de whatsapps): quem já recebeu mensagem hoje,
+        pelo telefone ou pela linha do CRM (bloqueada até o fim do dia).
+        """
+        self._virar_dia()
+
+        wpps = normalizar_series(whatsapps)
+        enviado = wpps.isin(self.enviados_hoje).to_numpy(copy=True)
+        linhas = wpps.map(self._linha_por_wpp)
+        achou = linhas.notna().to_numpy()
+        enviado[achou] |= self._bloqueado[linhas[achou].astype(int).to_numpy()]
+        return enviado
+
+    # ---------------------------
+    # ATUALIZAÇÃO INCREMENTAL
+    # ---------------------------
+    def registrar_envios(self, whatsapps) -> int:
+        """
+        Tira do índice (até o fim do dia) quem acabou de receber mensagem.
+        """
+        self._virar_dia()
+
+        wpps = normalizar_series(pd.Series(list(whatsapps), dtype=object)).drop_duplicates()
+        self.enviados_hoje.update(wpps[wpps != ""])
+        linhas = wpps.map(self._linha_por_wpp).dropna().astype(int).to_numpy()
+        self._bloqueado[linhas] = True
+        return len(linhas)
+
+
+_lock = threading.Lock()
+_indices: dict[str, IndiceElegiveis] = {}
+
+
+@rastrear()
+def indice_elegiveis(st, spreadsheet_id: str) -> IndiceElegiveis:
+    """
+    Índice do snapshot atual do CRM_GERAL (remonta só quando o snapshot muda).
+    """
+    df = ler_aba(st, spreadsheet_id, "CRM_GERAL")
+    with _lock:
+        atual = _indices.get(spreadsheet_id)
+        if atual is not None and atual.df is df:
+            return atual
+
+    novo = IndiceElegiveis(df)
+    with _lock:
+        atual = _indices.get(spreadsheet_id)
+        if atual is not None and atual.df is df:
+            return atual  # outra sessão montou primeiro
+        if atual is not None and atual.dia == novo.dia and atual.enviados_hoje:
+            # envios de hoje que o snapshot novo talvez ainda não tenha
+            novo.registrar_envios(atual.enviados_hoje)
+        _indices[spreadsheet_id] = novo
+    return novo
+
+
+def registrar_envios(spreadsheet_id: str, whatsapps) -> None:
+    """
+    Chamado depois de gravar (ou enfileirar) envios.
+    """
+    with _lock:
+        atual = _indices.get(spreadsheet_id)
+        if atual is not None:
+            atual.registrar_envios(whatsapps)
@@ -1,9 +1,9 @@
-import time
+import threading
 from datetime import date
 
-import gspread
-from gspread.exceptions import APIError
-from google.oauth2.service_account import Credentials
+from src.services.quota import ESCRITA, com_quota
+from src.services.sheets_pool import get_worksheet
+from src.services.tracing import rastrear
 
 
 ABA_CONTROLE = "CONTROLE_APP"
@@ -11,75 +11,127 @@ COL_CHAVE = "CHAVE"
 COL_VALOR = "VALOR"
 
 
-def _retry_quota(fn, max_tries: int = 6):
-    backoff = 1
-    for _ in range(max_tries):
-        try:
-            return fn()
-        except APIError as e:
-            msg = str(e)
-            if "429" in msg or "Quota exceeded" in msg:
-                time.sleep(backoff)
-                backoff *= 2
-                continue
-            raise
-
-
-def _get_client_from_secrets(st):
-    info = dict(st.secrets["gcp_service_account"])
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    creds = Credentials.from_service_account_info(info, scopes=scopes)
-    return gspread.authorize(creds)
-
-
-def _get_value_by_key(ws, key: str) -> str:
-    # procura na coluna A (CHAVE) e retorna valor da coluna B
-    keys = ws.col_values(1)  # A
-    for i, k in enumerate(keys, start=1):
-        if str(k).strip() == key:
-            return str(ws.cell(i, 2).value or "").strip()
-    return ""
-
-
-def _set_value_by_key(ws, key: str, value: str):
-    keys = ws.col_values(1)
-    for i, k in enumerate(keys, start=1):
-        if str(k).strip() == key:
-            ws.update_cell(i, 2, value)
-            return
-    # se não achar a chave, cria uma linha nova
-    ws.append_row([key, value], value_input_option="USER_ENTERED")
-
-
-def pode_gerar_lista_hoje(st, spreadsheet_id: str, chave: str, is_admin: bool) -> bool:
+# ==========================
+# CONTROLE_APP como chave/valor
+# ==========================
+class ControleApp:
     """
-    Se is_admin=True -> sempre pode (modo teste/dev).
-    Se is_admin=False -> só pode 1x por dia para cada chave.
+    Aba CONTROLE_APP (A=CHAVE, B=VALOR) como key/value store.
+
+    - lê A:B inteiro numa chamada e guarda o índice chave -> linha
+    - get/set de várias chaves com 1 leitura / 1 batch_update
+    - compare_and_set: "checa e grava" como uma operação só
+      (serializada no processo; o Sheets não tem transação entre processos)
     """
-    if is_admin:
-        return True
 
+    def __init__(self, ws):
+        self.ws = ws
+        self._lock = threading.RLock()
+        self._linhas: dict[str, int] = {}
+        self._valores: dict[str, str] = {}
+        self._total_linhas = 0
+        self._carregado = False
+
+    def recarregar(self) -> None:
+        data = com_quota(lambda: self.ws.get("A:B"), nome="get:CONTROLE_APP")
+        linhas, valores = {}, {}
+        for i, row in enumerate(data or [], start=1):
+            k = str(row[0]).strip() if row else ""
+            if not k or k in linhas:
+                continue  # vale a primeira ocorrência da chave
+            linhas[k] = i
+            valores[k] = str(row[1] if len(row) > 1 else "").strip()
+
+        with self._lock:
+            self._linhas = linhas
+            self._valores = valores
+            self._total_linhas = len(data or [])
+            self._carregado = True
+
+    def get_many(self, chaves: list[str], fresco: bool = True) -> dict[str, str]:
+        with self._lock:
+            if fresco or not self._carregado:
+                self.recarregar()
+            return {k: self._valores.get(k, "") for k in chaves}
+
+    def get(self, chave: str, fresco: bool = True) -> str:
+        return self.get_many([chave], fresco=fresco)[chave]
+
+    def set_many(self, valores: dict[str, str]) -> None:
+        with self._lock:
+            if not self._carregado:
+                self.recarregar()
+
+            data = []
+            for k, v in valores.items():
+                row = self._linhas.get(k)
+                if row:
+                    data.append({"range": f"B{row}", "values": [[v]]})
+                else:
+                    # chave nova: linha logo depois da última usada
+                    self._total_linhas += 1
+                    row = self._total_linhas
+                    self._linhas[k] = row
+                    data.append({"range": f"A{row}:B{row}", "values": [[k, v]]})
+
+            if data:
+                com_quota(
+                    lambda: self.ws.batch_update(data, value_input_option="USER_ENTERED"),
+                    ESCRITA,
+                    nome="batch_update:CONTROLE_APP",
+                )
+            self._valores.update({k: str(v) for k, v in valores.items()})
+
+    def set(self, chave: str, valor: str) -> None:
+        self.set_many({chave: valor})
+
+    def compare_and_set(self, chave: str, novo: str, condicao) -> tuple[bool, str]:
+        """
+        Lê o valor atual (fresco) e só grava 'novo' se condicao(atual) for True.
+        Retorna (gravou, valor_anterior).
+        """
+        with self._lock:
+            atual = self.get(chave, fresco=True)
+            if not condicao(atual):
+                return False, atual
+            self.set(chave, novo)
+            return True, atual
+
+
+_stores: dict[str, ControleApp] = {}
+_stores_lock = threading.Lock()
+
+
+def get_controle(st, spreadsheet_id: str) -> ControleApp:
+    ws = get_worksheet(st, spreadsheet_id, ABA_CONTROLE)
+    with _stores_lock:
+        store = _stores.get(spreadsheet_id)
+        if store is None or store.ws is not ws:
+            store = ControleApp(ws)
+            _stores[spreadsheet_id] = store
+    return store
+
+
+# ==========================
+# LIMITE DE GERAÇÃO (1x por dia)
+# ==========================
+@rastrear()
+def reservar_geracao_hoje(st, spreadsheet_id: str, chave: str, is_admin: bool) -> tuple[bool, str]:
+    """
+    Checa e registra a geração do dia numa operação só.
+    Se is_admin=True -> sempre pode (modo teste/dev), mas registra igual.
+    Retorna (pode, valor_anterior) — use o anterior em desfazer_reserva
+    se a geração falhar.
+    """
     hoje = date.today().isoformat()  # salva em ISO pra não quebrar
-    gc = _get_client_from_secrets(st)
-    sh = gc.open_by_key(spreadsheet_id)
-    ws = sh.worksheet(ABA_CONTROLE)
+    store = get_controle(st, spreadsheet_id)
 
-    last = _retry_quota(lambda: _get_value_by_key(ws, chave))
+    if is_admin:
+        return store.compare_and_set(chave, hoje, lambda atual: True)
 
     # se já gerou hoje, bloqueia
-    if last == hoje:
-        return False
-
-    return True
-
+    return store.compare_and_set(chave, hoje, lambda atual: atual != hoje)
 
-def registrar_geracao_lista(st, spreadsheet_id: str, chave: str):
-    hoje = date.today().isoformat()
-    gc = _get_client_from_secrets(st)
-    sh = gc.open_by_key(spreadsheet_id)
-    ws = sh.worksheet(ABA_CONTROLE)
 
-    _retry_quota(lambda: _set_value_by_key(ws, chave, hoje))
+def desfazer_reserva(st, spreadsheet_id: str, chave: str, valor_anterior: str):
+    get_controle(st, spreadsheet_id).set(chave, valor_anterior)
@@ -0,0 +1,103 @@
+# src/services/lista_estado.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+# ==========================
+# ESTADO DA LISTA (fixa / pontual) NA SESSÃO
+# ==========================
+class ListaEstado:
+    """
+    Lista gerada guardada uma vez só na sessão:
+
+    - base: DataFrame imutável (índice 0..n-1, sem a coluna de enviado)
+    - enviado: bitmap numpy (1 byte por linha), a única coisa que a UI edita
+    - versao: sobe a cada mudança no bitmap
+
+    As views para o data_editor reaproveitam as colunas da base (sem copiar);
+    colunas calculadas (ex.: link) ficam em cache via derivada().
+    """
+
+    def __init__(self, df: pd.DataFrame, col_enviado: str):
+        self.col_enviado = col_enviado
+
+        if col_enviado in df.columns:
+            enviado = df[col_enviado].fillna(False).astype(bool).to_numpy()
+            df = df.drop(columns=[col_enviado])
+        else:
+            enviado = np.zeros(len(df), dtype=bool)
+
+        self.base = df.reset_index(drop=True)
+        self.enviado = enviado.copy()
+        self.versao = 0
+        self._derivadas: dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    @property
+    def total_enviados(self) -> int:
+        return int(self.enviado.sum())
+
+    # ---------------------------
+    # EDIÇÃO (só o bitmap)
+    # ---------------------------
+    def marcar(self, enviado, inicio: int = 0) -> bool:
+        """
+        Aplica as marcações do editor (a lista toda ou a página que começa
+        em 'inicio'). Retorna True se algo mudou.
+        """
+        novo = np.asarray(pd.Series(enviado).fillna(False), dtype=bool)
+        fim = inicio + len(novo)
+        if inicio < 0 or fim > len(self.enviado):
+            raise ValueError("Marcações fora do tamanho da lista.")
+        if np.array_equal(novo, self.enviado[inicio:fim]):
+            return False
+
+        self.enviado[inicio:fim] = novo
+        self.versao += 1
+        return True
+
+    # ---------------------------
+    # PROJEÇÕES
+    # ---------------------------
+    def derivada(self, nome: str, chave, fn) -> pd.Series:
+        """
+        Coluna calculada a partir da base, recalculada só quando 'chave'
+        muda (ex.: o texto da mensagem para a coluna de link).
+        """
+        atual = self._derivadas.get(nome)
+        if atual is None or atual[0] != chave:
+            atual = (chave, fn(self.base))
+            self._derivadas[nome] = atual
+        return atual[1]
+
+    def view(self, colunas: list[str], extras: dict | None = None, inicio: int = 0, fim: int | None = None) -> pd.DataFrame:
+        """
+        DataFrame para exibir as linhas [inicio, fim): colunas da base
+        (fatias, sem cópia) + enviado + extras.
+        """
+        extras = extras or {}
+        fim = len(self.base) if fim is None else min(fim, len(self.base))
+        dados = {}
+        for c in colunas:
+            if c == self.col_enviado:
+                dados[c] = self.enviado[inicio:fim].copy()  # o editor não pode mexer no bitmap
+            elif c in extras:
+                dados[c] = extras[c][inicio:fim]
+            elif c in self.base.columns:
+                dados[c] = self.base[c].iloc[inicio:fim]
+        return pd.DataFrame(dados, copy=False)
+
+    def enviados(self) -> pd.DataFrame:
+        """
+        Só as linhas marcadas, já com a coluna de enviado (para gravar).
+        """
+        pos = np.flatnonzero(self.enviado)
+        df = self.base.take(pos)
+        return df.assign(**{self.col_enviado: True})
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.base.assign(**{self.col_enviado: self.enviado})
@@ -0,0 +1,167 @@
+# src/services/listas_prontas.py
+from __future__ import annotations
+
+import io
+import os
+import sqlite3
+import time
+from datetime import date
+
+import pandas as pd
+
+from src.config import CACHE_DIR, STATUS_LISTA
+from src.services.indice_elegiveis import IndiceElegiveis
+from src.services.lojas import gerar_fixa_loja, para_cada_loja
+from src.services.pontual_backend import gerar_lista_pontual_por_status_real
+from src.services.snapshot import ler_aba
+from src.services.telefones import digitos_series
+from src.services.tracing import rastrear
+
+
+# ==========================
+# LISTAS PRÉ-GERADAS (job fora do horário de pico)
+# ==========================
+# O job headless (python main.py pre-gerar) baixa o snapshot do CRM e
+# grava, por loja, a Lista Fixa do dia e uma lista pontual por STATUS.
+# As páginas usam a lista pronta na hora e só geram ao vivo se não houver.
+#
+# Cada lista pronta é servida uma vez (consumida): se o admin gerar de novo
+# no mesmo dia, já vem ao vivo, com quem foi contatado fora da fila.
+# Na hora de servir, sai quem o índice já marcou como enviado hoje
+# (a lista foi gerada antes desses envios).
+
+FIXA = "fixa"
+PONTUAL = "pontual"
+
+_DB_NOME = "listas_prontas.sqlite"
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    con = sqlite3.connect(os.path.join(CACHE_DIR, _DB_NOME), timeout=30)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS listas ("
+        " spreadsheet_id TEXT NOT NULL, tipo TEXT NOT NULL, chave TEXT NOT NULL,"
+        " dia TEXT NOT NULL, dados TEXT, gerado_em REAL, consumido_em REAL,"
+        " PRIMARY KEY (spreadsheet_id, tipo, chave, dia))"
+    )
+    return con
+
+
+def salvar_lista(spreadsheet_id: str, tipo: str, df: pd.DataFrame, chave: str = "", dia: str | None = None) -> None:
+    dia = dia or date.today().isoformat()
+
+    # telefone gravado como texto (só dígitos), igual volta na leitura
+    df = df.assign(**{c: digitos_series(df[c]) for c in ("WHATSAPP", "whatsapp") if c in df.columns})
+    dados = df.to_json(orient="split", index=False, date_format="iso")
+
+    con = _connect()
+    try:
+        con.execute(
+            "INSERT OR REPLACE INTO listas"
+            " (spreadsheet_id, tipo, chave, dia, dados, gerado_em, consumido_em)"
+            " VALUES (?, ?, ?, ?, ?, ?, NULL)",
+            (spreadsheet_id, tipo, chave, dia, dados, time.time()),
+        )
+        # guarda só hoje e ontem
+        con.execute("DELETE FROM listas WHERE dia < date(?, '-1 day')", (dia,))
+        con.commit()
+    finally:
+        con.close()
+
+
+def carregar_lista(
+    spreadsheet_id: str,
+    tipo: str,
+    chave: str = "",
+    consumir: bool = True,
+    indice: IndiceElegiveis | None = None,
+) -> pd.DataFrame | None:
+    """
+    Lista pronta de hoje (ainda não consumida) ou None.
+    Com indice: sem quem já recebeu mensagem hoje (tirar_enviados_hoje).
+    """
+    dia = date.today().isoformat()
+    con = _connect()
+    try:
+        row = con.execute(
+            "SELECT dados FROM listas WHERE spreadsheet_id = ? AND tipo = ? AND chave = ?"
+            " AND dia = ? AND consumido_em IS NULL",
+            (spreadsheet_id, tipo, chave, dia),
+        ).fetchone()
+        if row is None:
+            return None
+        if consumir:
+            con.execute(
+                "UPDATE listas SET consumido_em = ? WHERE spreadsheet_id = ? AND tipo = ?"
+                " AND chave = ? AND dia = ?",
+                (time.time(), spreadsheet_id, tipo, chave, dia),
+            )
+            con.commit()
+    finally:
+        con.close()
+
+    df = pd.read_json(
+        io.StringIO(row[0]),
+        orient="split",
+        dtype={"WHATSAPP": str, "whatsapp": str},
+        convert_dates=False,
+    )
+    return df if indice is None else tirar_enviados_hoje(df, indice)
+
+
+def tirar_enviados_hoje(df: pd.DataFrame, indice: IndiceElegiveis) -> pd.DataFrame:
+    """
+    Remove da lista quem o índice já deu como enviado hoje.
+    """
+    col = next((c for c in ("WHATSAPP", "whatsapp") if c in df.columns), None)
+    if col is None or df.empty:
+        return df
+    return df[~indice.ja_enviados(df[col])].reset_index(drop=True)
+
+
+def listas_de_hoje(spreadsheet_id: str | None = None) -> pd.DataFrame:
+    con = _connect()
+    try:
+        sql = (
+            "SELECT spreadsheet_id, tipo, chave, gerado_em, consumido_em FROM listas"
+            " WHERE dia = ?"
+        )
+        params: tuple = (date.today().isoformat(),)
+        if spreadsheet_id is not None:
+            sql += " AND spreadsheet_id = ?"
+            params += (spreadsheet_id,)
+        return pd.read_sql_query(sql, con, params=params)
+    finally:
+        con.close()
+
+
+# ==========================
+# JOB
+# ==========================
+def _pre_gerar_loja(st, loja, com_pontual: bool = True) -> dict:
+    sid = loja.spreadsheet_id
+
+    # snapshot fresco do CRM; a fixa já monta o índice (o resto do dia
+    # parte daqui)
+    ler_aba(st, sid, "CRM_GERAL", forcar=True)
+
+    fixa = gerar_fixa_loja(st, loja)
+    salvar_lista(sid, FIXA, fixa)
+    resumo = {"fixa": len(fixa)}
+
+    if com_pontual:
+        for status in STATUS_LISTA:
+            df = gerar_lista_pontual_por_status_real(st, sid, status, total=loja.total_pontual)
+            salvar_lista(sid, PONTUAL, df, chave=status)
+            resumo[status] = len(df)
+    return resumo
+
+
+@rastrear()
+def pre_gerar(st, lojas, com_pontual: bool = True) -> dict[str, object]:
+    """
+    Pré-gera as listas do dia de cada loja (em paralelo).
+    Retorna {loja.id: {lista: linhas} ou a exceção}.
+    """
+    return para_cada_loja(st, lojas, lambda st, loja: _pre_gerar_loja(st, loja, com_pontual))
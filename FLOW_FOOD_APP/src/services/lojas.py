@@ -0,0 +1,138 @@
+# src/services/lojas.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from src.config import ADMIN_MENU, CLIENT_MENU, LOJAS_MAX_WORKERS
+from src.services.paralelo import rodar_em_paralelo
+from src.services.tracing import rastrear
+
+
+# ==========================
+# REGISTRO DE LOJAS
+# ==========================
+# Cada loja tem a sua planilha. No secrets.toml:
+#
+#   [LOJAS.centro]
+#   NOME = "Centro"
+#   SPREADSHEET_ID = "..."
+#   TOTAL_PONTUAL = 37          # opcional
+#   LIMITE_DIARIO = true        # opcional (1 geração de lista por dia)
+#   MENU = ["Lista Fixa", "Campanha Pontual"]   # opcional
+#
+# Sem [LOJAS], vale a loja única de st.secrets["SPREADSHEET_ID"].
+#
+# Tudo que guarda dados (snapshot, índice de elegíveis, CONTROLE_APP,
+# agregados, listas na sessão) é indexado pelo spreadsheet_id da loja:
+# uma loja não divide (nem despeja) cache com outra.
+
+LOJA_PADRAO = "padrao"
+
+
+@dataclass(frozen=True)
+class Loja:
+    id: str
+    nome: str
+    spreadsheet_id: str
+    total_pontual: int = 37
+    limite_diario: bool = True
+    menu: tuple[str, ...] = field(default_factory=tuple)
+
+    def menu_para(self, app_mode: str) -> list[str]:
+        padrao = CLIENT_MENU if app_mode == "CLIENT" else ADMIN_MENU
+        if not self.menu:
+            return list(padrao)
+        # ADMIN sempre vê as páginas de admin, além das da loja
+        extras = [] if app_mode == "CLIENT" else [p for p in ADMIN_MENU if p not in CLIENT_MENU]
+        return list(self.menu) + [p for p in extras if p not in self.menu]
+
+
+def _loja_do_secrets(loja_id: str, cfg) -> Loja:
+    cfg = dict(cfg)
+    return Loja(
+        id=loja_id,
+        nome=str(cfg.get("NOME") or loja_id),
+        spreadsheet_id=str(cfg["SPREADSHEET_ID"]),
+        total_pontual=int(cfg.get("TOTAL_PONTUAL", 37)),
+        limite_diario=bool(cfg.get("LIMITE_DIARIO", True)),
+        menu=tuple(cfg.get("MENU") or ()),
+    )
+
+
+def carregar_lojas(st) -> dict[str, Loja]:
+    lojas_cfg = st.secrets.get("LOJAS")
+    if lojas_cfg:
+        return {str(k): _loja_do_secrets(str(k), v) for k, v in dict(lojas_cfg).items()}
+
+    return {
+        LOJA_PADRAO: Loja(
+            id=LOJA_PADRAO,
+            nome="Flow Food",
+            spreadsheet_id=str(st.secrets["SPREADSHEET_ID"]),
+        )
+    }
+
+
+def loja_atual(st) -> Loja:
+    """
+    Loja escolhida na sidebar (session_state["loja_id"]); sem escolha, a primeira.
+    """
+    lojas = carregar_lojas(st)
+    loja_id = st.session_state.get("loja_id") if hasattr(st, "session_state") else None
+    return lojas.get(loja_id) or next(iter(lojas.values()))
+
+
+def chave_sessao(st, nome: str) -> str:
+    # listas na sessão separadas por loja (trocar de loja não mistura listas)
+    return f"{nome}@{loja_atual(st).id}"
+
+
+# ==========================
+# EXECUÇÃO CONCORRENTE ENTRE LOJAS
+# ==========================
+def para_cada_loja(st, lojas, fn, max_workers: int = LOJAS_MAX_WORKERS) -> dict[str, object]:
+    """
+    Roda fn(st, loja) para cada loja num pool de threads.
+    Cota do Sheets e pool de clientes são os do processo (compartilhados).
+    Retorna {loja.id: resultado ou a exceção que a loja levantou}.
+    """
+    return rodar_em_paralelo(
+        {loja.id: (lambda loja=loja: fn(st, loja)) for loja in lojas},
+        max_workers=max_workers,
+        capturar_erros=True,  # uma loja com erro não derruba as outras
+    )
+
+
+# imports dentro das funções: a sidebar usa este módulo em todo rerun e
+# não precisa de pandas/gspread só para listar as lojas
+def gerar_fixa_loja(st, loja: Loja):
+    """
+    Lista fixa do dia da loja (sem a trava diária: quem chama decide se
+    reserva). Usada pelo job de pré-geração (listas_prontas.pre_gerar).
+    """
+    from src.services.indice_elegiveis import indice_elegiveis
+    from src.services.sheets import gerar_lista_fixa
+    from src.services.snapshot import ler_abas
+
+    # CRM + CONFIGURACAO numa leitura só (1 revisão + 1 batch_get)
+    abas = ler_abas(st, loja.spreadsheet_id, ["CRM_GERAL", "CONFIGURACAO"])
+    indice = indice_elegiveis(st, loja.spreadsheet_id)
+    return gerar_lista_fixa(indice.df, abas["CONFIGURACAO"], indice=indice)
+
+
+def _atualizar(st, loja: Loja):
+    from src.services.indice_elegiveis import indice_elegiveis
+    from src.services.snapshot import ler_abas
+
+    ler_abas(st, loja.spreadsheet_id, ["CRM_GERAL", "CONFIGURACAO"])
+    indice = indice_elegiveis(st, loja.spreadsheet_id)
+    return len(indice.df)
+
+
+@rastrear()
+def atualizar_lojas(st, lojas=None) -> dict[str, object]:
+    """
+    Atualiza snapshot + índice de elegíveis de várias lojas em paralelo.
+    Retorna {loja.id: linhas no CRM ou exceção}.
+    """
+    return para_cada_loja(st, lojas or carregar_lojas(st).values(), _atualizar)
@@ -0,0 +1,39 @@
+# src/services/paralelo.py
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ==========================
+# FAN-OUT DE CHAMADAS INDEPENDENTES
+# ==========================
+# Cada tarefa roda numa cópia do contexto de quem chamou: os spans do
+# rastreamento caem no rerun atual, pendurados no span aberto.
+# Cota do Sheets e pool de clientes são os do processo (compartilhados).
+
+
+def rodar_em_paralelo(tarefas: dict, max_workers: int = 8, capturar_erros: bool = False) -> dict:
+    """
+    tarefas: {nome: função sem argumentos}. Retorna {nome: resultado}.
+    capturar_erros=True devolve a exceção no lugar do resultado (uma
+    tarefa com erro não derruba as outras); senão relança a primeira.
+    """
+    if not tarefas:
+        return {}
+
+    def _rodar(fn):
+        try:
+            return fn()
+        except Exception as e:
+            if capturar_erros:
+                return e
+            raise
+
+    workers = max(1, min(max_workers, len(tarefas)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flowfood") as pool:
+        futuros = {
+            nome: pool.submit(contextvars.copy_context().run, _rodar, fn)
+            for nome, fn in tarefas.items()
+        }
+        return {nome: f.result() for nome, f in futuros.items()}
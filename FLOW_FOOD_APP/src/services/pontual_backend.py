@@ -1,40 +1,19 @@
 # src/services/pontual_backend.py
 from __future__ import annotations
 
-import re
-import time
 from datetime import date  # ✅ trocado (antes era datetime)
 
+import numpy as np
 import pandas as pd
-import gspread
-from gspread import Cell
 from gspread.exceptions import APIError
-from google.oauth2.service_account import Credentials
 
-
-# ==========================
-# HELPERS
-# ==========================
-def _digits_only(s: str) -> str:
-    s = "" if s is None else str(s)
-    return re.sub(r"\D", "", s)
-
-
-def _retry_quota(fn, max_tries: int = 6):
-    """
-    Retry com backoff exponencial para erros de quota (429).
-    """
-    backoff = 1
-    for _ in range(max_tries):
-        try:
-            return fn()
-        except APIError as e:
-            msg = str(e)
-            if "429" in msg or "Quota exceeded" in msg:
-                time.sleep(backoff)
-                backoff *= 2
-                continue
-            raise
+from src.services.quota import ESCRITA, com_quota
+from src.services.sheets_pool import get_spreadsheet, get_worksheet
+from src.services.indice_elegiveis import IndiceElegiveis, indice_elegiveis, registrar_envios
+from src.services.snapshot import _letra, aplicar_escrita, invalidar_snapshot
+from src.services.telefones import digitos_series, normalizar_series
+from src.services.tipos import _parse_dates_series
+from src.services.tracing import rastrear
 
 
 # ==========================
@@ -58,137 +37,277 @@ LOG_COL_STATUS = "STATUS DO DIA"
 LOG_COL_CAMPANHA = "CAMPANHA"
 
 
-def _get_gspread_client_from_streamlit_secrets(st):
+# ==========================
+# PLANO DE ESCRITA (CRM + LOG, valores com USER_ENTERED)
+# ==========================
+class CelulaProtegidaError(Exception):
     """
-    Usa st.secrets (padrão Streamlit) para autenticar.
+    A conta de serviço não pode editar o intervalo (proteção na aba).
     """
-    info = dict(st.secrets["gcp_service_account"])
 
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    creds = Credentials.from_service_account_info(info, scopes=scopes)
-    return gspread.authorize(creds)
+    def __init__(self, aba: str, colunas: list[str]):
+        self.aba = aba
+        self.colunas = colunas
+        super().__init__(f"{aba}: intervalo protegido ({', '.join(colunas)}).")
 
 
-def atualizar_crm_por_lista_real(st, spreadsheet_id: str, lista_df: pd.DataFrame) -> dict:
+def _blocos_contiguos(linhas: np.ndarray) -> list[slice]:
     """
-    Atualiza CRM_GERAL + LOG_ENVIO no Google Sheets.
+    Fatia as linhas (ordenadas, sem repetição) em blocos consecutivos.
+    Ex.: [2, 3, 4, 9, 10] -> [slice(0, 3), slice(3, 5)]
+    """
+    if len(linhas) == 0:
+        return []
+    quebras = np.flatnonzero(np.diff(linhas) != 1) + 1
+    inicios = np.concatenate(([0], quebras))
+    fins = np.concatenate((quebras, [len(linhas)]))
+    return [slice(int(i), int(f)) for i, f in zip(inicios, fins)]
 
-    Regras:
-    - Só atualiza quem estiver com enviado == True
-    - Não faz nada automaticamente: só roda quando você chamar (botão)
+
+def _indice_wpp_linha(crm_wpps: list) -> pd.Series:
+    """
+    whatsapp (canônico, telefones.py) -> número da linha no CRM_GERAL
+    (1-based, header na 1). Em duplicados vale a última linha (mesmo
+    comportamento do dict antigo).
+    """
+    wpps = normalizar_series(pd.Series(crm_wpps, dtype=object))
+    idx = pd.Series(np.arange(2, len(wpps) + 2), index=wpps.to_numpy())
+    idx = idx[idx.index != ""]
+    return idx[~idx.index.duplicated(keep="last")]
+
+
+def _header_map(value_range: dict) -> tuple[list, dict]:
+    header = (value_range.get("values") or [[]])[0]
+    return header, {str(h).strip(): idx for idx, h in enumerate(header)}  # 0-based
+
+
+def _dados_crm(linhas: np.ndarray, colunas: dict[int, np.ndarray]) -> list[dict]:
+    """
+    Um intervalo (A1) por (coluna, bloco de linhas consecutivas), para o
+    values_batch_update. colunas: índice 0-based da coluna -> valores
+    alinhados com 'linhas'.
+    """
+    dados = []
+    for bloco in _blocos_contiguos(linhas):
+        r0 = int(linhas[bloco.start])
+        r1 = int(linhas[bloco.stop - 1])
+        for col, valores in colunas.items():
+            letra = _letra(col)
+            dados.append({
+                "range": f"'{ABA_CRM}'!{letra}{r0}:{letra}{r1}",
+                "values": [["" if v is None else str(v)] for v in valores[bloco]],
+            })
+    return dados
+
+
+def _escrever(fn, aba: str, colunas: list[str], nome: str):
+    # escrita com cota; proteção vira CelulaProtegidaError com a aba certa
+    try:
+        return com_quota(fn, ESCRITA, nome=nome)
+    except APIError as e:
+        if erro_celula_protegida(e):
+            raise CelulaProtegidaError(aba, colunas) from e
+        raise
+
+
+@rastrear()
+def gravar_envios(st, spreadsheet_id: str, enviados: pd.DataFrame) -> dict:
+    """
+    Grava envios confirmados no CRM_GERAL + LOG_ENVIO (sem UI).
+    enviados: whatsapp, status, campanha e, opcional, data (ISO) por linha;
+    sem 'data' usa hoje.
+
+    Custo fixo de API, independente do tamanho da lista:
+    1 batch_get (headers), 1 leitura da coluna WHATSAPP, 1 values_batch_update
+    com o CRM (blocos de linhas consecutivas) e 1 values_append no LOG.
+    As duas escritas vão com USER_ENTERED (igual digitar: o Sheets converte
+    data/número/fórmula e mantém o formato que a coluna já tem). O CRM vai
+    primeiro: se o LOG falhar, repetir o lote só regrava as mesmas células.
+    Intervalo protegido: CelulaProtegidaError (diz a aba).
     """
-    enviados = lista_df[lista_df["enviado"] == True].copy()
     if enviados.empty:
         return {"updated": 0, "log_added": 0}
 
-    gc = _get_gspread_client_from_streamlit_secrets(st)
-    sh = gc.open_by_key(spreadsheet_id)
-
-    ws_crm = sh.worksheet(ABA_CRM)
-    ws_log = sh.worksheet(ABA_LOG)
+    sh = get_spreadsheet(st, spreadsheet_id)
+    ws_crm = get_worksheet(st, spreadsheet_id, ABA_CRM)
 
     # -------------------------
-    # MAPEIA CRM
+    # HEADERS (CRM + LOG numa chamada)
     # -------------------------
-    crm_header = ws_crm.row_values(1)
-    crm_map = {h.strip(): idx for idx, h in enumerate(crm_header)}  # 0-based
+    res = com_quota(
+        lambda: sh.values_batch_get([f"'{ABA_CRM}'!1:1", f"'{ABA_LOG}'!1:1"]),
+        nome="values_batch_get:headers",
+    )
+    ranges = res.get("valueRanges", [{}, {}])
+    _, crm_map = _header_map(ranges[0])
+    log_header, log_map = _header_map(ranges[1])
 
     for col in [COL_WPP, COL_ULTIMO_CONTATO, COL_CAMPANHA_DIA]:
         if col not in crm_map:
             raise ValueError(f"CRM_GERAL: coluna '{col}' não encontrada no cabeçalho.")
 
-    wpp_col_index_1based = crm_map[COL_WPP] + 1
-    crm_wpps = ws_crm.col_values(wpp_col_index_1based)[1:]  # sem header
+    for col in [LOG_COL_DATA, LOG_COL_WPP, LOG_COL_STATUS, LOG_COL_CAMPANHA]:
+        if col not in log_map:
+            raise ValueError(f"LOG_ENVIO: coluna '{col}' não encontrada no cabeçalho.")
 
-    wpp_to_row = {}
-    for i, w in enumerate(crm_wpps, start=2):
-        w = _digits_only(w)
-        if w:
-            wpp_to_row[w] = i
+    wpp_col_index_1based = crm_map[COL_WPP] + 1
+    crm_wpps = com_quota(lambda: ws_crm.col_values(wpp_col_index_1based), nome="col_values:WHATSAPP")[1:]  # sem header
+    wpp_to_row = _indice_wpp_linha(crm_wpps)
 
     # ✅ AGORA grava só DATA (sem hora)
     hoje = date.today().isoformat()  # 2026-01-23
     # Se quiser BR, troque a linha acima por:
     # hoje = date.today().strftime("%d/%m/%Y")
 
+    if "data" in enviados.columns:
+        datas = enviados["data"].fillna(hoje).astype(str).to_numpy(dtype=object)
+    else:
+        datas = np.full(len(enviados), hoje, dtype=object)
+
+    # join pelo número canônico (mesma regra da carga e do índice)
+    chave = normalizar_series(enviados["whatsapp"])
+    campanha = enviados.get("campanha", pd.Series("", index=enviados.index)).fillna("").astype(str).str.strip().to_numpy()
+    status = enviados.get("status", pd.Series("", index=enviados.index)).fillna("").astype(str).str.strip().to_numpy()
+
     # -------------------------
-    # BATCH UPDATE CRM_GERAL
+    # CRM_GERAL: join vetorizado whatsapp -> linha
     # -------------------------
-    updated = 0
-    cells_to_update = []
-
-    col_ult_1b = crm_map[COL_ULTIMO_CONTATO] + 1
-    col_camp_1b = crm_map[COL_CAMPANHA_DIA] + 1
-
-    for _, r in enviados.iterrows():
-        wpp = _digits_only(r["whatsapp"])
-        campanha = str(r.get("campanha", "")).strip()
-
-        row_number = wpp_to_row.get(wpp)
-        if not row_number:
-            continue
-
-        cells_to_update.append(Cell(row_number, col_ult_1b, hoje))
-        cells_to_update.append(Cell(row_number, col_camp_1b, campanha))
-        updated += 1
-
-    if cells_to_update:
-        try:
-            _retry_quota(lambda: ws_crm.update_cells(cells_to_update, value_input_option="USER_ENTERED"))
-        except APIError as e:
-            msg = str(e)
-            if "400" in msg and "protected" in msg:
-                st.error("ERRO DE PERMISSÃO: O sistema tentou editar células protegidas na aba CRM_GERAL.")
-                st.info("A conta de serviço não tem permissão para editar as colunas 'ULTIMO CONTATO' ou 'CAMPANHA DO DIA'.")
-                st.warning("Solução: No Google Sheets, vá em 'Dados > Proteger páginas e intervalos' e verifique se essas colunas estão bloqueadas. Se estiverem, adicione o e-mail da conta de serviço como editor ou remova a proteção.")
-                st.stop()
-            else:
-                raise e
+    linha = pd.Series(chave.to_numpy()).map(wpp_to_row)
+    achou = linha.notna().to_numpy()
+    updated = int(achou.sum())
+
+    # no LOG o WHATSAPP vai no formato de sempre da planilha: os dígitos da
+    # célula do CRM (fora do CRM, os dígitos como vieram). Quem lê o LOG
+    # agrupa por telefones.chave_series, que junta as duas formas
+    wpp = digitos_series(enviados["whatsapp"]).to_numpy(dtype=object)
+    wpp[achou] = digitos_series(pd.Series(crm_wpps, dtype=object)).to_numpy()[linha[achou].astype(int).to_numpy() - 2]
+
+    plano = pd.DataFrame({
+        "linha": linha[achou].astype(int).to_numpy(),
+        "data": datas[achou],
+        "campanha": campanha[achou],
+    })
+    # mesma linha 2x na lista: vale a última marcação
+    plano = plano.drop_duplicates("linha", keep="last").sort_values("linha")
+    linhas = plano["linha"].to_numpy()
+
+    dados = _dados_crm(
+        linhas,
+        {
+            crm_map[COL_ULTIMO_CONTATO]: plano["data"].to_numpy(dtype=object),
+            crm_map[COL_CAMPANHA_DIA]: plano["campanha"].to_numpy(dtype=object),
+        },
+    )
+    if dados:
+        _escrever(
+            lambda: sh.values_batch_update({"valueInputOption": "USER_ENTERED", "data": dados}),
+            ABA_CRM,
+            [COL_ULTIMO_CONTATO, COL_CAMPANHA_DIA],
+            nome="values_batch_update:crm",
+        )
 
     # -------------------------
-    # LOG_ENVIO (append)
+    # LOG_ENVIO (append; None = não mexe na célula, ex.: coluna com fórmula)
     # -------------------------
-    log_header = ws_log.row_values(1)
-    log_map = {h.strip(): idx for idx, h in enumerate(log_header)}
+    log_cols = {
+        log_map[LOG_COL_DATA]: datas,
+        log_map[LOG_COL_WPP]: wpp,
+        log_map[LOG_COL_STATUS]: status,
+        log_map[LOG_COL_CAMPANHA]: campanha,
+    }
+    largura = max(log_cols) + 1
+    log_rows = []
+    for i in range(len(enviados)):
+        row = [None] * largura
+        for col, valores in log_cols.items():
+            row[col] = str(valores[i])
+        log_rows.append(row)
+
+    _escrever(
+        lambda: sh.values_append(
+            f"'{ABA_LOG}'!A1",
+            params={"valueInputOption": "USER_ENTERED", "insertDataOption": "INSERT_ROWS"},
+            body={"values": log_rows},
+        ),
+        ABA_LOG,
+        [LOG_COL_DATA, LOG_COL_WPP, LOG_COL_STATUS, LOG_COL_CAMPANHA],
+        nome="values_append:log",
+    )
 
-    for col in [LOG_COL_DATA, LOG_COL_WPP, LOG_COL_STATUS, LOG_COL_CAMPANHA]:
-        if col not in log_map:
-            raise ValueError(f"LOG_ENVIO: coluna '{col}' não encontrada no cabeçalho.")
+    # write-through: o snapshot do CRM recebe as mesmas células (sem baixar
+    # a aba de novo, se ainda estiver alinhado com a coluna WHATSAPP lida
+    # acima); o LOG_ENVIO cresceu, então a próxima leitura dele checa a revisão
+    aplicar_escrita(
+        st,
+        spreadsheet_id,
+        ABA_CRM,
+        linhas,
+        {
+            COL_ULTIMO_CONTATO: plano["data"].to_numpy(dtype=object),
+            COL_CAMPANHA_DIA: plano["campanha"].to_numpy(dtype=object),
+        },
+        conferir=(COL_WPP, crm_wpps),
+    )
+    invalidar_snapshot(spreadsheet_id, ABA_LOG)
+    registrar_envios(spreadsheet_id, wpp)
+
+    return {"updated": updated, "log_added": len(log_rows)}
 
-    rows_to_append = []
-    for _, r in enviados.iterrows():
-        row = [""] * len(log_header)
-        row[log_map[LOG_COL_DATA]] = hoje
-        row[log_map[LOG_COL_WPP]] = _digits_only(r["whatsapp"])
-        row[log_map[LOG_COL_STATUS]] = str(r.get("status", "")).strip()
-        row[log_map[LOG_COL_CAMPANHA]] = str(r.get("campanha", "")).strip()
-        rows_to_append.append(row)
 
-    if rows_to_append:
-        _retry_quota(lambda: ws_log.append_rows(rows_to_append, value_input_option="USER_ENTERED"))
+def erro_celula_protegida(e: Exception) -> bool:
+    msg = str(e)
+    return isinstance(e, APIError) and "400" in msg and "protected" in msg
 
-    return {"updated": updated, "log_added": len(rows_to_append)}
-def _parse_date_any(s):
+
+@rastrear()
+def atualizar_crm_por_lista_real(st, spreadsheet_id: str, lista_df: pd.DataFrame) -> dict:
     """
-    Tenta converter datas vindas do Sheets (ISO ou BR). Retorna date() ou None.
+    Atualiza CRM_GERAL + LOG_ENVIO no Google Sheets.
+
+    Regras:
+    - Só atualiza quem estiver com enviado == True
+    - Não faz nada automaticamente: só roda quando você chamar (botão)
     """
-    if s is None:
-        return None
-    s = str(s).strip()
-    if not s:
-        return None
+    enviados = lista_df[lista_df["enviado"] == True]
+    if enviados.empty:
+        return {"updated": 0, "log_added": 0}
+
     try:
-        dt = pd.to_datetime(s, errors="coerce", dayfirst=True)
-        if pd.isna(dt):
-            return None
-        return dt.date()
-    except Exception:
-        return None
+        return gravar_envios(st, spreadsheet_id, enviados)
+    except CelulaProtegidaError as e:
+        colunas = " ou ".join(f"'{c}'" for c in e.colunas)
+        st.error(f"ERRO DE PERMISSÃO: O sistema tentou editar células protegidas na aba {e.aba}.")
+        st.info(f"A conta de serviço não tem permissão para editar as colunas {colunas}.")
+        st.warning("Solução: No Google Sheets, vá em 'Dados > Proteger páginas e intervalos' e verifique se essas colunas estão bloqueadas. Se estiverem, adicione o e-mail da conta de serviço como editor ou remova a proteção.")
+        st.stop()
 
 
+def _top_k(prio: np.ndarray, dias: np.ndarray, k: int) -> np.ndarray:
+    """
+    Posições dos k maiores por (prio DESC, dias DESC), empate pela ordem
+    original: mesmo resultado do sort_values + head(k), mas só ordena
+    os candidatos que sobram depois do np.partition.
+    """
+    n = len(prio)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    cand = np.arange(n)
+    if n > k:
+        corte = np.partition(prio, n - k)[n - k]  # k-ésima maior prioridade
+        acima = prio > corte
+        falta = k - int(acima.sum())
+
+        dias_empate = dias[prio == corte]
+        corte_dias = np.partition(dias_empate, len(dias_empate) - falta)[len(dias_empate) - falta]
+
+        cand = np.flatnonzero(acima | ((prio == corte) & (dias >= corte_dias)))
+
+    ordem = np.lexsort((cand, -dias[cand], -prio[cand]))
+    return cand[ordem][:k]
+
+
+@rastrear()
 def gerar_lista_pontual_por_status_real(
     st,
     spreadsheet_id: str,
@@ -207,14 +326,57 @@ def gerar_lista_pontual_por_status_real(
     if not status_escolhido:
         raise ValueError("Status escolhido vazio.")
 
-    gc = _get_gspread_client_from_streamlit_secrets(st)
-    sh = gc.open_by_key(spreadsheet_id)
-    ws_crm = sh.worksheet(ABA_CRM)
+    # Índice do snapshot local do CRM (só remonta se a planilha mudou)
+    return selecionar_do_indice(indice_elegiveis(st, spreadsheet_id), status_escolhido, total, campanha)
+
+
+def selecionar_do_indice(
+    indice: IndiceElegiveis,
+    status_escolhido: str,
+    total: int = 37,
+    campanha: str = "",
+    hoje=None,
+) -> pd.DataFrame:
+    """
+    Parte pura do gerar_lista_pontual_por_status_real: a fila do status no
+    índice já está ordenada, só pega os 'total' primeiros livres em 'hoje'.
+    """
+    df = indice.df
+    for c in ["STATUS", "WHATSAPP", "NOME", "PROXIMO CONTATO PERMITIDO"]:
+        if c not in df.columns:
+            raise ValueError(f"CRM_GERAL: coluna '{c}' não encontrada.")
+
+    pos = indice.top_k_status(status_escolhido, int(total), hoje=hoje)
+    return _montar_lista(df.iloc[pos], campanha)
+
+
+def _montar_lista(df: pd.DataFrame, campanha: str) -> pd.DataFrame:
+    # Monta DF final no padrão do app
+    out = pd.DataFrame(
+        {
+            "whatsapp": normalizar_series(df["WHATSAPP"]),
+            "nome": df["NOME"].astype(str).str.strip(),
+            "status": df["STATUS"].astype(str).str.strip(),
+            "campanha": ("" if campanha is None else str(campanha).strip()),
+            "enviado": False,
+        }
+    )
+
+    return out.reset_index(drop=True)
 
-    # Lê CRM inteiro (tabela)
-    records = _retry_quota(lambda: ws_crm.get_all_records())
-    df = pd.DataFrame(records)
 
+def selecionar_por_status(
+    df: pd.DataFrame,
+    status_escolhido: str,
+    total: int = 37,
+    campanha: str = "",
+    hoje=None,
+) -> pd.DataFrame:
+    """
+    Mesma seleção do gerar_lista_pontual_por_status_real, sem índice: recebe
+    o CRM_GERAL (formato do Sheets) e devolve a lista no padrão do app
+    (usada pelo mock_backend). Não altera df.
+    """
     # Colunas esperadas do CRM
     col_status = "STATUS"
     col_wpp = "WHATSAPP"
@@ -227,47 +389,35 @@ def gerar_lista_pontual_por_status_real(
         if c not in df.columns:
             raise ValueError(f"CRM_GERAL: coluna '{c}' não encontrada.")
 
-    hoje = date.today()
+    hoje = pd.Timestamp(hoje or date.today())
 
     # Filtra por status
-    df["__status"] = df[col_status].astype(str).str.strip()
-    df = df[df["__status"].str.upper() == status_escolhido.upper()].copy()
+    status = df[col_status].astype(str).str.strip()
+    df = df[status.str.upper() == status_escolhido.upper()]
+    status = status.loc[df.index]
 
     # Filtra cooldown: PROXIMO CONTATO PERMITIDO <= hoje (ou vazio = pode)
-    df["__prox_date"] = df[col_prox].apply(_parse_date_any)
-    df = df[(df["__prox_date"].isna()) | (df["__prox_date"] <= hoje)].copy()
+    prox = _parse_dates_series(df[col_prox])
+
+    # Tira whatsapp inválido (fora da regra de telefones.py)
+    wpp = normalizar_series(df[col_wpp])
 
-    # Tira whatsapp inválido
-    df["__wpp"] = df[col_wpp].apply(_digits_only)
-    df = df[df["__wpp"].astype(str).str.len() >= 10].copy()
+    ok = (prox.isna() | (prox <= hoje)) & wpp.ne("")
+    df = df[ok]
 
-    # Ordena para pegar “os melhores” (sem aleatoriedade):
+    # Pega “os melhores” (sem aleatoriedade):
     # prioridade DESC, dias_inatividade DESC
+    n = len(df)
     if col_prio in df.columns:
-        df["__prio"] = pd.to_numeric(df[col_prio], errors="coerce").fillna(0)
+        prio = pd.to_numeric(df[col_prio], errors="coerce").fillna(0).to_numpy(dtype=float)
     else:
-        df["__prio"] = 0
+        prio = np.zeros(n)
 
     if col_dias in df.columns:
-        df["__dias"] = pd.to_numeric(df[col_dias], errors="coerce").fillna(0)
+        dias = pd.to_numeric(df[col_dias], errors="coerce").fillna(0).to_numpy(dtype=float)
     else:
-        df["__dias"] = 0
-
-    df = df.sort_values(["__prio", "__dias"], ascending=[False, False])
-
-    # Corta no total desejado
-    df = df.head(int(total)).copy()
+        dias = np.zeros(n)
 
-    # Monta DF final no padrão do app
-    out = pd.DataFrame(
-        {
-            "whatsapp": df["__wpp"],
-            "nome": df[col_nome].astype(str).str.strip(),
-            "status": df["__status"],
-            "campanha": ("" if campanha is None else str(campanha).strip()),
-            "enviado": False,
-        }
-    )
-
-    return out.reset_index(drop=True)
+    # Corta no total desejado (top-k parcial, sem ordenar tudo)
+    return _montar_lista(df.iloc[_top_k(prio, dias, int(total))], campanha)
 
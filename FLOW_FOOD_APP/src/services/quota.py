@@ -0,0 +1,211 @@
+# src/services/quota.py
+from __future__ import annotations
+
+import random
+import threading
+import time
+
+from gspread.exceptions import APIError
+
+from src.services.tracing import contar_linhas, span
+from src.config import (
+    SHEETS_ESCRITAS_POR_MINUTO,
+    SHEETS_LEITURAS_POR_MINUTO,
+    SHEETS_MAX_TENTATIVAS,
+)
+
+
+LEITURA = "leitura"
+ESCRITA = "escrita"
+
+
+class QuotaEsgotadaError(Exception):
+    """
+    A chamada ao Sheets continuou tomando 429 depois de todas as tentativas.
+    """
+
+
+def _status_http(e: APIError):
+    code = getattr(e, "code", None)
+    if code is None:
+        code = getattr(getattr(e, "response", None), "status_code", None)
+    return code
+
+
+def eh_erro_de_quota(e: Exception) -> bool:
+    if not isinstance(e, APIError):
+        return False
+    if _status_http(e) == 429:
+        return True
+    msg = str(e)
+    return "429" in msg or "Quota exceeded" in msg or "RESOURCE_EXHAUSTED" in msg
+
+
+def eh_erro_transitorio(e: Exception) -> bool:
+    """
+    Vale tentar de novo mais tarde: cota, 5xx do Google ou rede.
+    O resto (célula protegida, cabeçalho faltando, dado ruim) não melhora sozinho.
+    """
+    if isinstance(e, (QuotaEsgotadaError, OSError)):
+        return True  # requests/urllib3: ConnectionError/Timeout são OSError
+    if not isinstance(e, APIError):
+        return False
+    code = _status_http(e)
+    return eh_erro_de_quota(e) or (isinstance(code, int) and 500 <= code < 600)
+
+
+def _retry_after(e: APIError) -> float | None:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    valor = headers.get("Retry-After")
+    try:
+        return max(0.0, float(valor)) if valor is not None else None
+    except (TypeError, ValueError):
+        return None  # formato data HTTP: cai no backoff normal
+
+
+class _Bucket:
+    """
+    Token bucket com rajada 'capacidade' e reposição calibrada para nunca
+    passar de 'por_minuto' em qualquer janela de 60 s.
+    """
+
+    def __init__(self, por_minuto: int):
+        por_minuto = max(1, int(por_minuto))
+        self.capacidade = max(1, por_minuto // 4)
+        self.por_segundo = max(1, por_minuto - self.capacidade) / 60.0
+        self.tokens = float(self.capacidade)
+        self.ultimo = time.monotonic()
+
+    def tentar(self, agora: float) -> float:
+        """Consome 1 token; devolve 0 ou quantos segundos faltam para ter um."""
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.por_segundo)
+        self.ultimo = agora
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.por_segundo
+
+
+class LimitadorQuota:
+    """
+    Limitador único do processo para a API do Sheets.
+
+    - um bucket para leituras e outro para escritas (cotas separadas no Sheets)
+    - escrita tem prioridade: leituras esperam enquanto houver escrita na fila
+    - 429: respeita Retry-After (ou backoff exponencial com jitter) e pausa
+      todo mundo, não só quem tomou o erro
+    - esgotou as tentativas: QuotaEsgotadaError
+    """
+
+    def __init__(
+        self,
+        leituras_por_minuto: int = SHEETS_LEITURAS_POR_MINUTO,
+        escritas_por_minuto: int = SHEETS_ESCRITAS_POR_MINUTO,
+        max_tentativas: int = SHEETS_MAX_TENTATIVAS,
+        backoff_base: float = 1.0,
+        backoff_max: float = 32.0,
+    ):
+        self._cond = threading.Condition()
+        self._buckets = {
+            LEITURA: _Bucket(leituras_por_minuto),
+            ESCRITA: _Bucket(escritas_por_minuto),
+        }
+        self._escritas_na_fila = 0
+        self._pausa_ate = 0.0
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._stats = {
+            "chamadas": 0,
+            "chamadas_com_espera": 0,
+            "respostas_429": 0,
+            "esgotadas": 0,
+            "tempo_espera_s": 0.0,
+        }
+
+    # -------------------------
+    # fila / tokens
+    # -------------------------
+    def _adquirir(self, tipo: str) -> None:
+        inicio = time.monotonic()
+        with self._cond:
+            if tipo == ESCRITA:
+                self._escritas_na_fila += 1
+            try:
+                while True:
+                    agora = time.monotonic()
+                    if agora < self._pausa_ate:
+                        self._cond.wait(self._pausa_ate - agora)
+                        continue
+                    if tipo == LEITURA and self._escritas_na_fila > 0:
+                        self._cond.wait(0.05)
+                        continue
+                    falta = self._buckets[tipo].tentar(agora)
+                    if falta <= 0:
+                        break
+                    self._cond.wait(falta)
+            finally:
+                if tipo == ESCRITA:
+                    self._escritas_na_fila -= 1
+                    self._cond.notify_all()
+
+            esperou = time.monotonic() - inicio
+            self._stats["chamadas"] += 1
+            if esperou > 0.001:
+                self._stats["chamadas_com_espera"] += 1
+                self._stats["tempo_espera_s"] += esperou
+
+    def _pausar(self, segundos: float) -> None:
+        with self._cond:
+            self._pausa_ate = max(self._pausa_ate, time.monotonic() + segundos)
+            self._stats["respostas_429"] += 1
+
+    def _backoff(self, tentativa: int) -> float:
+        teto = min(self.backoff_max, self.backoff_base * (2 ** tentativa))
+        return teto / 2 + random.uniform(0, teto / 2)
+
+    # -------------------------
+    # API pública
+    # -------------------------
+    def executar(self, fn, tipo: str = LEITURA):
+        """
+        Roda fn() dentro da cota. Erros que não são 429 sobem direto.
+        """
+        ultimo_erro = None
+        for tentativa in range(self.max_tentativas):
+            self._adquirir(tipo)
+            try:
+                return fn()
+            except APIError as e:
+                if not eh_erro_de_quota(e):
+                    raise
+                ultimo_erro = e
+                espera = _retry_after(e)
+                self._pausar(espera if espera is not None else self._backoff(tentativa))
+
+        with self._cond:
+            self._stats["esgotadas"] += 1
+        raise QuotaEsgotadaError(
+            f"Cota do Google Sheets esgotada após {self.max_tentativas} tentativas."
+        ) from ultimo_erro
+
+    def estatisticas(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+        stats["tempo_espera_s"] = round(stats["tempo_espera_s"], 3)
+        return stats
+
+
+limitador = LimitadorQuota()
+
+
+def com_quota(fn, tipo: str = LEITURA, nome: str | None = None):
+    """
+    Atalho para o limitador do processo: com_quota(lambda: ws.get_all_values()).
+    Cada chamada vira um span 'sheets' (duração, linhas, bytes).
+    """
+    with span(nome or getattr(fn, "__name__", "sheets"), "sheets", cota=tipo) as s:
+        res = limitador.executar(fn, tipo)
+        s["linhas"] = contar_linhas(res)
+        return res
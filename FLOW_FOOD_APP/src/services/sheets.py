@@ -1,139 +1,130 @@
-import streamlit as st
+import numpy as np
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
-from urllib.parse import quote
 from datetime import date
 
-def get_gspread_client():
-    creds_info = st.secrets["gcp_service_account"]
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    credentials = Credentials.from_service_account_info(creds_info, scopes=scopes)
-    return gspread.authorize(credentials)
+from src.services.snapshot import baixar_aba
+from src.services.telefones import links_whatsapp
+from src.services.tipos import ESQUEMA_LISTA, compactar
+from src.services.tracing import rastrear
 
 
-@st.cache_data(ttl=60)
-def load_sheet_df(worksheet_name: str) -> pd.DataFrame:
-    client = get_gspread_client()
-    sheet_id = st.secrets["SPREADSHEET_ID"]
-    sh = client.open_by_key(sheet_id)
-    ws = sh.worksheet(worksheet_name)
+def _qtd_regra(valor) -> int:
+    try:
+        qtd_val = str(valor).strip()
+        return int(float(qtd_val)) if qtd_val else 0
+    except (ValueError, TypeError):
+        return 0
 
-    data = ws.get_all_values()
-    if not data:
-        return pd.DataFrame()
 
-    headers = data[0]
-    rows = data[1:]
+def _grupos_elegiveis(df_crm: pd.DataFrame, hoje) -> dict:
+    """
+    STATUS -> posições (ordem do CRM) da base elegível de hoje.
+    """
+    # uma máscara só, sem copiar o CRM
+    elegivel = np.ones(len(df_crm), dtype=bool)
 
-    df = pd.DataFrame(rows, columns=headers)
+    if "ELEGIVEL" in df_crm.columns:
+        elegivel &= df_crm["ELEGIVEL"].astype(str).str.upper().str.strip().eq("SIM").to_numpy()
 
-    valid_cols = [col for col in df.columns if str(col).strip() != ""]
-    df = df[valid_cols]
+    if "PROXIMO CONTATO PERMITIDO" in df_crm.columns:
+        prox = pd.to_datetime(df_crm["PROXIMO CONTATO PERMITIDO"], errors="coerce")
+        elegivel &= (prox.isna() | (prox <= hoje)).to_numpy()
 
-    df.columns = [str(c).strip() for c in df.columns]
-    return df
+    pos_base = np.flatnonzero(elegivel)
 
+    # STATUS normalizado uma vez + posições por status (ordem original)
+    status_base = df_crm["STATUS"].iloc[pos_base].astype(str).str.strip().to_numpy()
+    grupos = pd.Series(status_base).groupby(status_base, sort=False).indices
+    return {s: pos_base[i] for s, i in grupos.items()}
 
-def make_wa_link(whatsapp_num: str, message: str) -> str:
-    num = "".join([c for c in str(whatsapp_num) if c.isdigit()])
-    if not num.startswith("55"):
-        num = "55" + num
-    return f"https://wa.me/{num}?text={quote(message or '')}"
 
-def gerar_lista_fixa(df_crm: pd.DataFrame, df_cfg: pd.DataFrame) -> pd.DataFrame:
+@rastrear()
+def gerar_lista_fixa(df_crm: pd.DataFrame, df_cfg: pd.DataFrame, indice=None) -> pd.DataFrame:
+    """
+    Monta a lista fixa do dia: para cada regra (STATUS, QTD POR DIA) da
+    CONFIGURACAO sorteia até QTD clientes elegíveis daquele status.
+    Com indice (indice_elegiveis), usa as filas por status já montadas
+    em vez de varrer o CRM. Não altera df_crm.
+    """
     hoje = pd.to_datetime(date.today())
 
     # ✅ seed diário: muda a cada dia, mas fica estável no dia
     seed_diario = int(pd.to_datetime(date.today()).strftime("%Y%m%d"))
 
-    if "PROXIMO CONTATO PERMITIDO" in df_crm.columns:
-        df_crm["PROXIMO CONTATO PERMITIDO"] = pd.to_datetime(
-            df_crm["PROXIMO CONTATO PERMITIDO"], errors="coerce"
-        )
-
-    df_base = df_crm.copy()
+    regras = df_cfg.dropna(subset=["STATUS", "QTD POR DIA"])
 
-    if "ELEGIVEL" in df_base.columns:
-        df_base = df_base[df_base["ELEGIVEL"].astype(str).str.upper().str.strip().eq("SIM")]
+    if indice is not None:
+        df_crm = indice.df
 
-    if "PROXIMO CONTATO PERMITIDO" in df_base.columns:
-        df_base = df_base[
-            df_base["PROXIMO CONTATO PERMITIDO"].isna()
-            | (df_base["PROXIMO CONTATO PERMITIDO"] <= hoje)
-        ]
+        def elegiveis(status):
+            return indice.elegiveis_fixa(status, hoje)
+    else:
+        if "STATUS" not in df_crm.columns:
+            return pd.DataFrame()
+        grupos = _grupos_elegiveis(df_crm, hoje)
 
-    regras = df_cfg.dropna(subset=["STATUS", "QTD POR DIA"]).copy()
+        def elegiveis(status):
+            return grupos.get(status)
 
-    saida = []
+    # -------------------------
+    # COTAS POR STATUS
+    # -------------------------
+    picks, tamanhos, campanhas, mensagens = [], [], [], []
 
-    for _, r in regras.iterrows():
+    for r in regras.to_dict("records"):
         status = str(r["STATUS"]).strip()
-
-        try:
-            qtd_val = str(r["QTD POR DIA"]).strip()
-            qtd = int(float(qtd_val)) if qtd_val else 0
-        except (ValueError, TypeError):
-            qtd = 0
+        qtd = _qtd_regra(r["QTD POR DIA"])
 
         if qtd <= 0:
             continue
 
-        campanha = str(r.get("CAMPANHA", "")).strip()
-        mensagem = str(r.get("MENSAGEM", "")).strip()
-
-        if "STATUS" not in df_base.columns:
-            continue
-
-        df_s = df_base[df_base["STATUS"].astype(str).str.strip().eq(status)].copy()
-
-        if df_s.empty:
+        idx = elegiveis(status)
+        if idx is None or len(idx) == 0:
             continue
 
         # ✅ ALEATORIEDADE POR STATUS (estável no dia)
-        # embaralha e pega qtd
-        if len(df_s) > 1:
-            df_s = df_s.sample(frac=1, random_state=seed_diario).reset_index(drop=True)
-
-        df_pick = df_s.head(qtd).copy()
+        # mesmo sorteio do sample(frac=1, random_state=seed), mas só
+        # permutando posições inteiras em vez de embaralhar o DataFrame
+        if len(idx) > 1:
+            idx = idx[np.random.RandomState(seed_diario).permutation(len(idx))[:qtd]]
+        else:
+            idx = idx[:qtd]
+
+        picks.append(idx)
+        tamanhos.append(len(idx))
+        campanhas.append(str(r.get("CAMPANHA", "")).strip())
+        mensagens.append(str(r.get("MENSAGEM", "")).strip())
+
+    if not picks:
+        return pd.DataFrame()
 
-        df_out = pd.DataFrame({
-            "WHATSAPP": df_pick.get("WHATSAPP"),
-            "NOME": df_pick.get("NOME"),
-            "TOTAL_PEDIDOS": df_pick.get("TOTAL DE PEDIDOS"),
-            "DIAS_INATIVIDADE": df_pick.get("DIAS DE INATIVIDADE"),
-            "STATUS": df_pick.get("STATUS"),
-            "PRIORIDADE": df_pick.get("PRIORIDADE"),
-            "CAMPANHA": campanha,
-            "MENSAGEM": mensagem,
-        })
+    df_pick = df_crm.iloc[np.concatenate(picks)].reset_index(drop=True)
 
-        df_out["LINK"] = [make_wa_link(w, mensagem) for w in df_out["WHATSAPP"].tolist()]
-        df_out["ENVIADO?"] = False
+    def col(nome):
+        return df_pick[nome] if nome in df_pick.columns else None
 
-        saida.append(df_out)
+    df_out = pd.DataFrame({
+        "WHATSAPP": col("WHATSAPP"),
+        "NOME": col("NOME"),
+        "TOTAL_PEDIDOS": col("TOTAL DE PEDIDOS"),
+        "DIAS_INATIVIDADE": col("DIAS DE INATIVIDADE"),
+        "STATUS": col("STATUS"),
+        "PRIORIDADE": col("PRIORIDADE"),
+        "CAMPANHA": np.repeat(np.array(campanhas, dtype=object), tamanhos),
+        "MENSAGEM": np.repeat(np.array(mensagens, dtype=object), tamanhos),
+    })
 
-    if not saida:
-        return pd.DataFrame()
+    # WHATSAPP já vem canônico da carga; número inválido fica sem link
+    df_out["LINK"] = links_whatsapp(df_out["WHATSAPP"], df_out["MENSAGEM"])
+    df_out["ENVIADO?"] = False
 
-    return pd.concat(saida, ignore_index=True)
+    return df_out
 
+@rastrear()
 def ler_lista_pontual_sheets(st, spreadsheet_id: str) -> pd.DataFrame:
-    # Reusa a função get_gspread_client existente (que já usa st.secrets)
-    # Apenas certificando que ela está acessível ou criando uma versão compatível se necessário.
-    # Como get_gspread_client já está definida no topo deste arquivo, podemos usá-la se adaptarmos a chamada.
-    # Mas a função existente não recebe 'st' como argumento, ela pega st.secrets direto.
-    # A função duplicada recebia st. Vamos usar a lógica interna aqui.
-    
-    client = get_gspread_client()
-    sh = client.open_by_key(spreadsheet_id)
-
-    ws = sh.worksheet("LISTA_PONTUAL")
-    # get_all_records pode falhar, vamos usar get_all_values igual fizemos antes
-    data = ws.get_all_values()
+    # Leitura ao vivo (sem snapshot), só com as colunas da lista
+    # (COLUNAS_LEITURA["LISTA_PONTUAL"]); pool compartilhado por baixo
+    data = baixar_aba(st, spreadsheet_id, "LISTA_PONTUAL")
     
     if not data:
         return pd.DataFrame(columns=["whatsapp", "nome", "status", "campanha", "enviado"])
@@ -165,8 +156,9 @@ def ler_lista_pontual_sheets(st, spreadsheet_id: str) -> pd.DataFrame:
     # Normaliza enviado para boolean
     # Precisamos tratar valores vazios/strings
     df["enviado"] = df["enviado"].astype(str).str.upper().isin(["TRUE", "VERDADEIRO", "SIM", "1"])
-    
-    return df[["whatsapp", "nome", "status", "campanha", "enviado"]]
+
+    # tipos compactos (telefone Int64, status/campanha category)
+    return compactar(df[["whatsapp", "nome", "status", "campanha", "enviado"]], ESQUEMA_LISTA, nome="LISTA_PONTUAL")
 
 
 
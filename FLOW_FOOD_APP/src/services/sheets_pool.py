@@ -0,0 +1,119 @@
+# src/services/sheets_pool.py
+from __future__ import annotations
+
+import threading
+
+import gspread
+from google.oauth2.service_account import Credentials
+
+from src.services.quota import com_quota
+from src.services.tracing import instalar_hook_http, span
+
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+# ==========================
+# POOL (processo inteiro)
+# ==========================
+# Um cliente por conta de serviço. O gspread usa uma AuthorizedSession
+# (requests.Session), então reaproveitar o cliente mantém o token
+# (com refresh automático) e as conexões HTTP abertas entre reruns.
+_lock = threading.RLock()
+_clients: dict[str, gspread.Client] = {}
+_spreadsheets: dict[tuple[str, str], gspread.Spreadsheet] = {}
+_worksheets: dict[tuple[str, str, str], gspread.Worksheet] = {}
+
+
+def _chave_conta(info: dict) -> str:
+    return str(info.get("client_email") or info.get("private_key_id") or "default")
+
+
+def _conta_e_cliente(st) -> tuple[str, gspread.Client]:
+    info = dict(st.secrets["gcp_service_account"])
+    conta = _chave_conta(info)
+
+    with _lock:
+        gc = _clients.get(conta)
+        if gc is None:
+            with span("auth", "auth"):
+                creds = Credentials.from_service_account_info(info, scopes=SCOPES)
+                gc = gspread.authorize(creds)
+            instalar_hook_http(gc)
+            _clients[conta] = gc
+    return conta, gc
+
+
+def registrar_cliente(client_email: str, client) -> None:
+    """
+    Usa um cliente já pronto para a conta (ex.: backend fake nos benchmarks).
+    """
+    with _lock:
+        _clients[client_email] = client
+        for k in [k for k in _spreadsheets if k[0] == client_email]:
+            del _spreadsheets[k]
+        for k in [k for k in _worksheets if k[0] == client_email]:
+            del _worksheets[k]
+
+
+def get_client(st) -> gspread.Client:
+    """
+    Retorna o cliente gspread compartilhado para a conta de st.secrets.
+    Só autentica na primeira chamada do processo.
+    """
+    return _conta_e_cliente(st)[1]
+
+
+def get_spreadsheet(st, spreadsheet_id: str) -> gspread.Spreadsheet:
+    """
+    Handle da planilha em cache (evita o open_by_key / metadata a cada clique).
+    """
+    conta, gc = _conta_e_cliente(st)
+    key = (conta, spreadsheet_id)
+
+    with _lock:
+        sh = _spreadsheets.get(key)
+    if sh is not None:
+        return sh
+
+    sh = com_quota(lambda: gc.open_by_key(spreadsheet_id), nome="open_by_key")
+    with _lock:
+        return _spreadsheets.setdefault(key, sh)
+
+
+def get_worksheet(st, spreadsheet_id: str, worksheet_name: str) -> gspread.Worksheet:
+    """
+    Handle da aba em cache. Se a aba não existir, o WorksheetNotFound
+    sobe normalmente e nada fica em cache.
+    """
+    conta, _ = _conta_e_cliente(st)
+    key = (conta, spreadsheet_id, worksheet_name)
+
+    with _lock:
+        ws = _worksheets.get(key)
+    if ws is not None:
+        return ws
+
+    sh = get_spreadsheet(st, spreadsheet_id)
+    ws = com_quota(lambda: sh.worksheet(worksheet_name), nome=f"worksheet:{worksheet_name}")
+    with _lock:
+        return _worksheets.setdefault(key, ws)
+
+
+def invalidar_handles(spreadsheet_id: str | None = None) -> None:
+    """
+    Descarta handles em cache (ex.: aba renomeada/recriada).
+    Sem argumento limpa tudo, menos os clientes autenticados.
+    """
+    with _lock:
+        if spreadsheet_id is None:
+            _spreadsheets.clear()
+            _worksheets.clear()
+            return
+
+        for k in [k for k in _spreadsheets if k[1] == spreadsheet_id]:
+            del _spreadsheets[k]
+        for k in [k for k in _worksheets if k[1] == spreadsheet_id]:
+            del _worksheets[k]
@@ -0,0 +1,511 @@
+# src/services/snapshot.py
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config import CACHE_DIR, COLUNAS_LEITURA, SNAPSHOT_CHECK_SECONDS
+from src.services.quota import com_quota
+from src.services.sheets_pool import get_spreadsheet, get_worksheet
+from src.services.telefones import digitos_series
+from src.services.tipos import ESQUEMAS, compactar, tipar_coluna
+from src.services.tracing import rastrear
+
+
+# ==========================
+# SNAPSHOT LOCAL DAS ABAS (SQLite)
+# ==========================
+# Uma base SQLite por planilha em CACHE_DIR. Cada aba vira uma tabela
+# (colunas c0..cN, nomes reais no _meta) + a revisão do Drive (modifiedTime)
+# em que foi baixada.
+#
+# Sync:
+# - checou há menos de SNAPSHOT_CHECK_SECONDS -> usa o local, sem API
+# - revisão da planilha igual à do snapshot   -> usa o local (1 chamada leve)
+# - revisão mudou / sem snapshot               -> pull da aba
+#
+# Abas em COLUNAS_LEITURA só baixam as colunas listadas: o cabeçalho
+# (guardado em _cabecalhos) resolve nome -> letra e o pull pede só
+# aquelas faixas ('CRM_GERAL'!A:C, ...). Se o cabeçalho mudou desde a
+# última vez, refaz o pedido com as letras novas.
+#
+# O SQLite guarda as strings como vieram; a cópia em memória (a que é
+# devolvida) já sai com os tipos compactos de src/services/tipos.py.
+# O DataFrame devolvido é compartilhado entre sessões: trate como somente leitura.
+
+_lock = threading.Lock()
+_locks: dict[tuple[str, str], threading.Lock] = {}
+_memoria: dict[tuple[str, str], tuple[str, pd.DataFrame]] = {}
+_versoes: dict[tuple[str, str], int] = {}
+
+
+def _lock_da_aba(key: tuple[str, str]) -> threading.Lock:
+    # um lock por (planilha, aba): um pull grande não trava as outras abas
+    with _lock:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _db_path(spreadsheet_id: str) -> str:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    nome = re.sub(r"[^A-Za-z0-9_-]", "_", spreadsheet_id)
+    return os.path.join(CACHE_DIR, f"{nome}.sqlite")
+
+
+def _tabela(aba: str) -> str:
+    return "aba_" + re.sub(r"\W", "_", aba)
+
+
+def _connect(spreadsheet_id: str) -> sqlite3.Connection:
+    con = sqlite3.connect(_db_path(spreadsheet_id), timeout=30)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS _meta ("
+        " aba TEXT PRIMARY KEY, revisao TEXT, colunas TEXT,"
+        " linhas INTEGER, checado_em REAL)"
+    )
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS _cabecalhos (aba TEXT PRIMARY KEY, colunas TEXT)"
+    )
+    return con
+
+
+def _revisao_planilha(sh) -> str:
+    # gspread 6: get_lastUpdateTime() sempre consulta o Drive;
+    # gspread 5: a property lastUpdateTime já consulta.
+    getter = getattr(sh, "get_lastUpdateTime", None)
+    if callable(getter):
+        return str(com_quota(getter, nome="revisao"))
+    return str(com_quota(lambda: sh.lastUpdateTime, nome="revisao"))
+
+
+def values_to_df(data: list[list]) -> pd.DataFrame:
+    """
+    Converte o retorno de get_all_values() em DataFrame
+    (header na linha 1, descarta colunas sem nome, strip nos nomes).
+    """
+    if not data:
+        return pd.DataFrame()
+
+    headers = data[0]
+    rows = data[1:]
+
+    df = pd.DataFrame(rows, columns=headers)
+
+    valid_cols = [col for col in df.columns if str(col).strip() != ""]
+    df = df[valid_cols]
+
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def _ler_meta(con, aba: str):
+    return con.execute(
+        "SELECT revisao, colunas, checado_em FROM _meta WHERE aba = ?", (aba,)
+    ).fetchone()
+
+
+def _ler_local(con, aba: str, colunas: list[str]) -> pd.DataFrame:
+    if not colunas:
+        return pd.DataFrame()
+    df = pd.read_sql_query(f'SELECT * FROM "{_tabela(aba)}" ORDER BY rowid', con)
+    df.columns = colunas
+    return df
+
+
+def _gravar_local(con, aba: str, df: pd.DataFrame, revisao: str) -> None:
+    tabela = _tabela(aba)
+    colunas = list(df.columns)
+
+    con.execute(f'DROP TABLE IF EXISTS "{tabela}"')
+    if colunas:
+        df_sql = df.copy(deep=False)
+        df_sql.columns = [f"c{i}" for i in range(len(colunas))]
+        df_sql.to_sql(tabela, con, index=False, chunksize=5000)
+
+    con.execute(
+        "INSERT OR REPLACE INTO _meta (aba, revisao, colunas, linhas, checado_em)"
+        " VALUES (?, ?, ?, ?, ?)",
+        (aba, revisao, json.dumps(colunas), len(df), time.time()),
+    )
+    con.commit()
+
+
+@rastrear()
+def ler_aba(st, spreadsheet_id: str, aba: str, forcar: bool = False) -> pd.DataFrame:
+    """
+    Lê uma aba via snapshot local, só baixando do Sheets quando a
+    revisão da planilha mudou (ou forcar=True).
+    """
+    return ler_abas(st, spreadsheet_id, [aba], forcar=forcar)[aba]
+
+
+@rastrear()
+def ler_abas(st, spreadsheet_id: str, abas: list[str], forcar: bool = False) -> dict[str, pd.DataFrame]:
+    """
+    Várias abas da mesma planilha de uma vez: no máximo 1 checagem de
+    revisão (vale para a planilha toda) e 1 values_batch_get com todas as
+    abas que precisam ser baixadas. Retorna {aba: DataFrame tipado}.
+    """
+    abas = list(dict.fromkeys(abas))
+    keys = sorted((spreadsheet_id, aba) for aba in abas)  # ordem fixa: sem deadlock
+    locks = [_lock_da_aba(k) for k in keys]
+
+    for lk in locks:
+        lk.acquire()
+    con = _connect(spreadsheet_id)
+    try:
+        agora = time.time()
+        out: dict[str, pd.DataFrame] = {}
+        checar: dict[str, tuple] = {}
+
+        for aba in abas:
+            meta = _ler_meta(con, aba)
+            if meta and _projecao_mudou(con, aba, meta[1]):
+                meta = None  # snapshot com outras colunas: baixa de novo
+            if meta and not forcar:
+                revisao_local, colunas_json, checado_em = meta
+                if agora - (checado_em or 0) < SNAPSHOT_CHECK_SECONDS:
+                    out[aba] = _da_memoria(con, (spreadsheet_id, aba), aba, revisao_local, colunas_json)
+                    continue
+            checar[aba] = meta
+
+        if not checar:
+            return out
+
+        revisao = _revisao_planilha(get_spreadsheet(st, spreadsheet_id))
+
+        baixar = []
+        for aba, meta in checar.items():
+            if meta and not forcar and meta[0] == revisao:
+                con.execute("UPDATE _meta SET checado_em = ? WHERE aba = ?", (agora, aba))
+                out[aba] = _da_memoria(con, (spreadsheet_id, aba), aba, meta[0], meta[1])
+            else:
+                baixar.append(aba)
+        con.commit()
+
+        # pull (sem snapshot ou revisão nova) das abas que faltam
+        if baixar:
+            for aba, values in zip(baixar, _baixar_abas(st, spreadsheet_id, baixar, con)):
+                df = values_to_df(values)
+                _gravar_local(con, aba, df, revisao)
+                df = _tipar(aba, df)
+                _publicar((spreadsheet_id, aba), revisao, df)
+                out[aba] = df
+
+        return {aba: out[aba] for aba in abas}
+    finally:
+        con.close()
+        for lk in reversed(locks):
+            lk.release()
+
+
+def _baixar_abas(st, spreadsheet_id: str, abas: list[str], con) -> list[list[list]]:
+    """
+    Valores de várias abas num values_batch_get só (mesmo formato do
+    get_all_values: linhas completadas com "" até a largura). Abas em
+    COLUNAS_LEITURA voltam só com as colunas listadas.
+    """
+    projecoes = {aba: COLUNAS_LEITURA[aba] for aba in abas if COLUNAS_LEITURA.get(aba)}
+
+    if len(abas) == 1 and not projecoes:
+        ws = get_worksheet(st, spreadsheet_id, abas[0])
+        return [com_quota(ws.get_all_values, nome=f"get_all_values:{abas[0]}")]
+
+    # 1ª rodada: abas inteiras + (projetadas) cabeçalho e as colunas
+    # pelas letras do cabeçalho guardado
+    guardados = {aba: _ler_cabecalho(con, aba) for aba in projecoes}
+    pedidos = {}
+    for aba in abas:
+        if aba in projecoes:
+            pedidos[aba] = [f"'{aba}'!1:1"] + _faixas(aba, guardados[aba], projecoes[aba])
+        else:
+            pedidos[aba] = [f"'{aba}'"]
+    res = _batch_get(st, spreadsheet_id, pedidos)
+
+    out: dict[str, list[list]] = {}
+    refazer: dict[str, list[str]] = {}
+    for aba in abas:
+        if aba not in projecoes:
+            out[aba] = _completar(res[aba][0])
+            continue
+
+        cabecalho = [str(h).strip() for h in (res[aba][0][:1] or [[]])[0]]
+        if cabecalho == guardados[aba]:
+            out[aba] = _juntar_colunas(res[aba][1:])
+        else:
+            # 1ª leitura ou colunas mudaram de lugar: letras novas
+            _gravar_cabecalho(con, aba, cabecalho)
+            refazer[aba] = _faixas(aba, cabecalho, projecoes[aba])
+
+    if refazer:
+        res = _batch_get(st, spreadsheet_id, refazer)
+        for aba in refazer:
+            out[aba] = _juntar_colunas(res[aba])
+
+    return [out[aba] for aba in abas]
+
+
+def baixar_aba(st, spreadsheet_id: str, aba: str) -> list[list]:
+    """
+    Valores atuais de uma aba direto do Sheets (sem snapshot), com a
+    projeção de COLUNAS_LEITURA. Para abas que mudam a cada uso
+    (ex.: LISTA_PONTUAL).
+    """
+    con = _connect(spreadsheet_id)
+    try:
+        return _baixar_abas(st, spreadsheet_id, [aba], con)[0]
+    finally:
+        con.close()
+
+
+def _batch_get(st, spreadsheet_id: str, pedidos: dict[str, list[str]]) -> dict[str, list[list[list]]]:
+    # todas as faixas de todas as abas numa chamada; devolve por aba
+    faixas = [a1 for lista in pedidos.values() for a1 in lista]
+    if not faixas:
+        return {aba: [] for aba in pedidos}
+
+    sh = get_spreadsheet(st, spreadsheet_id)
+    res = com_quota(
+        lambda: sh.values_batch_get(faixas),
+        nome="values_batch_get:" + ",".join(pedidos),
+    )
+    valores = [vr.get("values") or [] for vr in res.get("valueRanges", [])]
+
+    out, i = {}, 0
+    for aba, lista in pedidos.items():
+        out[aba] = valores[i:i + len(lista)]
+        i += len(lista)
+    return out
+
+
+def _letra(col: int) -> str:
+    # 0-based -> A, B, ..., Z, AA, ...
+    letras = ""
+    col += 1
+    while col:
+        col, r = divmod(col - 1, 26)
+        letras = chr(65 + r) + letras
+    return letras
+
+
+def _faixas(aba: str, cabecalho: list[str] | None, colunas: list[str]) -> list[str]:
+    """
+    Colunas pedidas -> faixas A1 (colunas vizinhas viram uma faixa só).
+    Coluna que não está no cabeçalho é ignorada.
+    """
+    if not cabecalho:
+        return []
+    pos = {nome: i for i, nome in enumerate(cabecalho) if nome}
+    idx = sorted({pos[c] for c in colunas if c in pos})
+
+    faixas, ini = [], None
+    for j, i in enumerate(idx):
+        if ini is None:
+            ini = i
+        if j + 1 == len(idx) or idx[j + 1] != i + 1:
+            faixas.append(f"'{aba}'!{_letra(ini)}:{_letra(i)}")
+            ini = None
+    return faixas
+
+
+def _juntar_colunas(blocos: list[list[list]]) -> list[list]:
+    # faixas lado a lado -> linhas (cabeçalho na 1ª), cada faixa completada
+    # até a própria largura
+    if not blocos:
+        return []
+    blocos = [_completar(b) for b in blocos]
+    larguras = [len(b[0]) if b else 0 for b in blocos]
+    n = max(len(b) for b in blocos)
+    linhas = []
+    for r in range(n):
+        linha = []
+        for b, w in zip(blocos, larguras):
+            linha.extend(b[r] if r < len(b) else [""] * w)
+        linhas.append(linha)
+    return linhas
+
+
+def _ler_cabecalho(con, aba: str) -> list[str] | None:
+    row = con.execute("SELECT colunas FROM _cabecalhos WHERE aba = ?", (aba,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _gravar_cabecalho(con, aba: str, cabecalho: list[str]) -> None:
+    con.execute(
+        "INSERT OR REPLACE INTO _cabecalhos (aba, colunas) VALUES (?, ?)",
+        (aba, json.dumps(cabecalho)),
+    )
+    con.commit()
+
+
+def _projecao_mudou(con, aba: str, colunas_json: str) -> bool:
+    # COLUNAS_LEITURA ganhou coluna (que existe na aba) fora do snapshot
+    projecao = COLUNAS_LEITURA.get(aba)
+    if not projecao:
+        return False
+    cabecalho = _ler_cabecalho(con, aba) or []
+    locais = set(json.loads(colunas_json or "[]"))
+    return any(c in cabecalho and c not in locais for c in projecao)
+
+
+def _completar(values: list[list]) -> list[list]:
+    # a API corta células vazias no fim de cada linha
+    largura = max((len(r) for r in values), default=0)
+    return [list(r) + [""] * (largura - len(r)) for r in values]
+
+
+def _da_memoria(con, key, aba: str, revisao: str, colunas_json: str) -> pd.DataFrame:
+    mem = _memoria.get(key)
+    if mem is not None and mem[0] == revisao:
+        return mem[1]
+
+    df = _tipar(aba, _ler_local(con, aba, json.loads(colunas_json or "[]")))
+    _publicar(key, revisao, df)
+    return df
+
+
+def _publicar(key, revisao: str, df: pd.DataFrame) -> None:
+    # frame novo em memória = versão nova (chave de cache de quem lê)
+    _memoria[key] = (revisao, df)
+    _versoes[key] = _versoes.get(key, 0) + 1
+
+
+def versao_aba(spreadsheet_id: str, aba: str) -> int:
+    """
+    Muda toda vez que a aba em memória muda (pull ou write-through).
+    Use como parte da chave de caches derivados (ex.: agregados).
+    """
+    return _versoes.get((spreadsheet_id, aba), 0)
+
+
+def _tipar(aba: str, df: pd.DataFrame) -> pd.DataFrame:
+    esquema = ESQUEMAS.get(aba)
+    return compactar(df, esquema, nome=aba) if esquema else df
+
+
+# ==========================
+# WRITE-THROUGH
+# ==========================
+@rastrear()
+def aplicar_escrita(
+    st,
+    spreadsheet_id: str,
+    aba: str,
+    linhas,
+    valores: dict[str, object],
+    conferir: tuple[str, list] | None = None,
+) -> bool:
+    """
+    Aplica no snapshot (memória + SQLite) as células que acabaram de ser
+    gravadas no Sheets, em vez de baixar a aba de novo.
+
+    linhas: número da linha na planilha (cabeçalho na 1), uma por valor.
+    valores: {coluna: valores como foram gravados (texto)}.
+    conferir: (coluna, valores atuais dela no Sheets) para garantir que o
+    snapshot está alinhado linha a linha com a planilha.
+
+    Só aplica se o snapshot foi checado há menos de SNAPSHOT_CHECK_SECONDS
+    (mesma defasagem que a leitura já aceita); senão, ou se não bater,
+    invalida e devolve False. O remendo vale só até o fim dessa janela:
+    depois a aba é baixada de novo (colunas calculadas pela planilha).
+    """
+    key = (spreadsheet_id, aba)
+    with _lock_da_aba(key):
+        con = _connect(spreadsheet_id)
+        try:
+            try:
+                ok = _aplicar(con, key, aba, np.asarray(linhas, dtype=int), valores, conferir)
+            except Exception:
+                # a escrita no Sheets já foi: aqui só não dá para remendar
+                con.rollback()
+                ok = False
+            if not ok:
+                con.execute("UPDATE _meta SET checado_em = 0 WHERE aba = ?", (aba,))
+                con.commit()
+            return ok
+        finally:
+            con.close()
+
+
+def _aplicar(con, key, aba: str, linhas: np.ndarray, valores: dict, conferir) -> bool:
+    meta = _ler_meta(con, aba)
+    mem = _memoria.get(key)
+    if meta is None or mem is None or mem[0] != meta[0]:
+        return False
+    if time.time() - (meta[2] or 0) >= SNAPSHOT_CHECK_SECONDS:
+        return False
+
+    df = mem[1]
+    pos = linhas - 2
+    if len(pos) and (pos.min() < 0 or pos.max() >= len(df)):
+        return False
+
+    esquema = ESQUEMAS.get(aba)
+    if conferir is not None:
+        col, atuais = conferir
+        if col not in df.columns or len(atuais) > len(df):
+            return False
+        atuais = list(atuais) + [""] * (len(df) - len(atuais))
+        vivo = digitos_series(tipar_coluna(esquema, col, pd.Series(atuais, dtype=object)))
+        if not (vivo.to_numpy() == digitos_series(df[col]).to_numpy()).all():
+            return False
+
+    colunas = json.loads(meta[1] or "[]")
+    valores = {c: v for c, v in valores.items() if c in colunas}
+    if not valores or not len(pos):
+        return True  # nada do que foi gravado está no snapshot
+
+    # SQLite guarda o texto como veio (rowid = posição + 1)
+    tabela = _tabela(aba)
+    for c, v in valores.items():
+        i = colunas.index(c)
+        con.executemany(
+            f'UPDATE "{tabela}" SET c{i} = ? WHERE rowid = ?',
+            zip(["" if x is None else str(x) for x in v], (pos + 1).tolist()),
+        )
+
+    # memória: cópia rasa + só as colunas tocadas copiadas (quem já tem o
+    # frame antigo continua lendo ele inteiro, sem ver meia escrita)
+    novo = df.copy(deep=False)
+    for c, v in valores.items():
+        novo[c] = _remendar(novo[c], pos, tipar_coluna(esquema, c, pd.Series(v, dtype=object)))
+
+    # a revisão continua a de antes da escrita: o checado_em não anda, então
+    # passada a janela do SNAPSHOT_CHECK_SECONDS a leitura vê revisão nova
+    # e baixa a aba (fórmulas recalculadas pela escrita, ex. PROXIMO CONTATO
+    # PERMITIDO/ELEGIVEL, e edições de terceiros que entraram nesse meio)
+    con.commit()
+    _publicar(key, meta[0], novo)
+    return True
+
+
+def _remendar(serie: pd.Series, pos: np.ndarray, novos: pd.Series) -> pd.Series:
+    serie = serie.copy()
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        novos = novos.astype(str)
+        faltam = pd.Index(novos.unique()).difference(serie.cat.categories)
+        if len(faltam):
+            serie = serie.cat.add_categories(faltam)
+    serie.iloc[pos] = novos.to_numpy()
+    return serie
+
+
+def invalidar_snapshot(spreadsheet_id: str, aba: str | None = None) -> None:
+    """
+    Força o próximo ler_aba a checar a revisão no Sheets.
+    """
+    con = _connect(spreadsheet_id)
+    try:
+        if aba is None:
+            con.execute("UPDATE _meta SET checado_em = 0")
+        else:
+            con.execute("UPDATE _meta SET checado_em = 0 WHERE aba = ?", (aba,))
+        con.commit()
+    finally:
+        con.close()
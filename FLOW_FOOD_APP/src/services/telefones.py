@@ -0,0 +1,94 @@
+# src/services/telefones.py
+from __future__ import annotations
+
+from urllib.parse import quote
+
+import pandas as pd
+
+
+# ==========================
+# TELEFONE CANÔNICO (E.164 sem o "+", ex.: 5585999998888)
+# ==========================
+# Uma regra só para o app inteiro, sempre em Series inteiras:
+#   1. só dígitos; zeros à esquerda (0 de longa distância) saem
+#   2. 12/13 dígitos começando com 55 -> tira o país; 10/11 dígitos -> nacional
+#   3. DDD: dois dígitos de 1 a 9 (11..99, sem zero)
+#   4. número: 9 dígitos começando com 9 (celular)
+#              8 dígitos começando com 6-9 -> celular sem o 9: ganha o 9
+#              8 dígitos começando com 2-5 -> fixo (fica como está)
+#   5. resultado: "55" + DDD + número; qualquer outra coisa -> "" (inválido)
+#
+# A carga do Sheets (tipos.TELEFONE) já guarda o WHATSAPP canônico como
+# Int64; join com a planilha ao vivo, links e dedup usam a mesma função.
+
+PAIS = "55"
+
+
+def digitos_series(s: pd.Series) -> pd.Series:
+    """
+    Só os dígitos, sem validar (texto, número ou Int64 já compactado).
+    """
+    # número vindo como float (ex.: 85999998888.0) perderia o ".0" errado
+    if pd.api.types.is_float_dtype(s.dtype):
+        s = s.round().astype("Int64")
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return s.astype("string").fillna("").astype(str)
+    return s.fillna("").astype(str).str.replace(r"\D", "", regex=True)
+
+
+def normalizar_series(s: pd.Series) -> pd.Series:
+    """
+    Telefones (texto, número ou Int64) -> E.164 sem "+" (str); inválido = "".
+    """
+    d = digitos_series(s).str.lstrip("0")
+    n = d.str.len()
+
+    com_pais = d.str.startswith(PAIS) & n.isin([12, 13])
+    nacional = d.where(~com_pais, d.str[2:]).where(com_pais | n.isin([10, 11]), "")
+
+    ddd, numero = nacional.str[:2], nacional.str[2:]
+    ddd_ok = ddd.str.fullmatch(r"[1-9]{2}")
+
+    celular = numero.str.fullmatch(r"9\d{8}")
+    celular_sem_9 = numero.str.fullmatch(r"[6-9]\d{7}")
+    fixo = numero.str.fullmatch(r"[2-5]\d{7}")
+
+    numero = numero.where(~celular_sem_9, "9" + numero)
+    ok = ddd_ok & (celular | celular_sem_9 | fixo)
+    return (PAIS + ddd + numero).where(ok, "").astype(str)
+
+
+def chave_series(s: pd.Series) -> pd.Series:
+    """
+    Canônico quando válido, senão os dígitos como vieram: para gravar/agrupar
+    registros (LOG, arquivo, fila) sem perder o envio de um número fora da regra.
+    """
+    e164 = normalizar_series(s)
+    return e164.where(e164.ne(""), digitos_series(s)).astype(str)
+
+
+def normalizar(telefone) -> str:
+    """
+    normalizar_series para um valor só.
+    """
+    return normalizar_series(pd.Series([telefone], dtype=object)).iloc[0]
+
+
+def links_whatsapp(telefones: pd.Series, mensagens=None) -> pd.Series:
+    """
+    https://wa.me/<E.164>?text=<mensagem>; telefone inválido -> "".
+    mensagens: texto por linha (Series) ou um só (str); vazio = sem ?text=.
+    """
+    e164 = normalizar_series(telefones)
+
+    if mensagens is None:
+        mensagens = ""
+    if not isinstance(mensagens, pd.Series):
+        mensagens = pd.Series(mensagens, index=telefones.index)
+    msgs = mensagens.fillna("").astype(str).str.strip()
+    # quote uma vez por mensagem distinta (lista costuma ter uma só)
+    encoded = msgs.map({m: quote(m, safe="") for m in msgs.unique()})
+
+    link = "https://wa.me/" + e164
+    link = link.where(msgs.eq(""), link + "?text=" + encoded)
+    return link.where(e164.ne(""), "").astype(str)
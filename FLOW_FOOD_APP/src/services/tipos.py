@@ -0,0 +1,210 @@
+# src/services/tipos.py
+from __future__ import annotations
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.services.telefones import normalizar_series
+from src.services.tracing import span
+
+
+# ==========================
+# ESQUEMA DE TIPOS (conversão na carga)
+# ==========================
+# Tudo que vem do Sheets chega como string (object). Na carga cada aba
+# conhecida passa pelo esquema abaixo:
+#   categoria -> category (sempre com "" entre as categorias, para que
+#                fillna("") continue funcionando nos serviços)
+#   telefone  -> Int64 no formato canônico de telefones.py (E.164 sem "+";
+#                vazio/inválido = <NA>)
+#   numero    -> menor inteiro nullable que couber, senão float32
+#   data      -> datetime64 (ISO ou BR; vazio/inválido = NaT)
+# Colunas fora do esquema ficam como estão.
+
+CATEGORIA = "categoria"
+TELEFONE = "telefone"
+NUMERO = "numero"
+DATA = "data"
+
+ESQUEMA_CRM = {
+    "WHATSAPP": TELEFONE,
+    "STATUS": CATEGORIA,
+    "ELEGIVEL": CATEGORIA,
+    "CAMPANHA DO DIA": CATEGORIA,
+    "PRIORIDADE": NUMERO,
+    "TOTAL DE PEDIDOS": NUMERO,
+    "DIAS DE INATIVIDADE": NUMERO,
+    "PROXIMO CONTATO PERMITIDO": DATA,
+    "ULTIMO CONTATO": DATA,
+}
+
+ESQUEMA_LOG = {
+    "DATA ENVIO": DATA,
+    "WHATSAPP": TELEFONE,
+    "STATUS DO DIA": CATEGORIA,
+    "CAMPANHA": CATEGORIA,
+}
+
+ESQUEMA_LISTA = {
+    "whatsapp": TELEFONE,
+    "status": CATEGORIA,
+    "campanha": CATEGORIA,
+}
+
+ESQUEMAS = {
+    "CRM_GERAL": ESQUEMA_CRM,
+    "LOG_ENVIO": ESQUEMA_LOG,
+}
+
+
+# ==========================
+# DATAS (ISO / BR)
+# ==========================
+_RE_DATA_ISO = r"^\d{4}-\d{2}-\d{2}$"
+_RE_DATA_BR = r"^\d{1,2}/\d{1,2}/\d{4}$"
+
+
+def _parse_date_any(s):
+    """
+    Tenta converter datas vindas do Sheets (ISO ou BR). Retorna date() ou None.
+    Começando pelo ano (ISO, com ou sem hora) não usa dayfirst: senão
+    "2026-11-05" vira 11 de maio.
+    """
+    if s is None:
+        return None
+    s = str(s).strip()
+    if not s:
+        return None
+    try:
+        dt = pd.to_datetime(s, errors="coerce", dayfirst=not re.match(r"\d{4}-", s))
+        if pd.isna(dt):
+            return None
+        return dt.date()
+    except Exception:
+        return None
+
+
+def _parse_dates_series(s: pd.Series) -> pd.Series:
+    """
+    Versão em lote do _parse_date_any.
+    Detecta ISO (AAAA-MM-DD) e BR (DD/MM/AAAA) por regex e converte cada
+    grupo com formato fixo; só o que sobrar cai no parse linha a linha.
+    Retorna datetime64 (NaT = vazio/inválido).
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s  # já convertida na carga
+
+    txt = s.fillna("").astype(str).str.strip()
+    out = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+
+    iso = txt.str.match(_RE_DATA_ISO)
+    if iso.any():
+        out[iso] = pd.to_datetime(txt[iso], format="%Y-%m-%d", errors="coerce")
+
+    br = txt.str.match(_RE_DATA_BR)
+    if br.any():
+        out[br] = pd.to_datetime(txt[br], format="%d/%m/%Y", errors="coerce")
+
+    # formatos fora do padrão (ou BR com mês > 12): mesmo parse de antes
+    resto = out.isna() & txt.ne("")
+    if resto.any():
+        out[resto] = pd.to_datetime(txt[resto].map(_parse_date_any), errors="coerce")
+
+    return out
+
+
+# ==========================
+# CONVERSORES
+# ==========================
+def _categoria(s: pd.Series) -> pd.Series:
+    cat = s.fillna("").astype(str).str.strip().astype("category")
+    if "" not in cat.cat.categories:
+        cat = cat.cat.add_categories("")
+    return cat
+
+
+def _telefone(s: pd.Series) -> pd.Series:
+    # normaliza uma vez na carga; daqui em diante a coluna já é canônica
+    e164 = normalizar_series(s)
+    return pd.to_numeric(e164.replace("", np.nan)).astype("Int64")
+
+
+def _numero(s: pd.Series) -> pd.Series:
+    txt = s.fillna("").astype(str).str.strip().str.replace(",", ".", regex=False)
+    num = pd.to_numeric(txt, errors="coerce")
+
+    validos = num.dropna()
+    if len(validos) and not (validos % 1 == 0).all():
+        return num.astype("float32")
+
+    menor = pd.to_numeric(validos, downcast="integer").dtype if len(validos) else np.dtype("int8")
+    return num.astype(menor.name.capitalize())  # int8 -> Int8 (nullable)
+
+
+_CONVERSORES = {
+    CATEGORIA: _categoria,
+    TELEFONE: _telefone,
+    NUMERO: _numero,
+    DATA: _parse_dates_series,
+}
+
+
+def tipar_coluna(esquema: dict[str, str] | None, coluna: str, s: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna solta (ex.: valores recém-gravados) com o tipo
+    que ela tem no esquema; fora do esquema volta como veio.
+    """
+    tipo = (esquema or {}).get(coluna)
+    return _CONVERSORES[tipo](s) if tipo else s
+
+
+_economias: dict[str, dict] = {}
+
+
+def memoria_mb(df: pd.DataFrame) -> float:
+    return round(df.memory_usage(deep=True).sum() / 1024 / 1024, 3)
+
+
+def _eh_texto(s: pd.Series) -> bool:
+    # object (pandas 2) ou StringDtype/str (padrão do pandas 3); coluna já
+    # convertida (category, Int64, datetime...) fica como está
+    return pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype)
+
+
+def compactar(df: pd.DataFrame, esquema: dict[str, str], nome: str = "") -> pd.DataFrame:
+    """
+    Devolve uma cópia rasa de df com as colunas do esquema convertidas.
+    A economia (MB antes/depois) vai para o span e para ultimas_economias().
+    """
+    cols = [c for c in esquema if c in df.columns]
+    if df.empty or not cols:
+        return df
+
+    with span(f"tipos.compactar:{nome}" if nome else "tipos.compactar", "servico", linhas=len(df)) as s:
+        antes = memoria_mb(df)
+        out = df.copy(deep=False)
+        for c in cols:
+            if _eh_texto(out[c]):
+                out[c] = _CONVERSORES[esquema[c]](out[c])
+        depois = memoria_mb(out)
+        s["mb_antes"] = antes
+        s["mb_depois"] = depois
+
+    if nome:
+        _economias[nome] = {
+            "aba": nome,
+            "linhas": len(df),
+            "mb_antes": antes,
+            "mb_depois": depois,
+            "reducao": round(antes / depois, 1) if depois else None,
+        }
+    return out
+
+
+def ultimas_economias() -> list[dict]:
+    """
+    Última conversão de cada aba (para o Admin).
+    """
+    return list(_economias.values())
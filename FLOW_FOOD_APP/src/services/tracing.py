@@ -0,0 +1,208 @@
+# src/services/tracing.py
+from __future__ import annotations
+
+import contextvars
+import functools
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from src.config import TRACE_JSONL_PATH, TRACE_MAX_RERUNS
+
+
+# ==========================
+# RASTREAMENTO (spans por rerun)
+# ==========================
+# Cada rerun do Streamlit vira um registro com a lista de spans:
+#   auth / sheets (cada chamada à API) / servico (funções de src/services) / ui
+# com duração, linhas e bytes recebidos (medidos no hook HTTP do cliente).
+# Fica num buffer do processo (últimos TRACE_MAX_RERUNS) e, se
+# TRACE_JSONL_PATH estiver setado, cada rerun é anexado ao arquivo.
+# Spans fora de rerun (worker do write-behind, jobs) vão para um buffer
+# separado, para não empurrar os reruns de verdade para fora.
+
+_lock = threading.Lock()
+_reruns: deque = deque(maxlen=TRACE_MAX_RERUNS)
+_fundo: deque = deque(maxlen=TRACE_MAX_RERUNS)
+_ids = itertools.count(1)
+
+_rerun_atual: contextvars.ContextVar = contextvars.ContextVar("flowfood_rerun", default=None)
+_span_atual: contextvars.ContextVar = contextvars.ContextVar("flowfood_span", default=None)
+
+
+def _agora_ms() -> float:
+    return time.perf_counter() * 1000
+
+
+def contar_linhas(res):
+    if res is None:
+        return None
+    if isinstance(res, dict):
+        if "valueRanges" in res:
+            return sum(len(vr.get("values") or []) for vr in res["valueRanges"])
+        if "updated" in res:
+            return res["updated"]
+        return None
+    try:
+        return len(res)
+    except TypeError:
+        return None
+
+
+def _registrar(rerun: dict, buffer: deque = _reruns) -> None:
+    with _lock:
+        buffer.append(rerun)
+    if TRACE_JSONL_PATH:
+        try:
+            with open(TRACE_JSONL_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rerun, ensure_ascii=False) + "\n")
+        except OSError:
+            pass  # rastreamento nunca derruba o app
+
+
+@contextmanager
+def rerun(pagina: str):
+    """
+    Agrupa os spans de um rerun (envolve a chamada da página no app.py).
+    """
+    reg = {
+        "id": next(_ids),
+        "pagina": pagina,
+        "inicio": time.time(),
+        "duracao_ms": 0.0,
+        "spans": [],
+        "_t0": _agora_ms(),
+    }
+    token = _rerun_atual.set(reg)
+    try:
+        yield reg
+    finally:
+        _rerun_atual.reset(token)
+        reg["duracao_ms"] = round(_agora_ms() - reg.pop("_t0"), 2)
+        _registrar(reg)
+
+
+def em_rerun() -> bool:
+    return _rerun_atual.get() is not None
+
+
+@contextmanager
+def span(nome: str, tipo: str = "servico", **attrs):
+    """
+    Mede um trecho. O dict devolvido aceita 'linhas' (e outros attrs).
+    Fora de um rerun (ex.: worker em background) vira um registro próprio,
+    no buffer de segundo plano (ultimos_em_fundo).
+    """
+    pai = _span_atual.get()
+    s = {
+        "nome": nome,
+        "tipo": tipo,
+        "nivel": 0 if pai is None else pai["nivel"] + 1,
+        "duracao_ms": 0.0,
+        "linhas": None,
+        "bytes": 0,
+        "erro": "",
+        **attrs,
+    }
+    t0 = _agora_ms()
+    reg = _rerun_atual.get()
+    s["inicio_ms"] = round(t0 - reg["_t0"], 2) if reg is not None else 0.0
+    token = _span_atual.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s["erro"] = type(e).__name__
+        raise
+    finally:
+        _span_atual.reset(token)
+        s["duracao_ms"] = round(_agora_ms() - t0, 2)
+        if pai is not None:
+            pai["bytes"] += s["bytes"]
+
+        if reg is not None:
+            reg["spans"].append(s)
+        elif pai is None:
+            _registrar({
+                "id": next(_ids),
+                "pagina": "(fora de rerun)",
+                "inicio": time.time(),
+                "duracao_ms": s["duracao_ms"],
+                "spans": [s],
+            }, _fundo)
+
+
+def rastrear(nome: str | None = None, tipo: str = "servico"):
+    """
+    Decorator: span com o nome da função e 'linhas' do retorno.
+    """
+    def deco(fn):
+        rotulo = nome or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(rotulo, tipo) as s:
+                res = fn(*args, **kwargs)
+                s["linhas"] = contar_linhas(res)
+                return res
+        return wrapper
+    return deco
+
+
+def contar_bytes_resposta(response, *args, **kwargs):
+    """
+    Hook 'response' do requests: soma o tamanho do corpo no span aberto.
+    """
+    s = _span_atual.get()
+    if s is not None:
+        try:
+            s["bytes"] += len(response.content or b"")
+        except Exception:
+            pass
+    return response
+
+
+def instalar_hook_http(gc) -> None:
+    # gspread 6: gc.http_client.session / gspread 5: gc.session
+    sessao = getattr(getattr(gc, "http_client", None), "session", None) or getattr(gc, "session", None)
+    hooks = getattr(sessao, "hooks", None)
+    if hooks is None:
+        return
+    lista = hooks.setdefault("response", [])
+    if contar_bytes_resposta not in lista:
+        lista.append(contar_bytes_resposta)
+
+
+def ultimos_reruns(n: int | None = None) -> list[dict]:
+    with _lock:
+        regs = list(_reruns)
+    return regs[-n:] if n else regs
+
+
+def ultimos_em_fundo(n: int | None = None) -> list[dict]:
+    """
+    Registros de spans fora de rerun (worker, jobs), mais antigos primeiro.
+    """
+    with _lock:
+        regs = list(_fundo)
+    return regs[-n:] if n else regs
+
+
+def resumo_rerun(reg: dict) -> dict:
+    spans = reg["spans"]
+    sheets = [s for s in spans if s["tipo"] == "sheets"]
+    return {
+        "id": reg["id"],
+        "pagina": reg["pagina"],
+        "inicio": time.strftime("%H:%M:%S", time.localtime(reg["inicio"])),
+        "duracao_ms": reg["duracao_ms"],
+        "chamadas_sheets": len(sheets),
+        "ms_sheets": round(sum(s["duracao_ms"] for s in sheets), 2),
+        "bytes": sum(s["bytes"] for s in spans if s["nivel"] == 0),
+    }
+
+
+def como_jsonl(n: int | None = None) -> str:
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in ultimos_reruns(n))
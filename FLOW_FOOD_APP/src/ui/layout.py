@@ -1,13 +1,55 @@
 import streamlit as st
 
-def render_sidebar(page_names: list[str]) -> str:
+from src.config import APP_MODE, WRITE_BEHIND
+from src.services.lojas import carregar_lojas, loja_atual
+from src.services.tracing import ultimos_reruns
+
+def render_sidebar(page_names: list[str] | None = None) -> str:
     with st.sidebar:
         st.title("Flow Food")
         st.caption("Painel Operacional")
+
+        # multi-loja: só aparece com mais de uma loja no secrets
+        lojas = carregar_lojas(st)
+        if len(lojas) > 1:
+            st.selectbox(
+                "Loja",
+                list(lojas),
+                format_func=lambda loja_id: lojas[loja_id].nome,
+                key="loja_id",
+            )
         st.divider()
 
+        # sem lista explícita, o menu vem da configuração da loja
+        if page_names is None:
+            page_names = loja_atual(st).menu_para(APP_MODE)
+
         selected = st.radio("Menu", page_names, index=0)
 
+        if WRITE_BEHIND:
+            render_pendentes()
+
         st.divider()
         st.caption("Rodando local (localhost)")
+
+        if APP_MODE == "ADMIN":
+            ultimo = ultimos_reruns(1)
+            if ultimo:
+                st.caption(f"Último rerun: {ultimo[0]['pagina']} em {ultimo[0]['duracao_ms']:.0f} ms")
     return selected
+
+
+def render_pendentes():
+    # contador do write-behind (journal local -> Sheets)
+    from src.services.fila_escrita import contar_falhos, contar_pendentes, ultimo_erro
+
+    pendentes = contar_pendentes()
+    st.divider()
+    st.metric("Gravações pendentes", pendentes)
+    if pendentes:
+        erro = ultimo_erro()
+        if erro:
+            st.caption(f"⚠️ Última falha ao gravar: {erro[:120]}")
+    falhos = contar_falhos()
+    if falhos:
+        st.caption(f"❌ {falhos} envio(s) não gravados (ver Admin)")
@@ -0,0 +1,83 @@
+import math
+from contextlib import nullcontext
+
+import streamlit as st
+
+from src.config import LISTA_TAMANHO_PAGINA, LISTA_TAMANHOS_PAGINA
+from src.services.tracing import em_rerun, rerun, span
+
+
+def _fragment(fn):
+    # st.fragment (>= 1.37) / st.experimental_fragment; sem suporte roda normal
+    deco = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return deco(fn) if deco else fn
+
+
+@_fragment
+def render_lista_editor(
+    nome: str,
+    col_enviado: str,
+    colunas: list[str],
+    column_config: dict,
+    form_key: str,
+    editor_key: str,
+    rotulo_aplicar: str,
+    msg_aplicado: str,
+    extras: dict | None = None,
+):
+    """
+    Tabela paginada da lista guardada em st.session_state[nome] (ListaEstado).
+    Roda como fragmento: paginar e aplicar marcações só reexecuta este trecho.
+    """
+    # rerun do fragmento não passa pelo app.py: abre o próprio registro
+    ctx = nullcontext() if em_rerun() else rerun(f"fragmento:{nome}")
+    with ctx:
+        estado = st.session_state[nome]
+        total = len(estado)
+
+        # ---------------------------
+        # PAGINAÇÃO
+        # ---------------------------
+        c1, c2, c3 = st.columns(3)
+        tamanho = c1.selectbox(
+            "Linhas por página",
+            LISTA_TAMANHOS_PAGINA,
+            index=LISTA_TAMANHOS_PAGINA.index(LISTA_TAMANHO_PAGINA) if LISTA_TAMANHO_PAGINA in LISTA_TAMANHOS_PAGINA else 0,
+            key=f"{nome}_tamanho_pagina",
+        )
+        paginas = max(1, math.ceil(total / tamanho))
+
+        # trocou o tamanho da página: não deixa a página atual passar do fim
+        chave_pagina = f"{nome}_pagina"
+        # (valor só pela session_state: value= junto com a key gera aviso)
+        st.session_state.setdefault(chave_pagina, 1)
+        if st.session_state[chave_pagina] > paginas:
+            st.session_state[chave_pagina] = paginas
+
+        pagina = c2.number_input("Página", min_value=1, max_value=paginas, step=1, key=chave_pagina)
+        contador = c3.empty()  # preenchido no fim, já com as marcações aplicadas
+
+        inicio = (int(pagina) - 1) * tamanho
+        df_view = estado.view(colunas, extras=extras, inicio=inicio, fim=inicio + tamanho)
+
+        # ✅ FORM: evita rerun a cada clique
+        with st.form(form_key), span(f"ui.data_editor:{nome}", "ui", linhas=len(df_view)):
+            edited = st.data_editor(
+                df_view,
+                use_container_width=True,
+                num_rows="fixed",
+                hide_index=True,
+                # uma key por página: marcações pendentes não "vazam" para outra página
+                key=f"{editor_key}_{inicio}_{tamanho}",
+                column_config=column_config,
+                disabled=[c for c in df_view.columns if c != col_enviado],
+            )
+
+            aplicar = st.form_submit_button(rotulo_aplicar)
+
+        # ✅ Só atualiza o bitmap quando clicar (sem pulo)
+        if aplicar:
+            estado.marcar(edited[col_enviado], inicio=inicio)
+            st.success(msg_aplicado)
+
+        contador.metric("Enviados", f"{estado.total_enviados} / {total}")
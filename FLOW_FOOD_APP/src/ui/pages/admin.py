@@ -1,5 +1,145 @@
 import streamlit as st
+import pandas as pd
+
+from src.services.fila_escrita import descartar_falhos, listar_falhos, reenfileirar_falhos
+from src.services.listas_prontas import listas_de_hoje
+from src.services.lojas import atualizar_lojas, carregar_lojas
+from src.services.quota import limitador
+from src.services.tipos import ultimas_economias
+from src.services.tracing import como_jsonl, resumo_rerun, ultimos_em_fundo, ultimos_reruns
+from src.ui.paginas import tempos_import
+
 
 def page_admin():
     st.header("Admin")
     st.write("Aqui vão as rotinas: Prospects/Inativos/Sincronizar.")
+
+    st.subheader("Cota do Google Sheets")
+    stats = limitador.estatisticas()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Chamadas", stats["chamadas"])
+    c2.metric("Esperaram na fila", stats["chamadas_com_espera"])
+    c3.metric("Respostas 429", stats["respostas_429"])
+    c4.metric("Tempo de espera (s)", stats["tempo_espera_s"])
+
+    st.subheader("Memória das abas (tipos compactos)")
+    economias = ultimas_economias()
+    if economias:
+        st.dataframe(pd.DataFrame(economias), use_container_width=True, hide_index=True)
+    else:
+        st.info("Nenhuma aba carregada ainda.")
+
+    st.subheader("Imports das páginas (sob demanda)")
+    tempos = tempos_import()
+    if tempos:
+        df_imp = pd.DataFrame(tempos)
+        df_imp["em"] = pd.to_datetime(df_imp["em"], unit="s")
+        st.dataframe(df_imp, use_container_width=True, hide_index=True)
+    else:
+        st.info("Nenhum módulo importado sob demanda ainda.")
+
+    render_lojas()
+
+    render_falhos()
+
+    render_rastreamento()
+
+
+def render_lojas():
+    st.subheader("Lojas")
+
+    lojas = carregar_lojas(st)
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "loja": loja.id,
+                "nome": loja.nome,
+                "planilha": loja.spreadsheet_id,
+                "total_pontual": loja.total_pontual,
+                "limite_diario": loja.limite_diario,
+            }
+            for loja in lojas.values()
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    prontas = listas_de_hoje()
+    if prontas.empty:
+        st.caption("Nenhuma lista pré-gerada hoje (python main.py pre-gerar).")
+    else:
+        st.caption("Listas pré-geradas hoje")
+        st.dataframe(prontas, use_container_width=True, hide_index=True)
+
+    if st.button("Atualizar todas as lojas"):
+        # snapshot + índice de elegíveis de cada loja, em paralelo
+        res = atualizar_lojas(st, lojas.values())
+        for loja_id, r in res.items():
+            if isinstance(r, Exception):
+                st.error(f"{lojas[loja_id].nome}: {r}")
+            else:
+                st.success(f"{lojas[loja_id].nome}: {r} clientes no CRM.")
+
+
+def render_falhos():
+    st.subheader("Gravações com falha (write-behind)")
+
+    falhos = listar_falhos()
+    if falhos.empty:
+        st.info("Nenhum envio parado.")
+        return
+
+    falhos["falhou_em"] = pd.to_datetime(falhos["falhou_em"], unit="s")
+    st.dataframe(falhos, use_container_width=True, hide_index=True)
+    st.caption("Corrija a planilha (cabeçalho, proteção) e reenfileire, ou descarte.")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        if st.button("Reenfileirar todos"):
+            reenfileirar_falhos(st)
+            st.rerun()
+    with c2:
+        if st.button("Descartar todos"):
+            descartar_falhos()
+            st.rerun()
+
+
+def render_rastreamento():
+    st.subheader("Rastreamento (últimos reruns)")
+
+    n = st.slider("Quantos reruns", min_value=5, max_value=50, value=20, step=5)
+    regs = ultimos_reruns(n)
+    if not regs:
+        st.info("Nenhum rerun registrado ainda.")
+        return
+
+    st.dataframe(
+        pd.DataFrame([resumo_rerun(r) for r in reversed(regs)]),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    por_id = {r["id"]: r for r in regs}
+    escolhido = st.selectbox("Detalhar rerun", list(reversed(list(por_id))))
+    spans = por_id[escolhido]["spans"]
+    if spans:
+        df = pd.DataFrame(spans).sort_values("inicio_ms")
+        df["nome"] = ["· " * nivel + nome for nivel, nome in zip(df["nivel"], df["nome"])]
+        cols = [c for c in ["inicio_ms", "nome", "tipo", "duracao_ms", "linhas", "bytes", "erro"] if c in df.columns]
+        st.dataframe(df[cols], use_container_width=True, hide_index=True)
+
+    fundo = ultimos_em_fundo(n)
+    if fundo:
+        with st.expander(f"Segundo plano (worker/jobs): {len(fundo)}"):
+            st.dataframe(
+                pd.DataFrame([resumo_rerun(r) for r in reversed(fundo)]),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+    st.download_button(
+        "Exportar JSON lines",
+        data=como_jsonl(),
+        file_name="flowfood_traces.jsonl",
+        mime="application/x-ndjson",
+    )
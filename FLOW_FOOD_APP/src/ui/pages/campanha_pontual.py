@@ -1,38 +1,38 @@
 import streamlit as st
-import re
-from urllib.parse import quote
+
+import pandas as pd
 
 from src.services.limites_geracao import (
-    pode_gerar_lista_hoje,
-    registrar_geracao_lista,
+    desfazer_reserva,
+    reservar_geracao_hoje,
 )
+from src.services.indice_elegiveis import indice_elegiveis
+from src.services.lista_estado import ListaEstado
+from src.services.listas_prontas import PONTUAL, carregar_lista
+from src.services.lojas import chave_sessao, loja_atual
 from src.services.sheets import ler_lista_pontual_sheets
+from src.services.telefones import links_whatsapp
 from src.services.pontual_backend import (
     atualizar_crm_por_lista_real,
     gerar_lista_pontual_por_status_real,
 )
+from src.services.fila_escrita import enfileirar_envios
+from src.services.paralelo import rodar_em_paralelo
+from src.config import STATUS_LISTA, WRITE_BEHIND
+from src.ui.lista_editor import render_lista_editor
 
 
-def to_wa_me(phone_raw: str, msg: str = "") -> str:
-    s = "" if phone_raw is None else str(phone_raw)
-    digits = re.sub(r"\D", "", s)
-
-    # remove 55 se vier no começo
-    if digits.startswith("55"):
-        digits = digits[2:]
-
-    # precisa ter DDD + número
-    if len(digits) < 10:
-        return ""
+def _links(df: pd.DataFrame, msg_fallback: str) -> pd.Series:
+    # mensagem da própria linha (mensagem/MENSAGEM) ou a digitada na tela
+    msgs = pd.Series(msg_fallback, index=df.index)
+    for c in ["MENSAGEM", "mensagem"]:
+        if c in df.columns:
+            propria = df[c].fillna("").astype(str)
+            msgs = propria.where(propria.str.strip().ne(""), msgs)
 
-    base = f"https://wa.me/55{digits}"
-
-    msg = "" if msg is None else str(msg).strip()
-    if not msg:
-        return base
-
-    encoded = quote(msg, safe="")
-    return f"{base}?text={encoded}"
+    if "whatsapp" not in df.columns:
+        return pd.Series("", index=df.index)
+    return links_whatsapp(df["whatsapp"], msgs)
 
 
 def page_campanha_pontual():
@@ -44,6 +44,11 @@ def page_campanha_pontual():
     st.toggle("Modo Admin (teste)", value=False, key="admin_mode")
     is_admin = st.session_state["admin_mode"]
 
+    loja = loja_atual(st)
+    SPREADSHEET_ID = loja.spreadsheet_id
+    LISTA = chave_sessao(st, "lista_pontual")  # lista da sessão é por loja
+    TOTAL = loja.total_pontual
+
     campanha = st.text_input("Campanha", placeholder="CUPOM10OFF")
     mensagem = st.text_area(
         "Mensagem",
@@ -57,8 +62,8 @@ def page_campanha_pontual():
     tipo_lista = st.selectbox(
         "Tipo de Lista Pontual",
         [
-            "GERAL (37 divididos por status)",
-            "POR STATUS (37 do mesmo status)",
+            f"GERAL ({TOTAL} divididos por status)",
+            f"POR STATUS ({TOTAL} do mesmo status)",
         ],
         index=0,
     )
@@ -67,17 +72,7 @@ def page_campanha_pontual():
     if tipo_lista.startswith("POR STATUS"):
         status_escolhido = st.selectbox(
             "Escolha o STATUS",
-            [
-                "PROSPECT",
-                "ATIVO",
-                "ATIVO_VIP",
-                "ESFRIANDO",
-                "ESFRIANDO_VIP",
-                "INATIVO",
-                "INATIVO_VIP",
-                "SUMIDO",
-                "SUMIDO_VIP",
-            ],
+            STATUS_LISTA,
             index=0,
         )
 
@@ -88,46 +83,82 @@ def page_campanha_pontual():
     # ---------------------------
     with col1:
         if st.button("Gerar Lista Pontual", type="primary"):
-            SPREADSHEET_ID = st.secrets["SPREADSHEET_ID"]
-
-            if not pode_gerar_lista_hoje(
-                st,
-                SPREADSHEET_ID,
-                "LISTA_PONTUAL_LAST_DATE",
-                is_admin,
-            ):
+            geral = tipo_lista.startswith("GERAL")
+
+            # pré-gerada pelo job (main.py pre-gerar)? senão gera ao vivo
+            pronta = not geral and carregar_lista(
+                SPREADSHEET_ID, PONTUAL, chave=status_escolhido, consumir=False
+            ) is not None
+
+            # em paralelo: reserva no CONTROLE_APP (checa e já registra que
+            # gerou hoje; admin/teste ou loja sem limite diário libera) +
+            # a leitura que a geração vai precisar
+            tarefas = {
+                "reserva": lambda: reservar_geracao_hoje(
+                    st,
+                    SPREADSHEET_ID,
+                    "LISTA_PONTUAL_LAST_DATE",
+                    is_admin or not loja.limite_diario,
+                ),
+            }
+            if geral:
+                tarefas["leitura"] = lambda: ler_lista_pontual_sheets(st, SPREADSHEET_ID)
+            else:
+                # pronta também: o índice tira quem já recebeu hoje
+                tarefas["leitura"] = lambda: indice_elegiveis(st, SPREADSHEET_ID)
+            res = rodar_em_paralelo(tarefas, capturar_erros=True)
+
+            if isinstance(res["reserva"], Exception):
+                raise res["reserva"]
+            pode, anterior = res["reserva"]
+            if not pode:
                 st.warning("Você já gerou a Lista Pontual hoje. Tente novamente amanhã.")
                 st.stop()
 
-            # -------- MODO GERAL (planilha) --------
-            if tipo_lista.startswith("GERAL"):
-                df = ler_lista_pontual_sheets(st, SPREADSHEET_ID)
-
-                if campanha and "campanha" in df.columns:
-                    df["campanha"] = campanha
-
-            # -------- MODO POR STATUS --------
-            else:
-                df = gerar_lista_pontual_por_status_real(
+            try:
+                if isinstance(res.get("leitura"), Exception):
+                    raise res["leitura"]
+
+                # -------- MODO GERAL (planilha) --------
+                if geral:
+                    df = res["leitura"]
+
+                    if campanha and "campanha" in df.columns:
+                        df["campanha"] = campanha
+
+                # -------- MODO POR STATUS --------
+                else:
+                    df = carregar_lista(
+                        SPREADSHEET_ID, PONTUAL, chave=status_escolhido, indice=res["leitura"]
+                    ) if pronta else None
+                    if df is not None:
+                        df["campanha"] = ("" if campanha is None else str(campanha).strip())
+                    else:
+                        # índice do CRM já montado na leitura acima
+                        df = gerar_lista_pontual_por_status_real(
+                            st,
+                            SPREADSHEET_ID,
+                            status_escolhido=status_escolhido,
+                            total=TOTAL,
+                            campanha=campanha,
+                        )
+
+                    if len(df) < TOTAL:
+                        st.warning(
+                            f"⚠️ Só encontrei {len(df)} clientes elegíveis hoje "
+                            f"no status '{status_escolhido}' (cooldown respeitado)."
+                        )
+            except Exception:
+                # falhou: devolve a geração do dia
+                desfazer_reserva(
                     st,
                     SPREADSHEET_ID,
-                    status_escolhido=status_escolhido,
-                    total=37,
-                    campanha=campanha,
+                    "LISTA_PONTUAL_LAST_DATE",
+                    anterior,
                 )
+                raise
 
-                if len(df) < 37:
-                    st.warning(
-                        f"⚠️ Só encontrei {len(df)} clientes elegíveis hoje "
-                        f"no status '{status_escolhido}' (cooldown respeitado)."
-                    )
-
-            st.session_state["lista_pontual"] = df
-            registrar_geracao_lista(
-                st,
-                SPREADSHEET_ID,
-                "LISTA_PONTUAL_LAST_DATE",
-            )
+            st.session_state[LISTA] = ListaEstado(df, "enviado")
 
             st.success("Lista pontual gerada.")
 
@@ -135,109 +166,69 @@ def page_campanha_pontual():
     # TABELA + MARCAÇÃO
     # ---------------------------
     with col2:
-        if "lista_pontual" not in st.session_state:
+        if LISTA not in st.session_state:
             st.info("Gere a lista pontual antes de atualizar.")
         else:
-            df_full = (
-                st.session_state["lista_pontual"]
-                .copy()
-                .reset_index(drop=True)
-            )
-
-            # garante coluna enviado
-            if "enviado" not in df_full.columns:
-                df_full["enviado"] = False
-            df_full["enviado"] = (
-                df_full["enviado"]
-                .fillna(False)
-                .astype(bool)
-            )
-
-            msg_fallback = mensagem
-
-            def pick_msg(row):
-                if "mensagem" in row and str(row["mensagem"]).strip():
-                    return row["mensagem"]
-                if "MENSAGEM" in row and str(row["MENSAGEM"]).strip():
-                    return row["MENSAGEM"]
-                return msg_fallback
-
-            df_full["link"] = df_full.apply(
-                lambda r: to_wa_me(r.get("whatsapp"), pick_msg(r)),
-                axis=1,
-            )
-
-            cols_show = []
-            for c in ["link", "enviado", "nome", "whatsapp", "status", "campanha"]:
-                if c in df_full.columns:
-                    cols_show.append(c)
-
-            df_view = df_full[cols_show].copy()
-
-            with st.form("form_pontual_mark"):
-                edited = st.data_editor(
-                    df_view,
-                    use_container_width=True,
-                    num_rows="fixed",
-                    hide_index=True,
-                    key="editor_lista_pontual_form",
-                    column_config={
-                        "link": st.column_config.LinkColumn(
-                            "ABRIR",
-                            display_text="ABRIR",
-                            help="Abrir conversa no WhatsApp",
-                        ),
-                        "enviado": st.column_config.CheckboxColumn(
-                            "Enviado",
-                            help="Marque após enviar no WhatsApp",
-                        ),
-                    },
-                    disabled=[c for c in df_view.columns if c != "enviado"],
-                )
-
-                aplicar = st.form_submit_button("Aplicar Marcações")
-
-            if aplicar:
-                if "enviado" in edited.columns:
-                    df_full["enviado"] = (
-                        edited["enviado"]
-                        .fillna(False)
-                        .astype(bool)
-                    )
-
-                st.session_state["lista_pontual"] = df_full.drop(
-                    columns=["link"],
-                    errors="ignore",
-                )
-
-                st.success(
+            estado = st.session_state[LISTA]
+
+            # link só é recalculado quando a mensagem muda
+            link = estado.derivada("link", mensagem, lambda base: _links(base, mensagem))
+
+            cols_show = [c for c in ["link", "enviado", "nome", "whatsapp", "status", "campanha"]
+                         if c in ("link", "enviado") or c in estado.base.columns]
+
+            # fragmento paginado: marcar/paginar não reexecuta a página toda
+            render_lista_editor(
+                LISTA,
+                "enviado",
+                cols_show,
+                column_config={
+                    "link": st.column_config.LinkColumn(
+                        "ABRIR",
+                        display_text="ABRIR",
+                        help="Abrir conversa no WhatsApp",
+                    ),
+                    "enviado": st.column_config.CheckboxColumn(
+                        "Enviado",
+                        help="Marque após enviar no WhatsApp",
+                    ),
+                },
+                form_key="form_pontual_mark",
+                editor_key="editor_lista_pontual_form",
+                rotulo_aplicar="Aplicar Marcações",
+                msg_aplicado=(
                     "Marcações aplicadas. Agora clique em "
                     "'Atualizar CRM (Pontual)'."
-                )
+                ),
+                extras={"link": link},
+            )
 
             # ---------------------------
             # ATUALIZAR CRM
             # ---------------------------
             if st.button("Atualizar CRM (Pontual)"):
-                df_send = st.session_state["lista_pontual"].copy()
-
-                if (
-                    "enviado" not in df_send.columns
-                    or df_send["enviado"].sum() == 0
-                ):
+                if estado.total_enviados == 0:
                     st.warning("Marque pelo menos 1 contato como ENVIADO.")
                     st.stop()
 
-                SPREADSHEET_ID = st.secrets["SPREADSHEET_ID"]
-                res = atualizar_crm_por_lista_real(
-                    st,
-                    SPREADSHEET_ID,
-                    df_send,
-                )
+                df_send = estado.enviados()
 
-                st.success(
-                    f"Atualizado! {res['updated']} contatos gravados "
-                    f"no CRM e no LOG."
-                )
+                if WRITE_BEHIND:
+                    res = enfileirar_envios(st, SPREADSHEET_ID, df_send)
+                    st.success(
+                        f"Registrado! {res['updated']} contatos na fila "
+                        f"de gravação ({res['pendentes']} pendentes)."
+                    )
+                else:
+                    res = atualizar_crm_por_lista_real(
+                        st,
+                        SPREADSHEET_ID,
+                        df_send,
+                    )
+
+                    st.success(
+                        f"Atualizado! {res['updated']} contatos gravados "
+                        f"no CRM e no LOG."
+                    )
 
     st.divider()
@@ -1,5 +1,92 @@
+import time
+
 import streamlit as st
 
+from src.config import LISTA_TAMANHO_PAGINA, LISTA_TAMANHOS_PAGINA, STATUS_LISTA
+from src.services.indice_crm import indice_crm
+from src.services.lojas import loja_atual
+
+# colunas mostradas (as que existirem no CRM_GERAL)
+COLUNAS_CRM = [
+    "WHATSAPP",
+    "NOME",
+    "STATUS",
+    "ELEGIVEL",
+    "PRIORIDADE",
+    "TOTAL DE PEDIDOS",
+    "DIAS DE INATIVIDADE",
+    "ULTIMO CONTATO",
+    "PROXIMO CONTATO PERMITIDO",
+    "CAMPANHA DO DIA",
+]
+
+
 def page_crm():
     st.header("CRM")
-    st.write("Aqui vai a tabela do CRM_GERAL.")
+
+    loja = loja_atual(st)
+    SPREADSHEET_ID = loja.spreadsheet_id
+
+    # índice montado 1x por snapshot do CRM (busca/filtro no servidor)
+    indice = indice_crm(st, SPREADSHEET_ID)
+
+    # ---------------------------
+    # BUSCA + FILTROS
+    # ---------------------------
+    texto = st.text_input(
+        "Buscar",
+        placeholder="WhatsApp (ou começo dele) ou nome (sem acento, início de palavra)",
+        key="crm_busca",
+    )
+
+    c1, c2, c3 = st.columns([3, 1, 1])
+    with c1:
+        status = st.multiselect("STATUS", STATUS_LISTA, key="crm_status")
+    with c2:
+        elegivel = st.selectbox("ELEGIVEL", ["Todos", "SIM", "NÃO"], key="crm_elegivel")
+    with c3:
+        liberados = st.checkbox("Só liberados hoje", key="crm_liberados", help="Cooldown vencido e sem envio hoje")
+
+    t0 = time.perf_counter()
+    pos = indice.buscar(
+        texto,
+        status=status or None,
+        elegivel=None if elegivel == "Todos" else elegivel == "SIM",
+        liberados=liberados,
+    )
+    ms = (time.perf_counter() - t0) * 1000
+
+    total = len(pos)
+    st.caption(f"{total} de {len(indice.df)} clientes · busca em {ms:.1f} ms")
+
+    if total == 0:
+        st.info("Nenhum cliente encontrado.")
+        return
+
+    # ---------------------------
+    # PÁGINA (só ela vai para o navegador)
+    # ---------------------------
+    c1, c2 = st.columns(2)
+    with c1:
+        tamanho = st.selectbox(
+            "Linhas por página",
+            LISTA_TAMANHOS_PAGINA,
+            index=LISTA_TAMANHOS_PAGINA.index(LISTA_TAMANHO_PAGINA),
+            key="crm_tamanho",
+        )
+    paginas = (total - 1) // tamanho + 1
+
+    # filtro/tamanho mudou: não deixa a página atual passar do fim
+    # (valor só pela session_state: value= junto com a key gera aviso)
+    st.session_state.setdefault("crm_pagina", 1)
+    if st.session_state["crm_pagina"] > paginas:
+        st.session_state["crm_pagina"] = paginas
+    with c2:
+        pagina = int(st.number_input("Página", min_value=1, max_value=paginas, step=1, key="crm_pagina"))
+
+    st.dataframe(
+        indice.pagina(pos, (pagina - 1) * tamanho, tamanho, COLUNAS_CRM),
+        use_container_width=True,
+        hide_index=True,
+    )
+    st.caption(f"Página {pagina} de {paginas}")
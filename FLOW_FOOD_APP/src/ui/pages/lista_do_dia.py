@@ -1,9 +1,18 @@
 import streamlit as st
 import pandas as pd
 
-from src.services.limites_geracao import pode_gerar_lista_hoje, registrar_geracao_lista
-from src.services.sheets import load_sheet_df, gerar_lista_fixa
+from src.services.indice_elegiveis import indice_elegiveis
+from src.services.limites_geracao import desfazer_reserva, reservar_geracao_hoje
+from src.services.lista_estado import ListaEstado
+from src.services.listas_prontas import FIXA, carregar_lista
+from src.services.lojas import chave_sessao, loja_atual
+from src.services.paralelo import rodar_em_paralelo
+from src.services.sheets import gerar_lista_fixa
+from src.services.snapshot import ler_abas
 from src.services.pontual_backend import atualizar_crm_por_lista_real
+from src.services.fila_escrita import enfileirar_envios
+from src.config import WRITE_BEHIND
+from src.ui.lista_editor import render_lista_editor
 
 
 def page_lista_fixa():
@@ -13,6 +22,10 @@ def page_lista_fixa():
     st.toggle("Modo Admin (teste)", value=False, key="admin_mode")
     is_admin = st.session_state["admin_mode"]
 
+    loja = loja_atual(st)
+    SPREADSHEET_ID = loja.spreadsheet_id
+    LISTA = chave_sessao(st, "lista_fixa")  # lista da sessão é por loja
+
     col1, col2 = st.columns(2)
 
     # ---------------------------
@@ -20,19 +33,48 @@ def page_lista_fixa():
     # ---------------------------
     with col1:
         if st.button("Gerar Lista Fixa", type="primary"):
-            SPREADSHEET_ID = st.secrets["SPREADSHEET_ID"]
-
-            # trava: cliente só 1x por dia (admin/teste libera)
-            if not pode_gerar_lista_hoje(st, SPREADSHEET_ID, "LISTA_FIXA_LAST_DATE", is_admin):
+            # trava: cliente só 1x por dia (admin/teste ou loja sem limite libera)
+            # checa e já registra que gerou hoje (uma operação só)
+            libera = is_admin or not loja.limite_diario
+
+            # pré-gerada pelo job (main.py pre-gerar)? senão gera ao vivo
+            pronta = carregar_lista(SPREADSHEET_ID, FIXA, consumir=False) is not None
+
+            # leituras independentes em paralelo: CONTROLE_APP (reserva) +
+            # CRM_GERAL/CONFIGURACAO (1 checagem de revisão + 1 batch_get)
+            tarefas = {"reserva": lambda: reservar_geracao_hoje(st, SPREADSHEET_ID, "LISTA_FIXA_LAST_DATE", libera)}
+            if not pronta:
+                tarefas["abas"] = lambda: ler_abas(st, SPREADSHEET_ID, ["CRM_GERAL", "CONFIGURACAO"])
+            else:
+                # a pronta sai sem quem já recebeu hoje (índice do CRM)
+                tarefas["indice"] = lambda: indice_elegiveis(st, SPREADSHEET_ID)
+            res = rodar_em_paralelo(tarefas, capturar_erros=True)
+
+            if isinstance(res["reserva"], Exception):
+                raise res["reserva"]
+            pode, anterior = res["reserva"]
+            if not pode:
                 st.warning("Você já gerou a Lista Fixa hoje. Tente novamente amanhã.")
                 st.stop()
 
-            df_crm = load_sheet_df("CRM_GERAL")
-            df_cfg = load_sheet_df("CONFIGURACAO")
-            st.session_state["lista_fixa"] = gerar_lista_fixa(df_crm, df_cfg)
-
-            # registra que gerou hoje
-            registrar_geracao_lista(st, SPREADSHEET_ID, "LISTA_FIXA_LAST_DATE")
+            try:
+                df_fixa = None
+                if pronta:
+                    if isinstance(res["indice"], Exception):
+                        raise res["indice"]
+                    df_fixa = carregar_lista(SPREADSHEET_ID, FIXA, indice=res["indice"])
+                if df_fixa is None:
+                    if isinstance(res.get("abas"), Exception):
+                        raise res["abas"]
+                    abas = res.get("abas") or ler_abas(st, SPREADSHEET_ID, ["CRM_GERAL", "CONFIGURACAO"])
+                    # CRM via índice de elegíveis (montado 1x por snapshot; já em memória)
+                    indice = indice_elegiveis(st, SPREADSHEET_ID)
+                    df_fixa = gerar_lista_fixa(indice.df, abas["CONFIGURACAO"], indice=indice)
+                st.session_state[LISTA] = ListaEstado(df_fixa, "ENVIADO?")
+            except Exception:
+                # falhou: devolve a geração do dia
+                desfazer_reserva(st, SPREADSHEET_ID, "LISTA_FIXA_LAST_DATE", anterior)
+                raise
 
             st.success("Lista fixa gerada (Google Sheets).")
 
@@ -41,21 +83,18 @@ def page_lista_fixa():
     # ---------------------------
     with col2:
         if st.button("Atualizar CRM (Fixa)"):
-            if "lista_fixa" not in st.session_state:
+            if LISTA not in st.session_state:
                 st.warning("Gere a lista fixa antes.")
                 st.stop()
 
-            df = st.session_state["lista_fixa"].copy()
+            estado = st.session_state[LISTA]
 
-            if "ENVIADO?" not in df.columns:
-                st.warning("Coluna ENVIADO? não encontrada na lista.")
-                st.stop()
-
-            if df["ENVIADO?"].fillna(False).sum() == 0:
+            if estado.total_enviados == 0:
                 st.warning("Marque pelo menos 1 contato como ENVIADO antes de atualizar.")
                 st.stop()
 
-            # Formato esperado pelo backend real
+            # só as linhas marcadas, no formato esperado pelo backend real
+            df = estado.enviados()
             df_real = pd.DataFrame({
                 "whatsapp": df.get("WHATSAPP"),
                 "nome": df.get("NOME"),
@@ -64,65 +103,49 @@ def page_lista_fixa():
                 "enviado": df.get("ENVIADO?"),
             })
 
-            SPREADSHEET_ID = st.secrets["SPREADSHEET_ID"]
-            res = atualizar_crm_por_lista_real(st, SPREADSHEET_ID, df_real)
-
-            st.success(f"Atualizado (FIXA)! {res['updated']} contatos gravados no CRM e no LOG.")
+            if WRITE_BEHIND:
+                res = enfileirar_envios(st, SPREADSHEET_ID, df_real)
+                st.success(f"Registrado (FIXA)! {res['updated']} contatos na fila de gravação ({res['pendentes']} pendentes).")
+            else:
+                res = atualizar_crm_por_lista_real(st, SPREADSHEET_ID, df_real)
+                st.success(f"Atualizado (FIXA)! {res['updated']} contatos gravados no CRM e no LOG.")
 
     st.divider()
 
     # ---------------------------
     # TABELA: MOSTRAR LISTA
     # ---------------------------
-    if "lista_fixa" not in st.session_state:
+    if LISTA not in st.session_state:
         st.warning("Nenhuma lista fixa gerada ainda.")
         return
 
     st.subheader("LISTA_FIXA (Google Sheets)")
 
-    df_base = st.session_state["lista_fixa"].copy().reset_index(drop=True)
-
-    # ✅ Forçar ENVIADO? como boolean (ajuda no “não marca de primeira”)
-    if "ENVIADO?" in df_base.columns:
-        df_base["ENVIADO?"] = df_base["ENVIADO?"].fillna(False).astype(bool)
+    estado = st.session_state[LISTA]
 
     # ✅ Tabela compacta (reduz scroll e “pulinhos”)
-    cols_show = []
-    for c in ["LINK", "ENVIADO?", "NOME", "WHATSAPP", "STATUS", "CAMPANHA"]:
-        if c in df_base.columns:
-            cols_show.append(c)
-
-    df_view = df_base[cols_show].copy() if cols_show else df_base.copy()
-
-    # ✅ FORM: evita rerun a cada clique
-    with st.form("form_lista_fixa"):
-        edited = st.data_editor(
-            df_view,
-            use_container_width=True,
-            num_rows="fixed",
-            hide_index=True,
-            key="editor_lista_fixa_form",
-            column_config={
-                "ENVIADO?": st.column_config.CheckboxColumn(
-                    "Enviado",
-                    help="Marque após enviar no WhatsApp"
-                ),
-                "LINK": st.column_config.LinkColumn(
-                    "ABRIR",
-                    display_text="ABRIR",
-                    help="Abrir conversa no WhatsApp"
-                ),
-            },
-            disabled=[c for c in df_view.columns if c != "ENVIADO?"],
-        )
-
-        # ✅ botão no padrão
-        aplicar = st.form_submit_button("Atualizar CRM (Fixa)")
-
-    # ✅ Só atualiza o session_state quando clicar (sem pulo)
-    if aplicar:
-        if "ENVIADO?" in edited.columns and "ENVIADO?" in df_base.columns:
-            df_base["ENVIADO?"] = edited["ENVIADO?"].fillna(False).astype(bool)
-
-        st.session_state["lista_fixa"] = df_base
-        st.success("Marcações aplicadas. Agora clique no botão 'Atualizar CRM (Fixa)' acima para gravar no Sheets.")
+    # projeção das colunas da lista guardada (sem cópia); ENVIADO? vem do bitmap
+    cols_show = [c for c in ["LINK", "ENVIADO?", "NOME", "WHATSAPP", "STATUS", "CAMPANHA"]
+                 if c == "ENVIADO?" or c in estado.base.columns]
+
+    # fragmento paginado: marcar/paginar não reexecuta a página toda
+    render_lista_editor(
+        LISTA,
+        "ENVIADO?",
+        cols_show,
+        column_config={
+            "ENVIADO?": st.column_config.CheckboxColumn(
+                "Enviado",
+                help="Marque após enviar no WhatsApp"
+            ),
+            "LINK": st.column_config.LinkColumn(
+                "ABRIR",
+                display_text="ABRIR",
+                help="Abrir conversa no WhatsApp"
+            ),
+        },
+        form_key="form_lista_fixa",
+        editor_key="editor_lista_fixa_form",
+        rotulo_aplicar="Atualizar CRM (Fixa)",
+        msg_aplicado="Marcações aplicadas. Agora clique no botão 'Atualizar CRM (Fixa)' acima para gravar no Sheets.",
+    )
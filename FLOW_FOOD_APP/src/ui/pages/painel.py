@@ -1,5 +1,67 @@
 import streamlit as st
+import pandas as pd
+from datetime import date, timedelta
+
+from src.services.agregados import agregados, atualizar_agregados
+from src.services.lojas import loja_atual
+
+
+def _taxa(reativados, contatos):
+    return round(100 * reativados / contatos, 1) if contatos else 0.0
+
 
 def page_painel():
     st.header("Painel")
-    st.write("Página inicial do Flow Food.")
+
+    loja = loja_atual(st)
+    SPREADSHEET_ID = loja.spreadsheet_id
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        dias = st.selectbox("Período", [7, 30, 90, 365], index=1, format_func=lambda d: f"Últimos {d} dias")
+    with col2:
+        forcar = st.button("Atualizar agora")
+
+    # só o que entrou no LOG_ENVIO desde a última marca (+ reativações se o CRM mudou)
+    atualizar_agregados(st, SPREADSHEET_ID, forcar=forcar)
+
+    desde = (date.today() - timedelta(days=dias - 1)).isoformat()
+    df = agregados(SPREADSHEET_ID, desde=desde)
+
+    if df.empty:
+        st.info("Nenhum envio registrado no período.")
+        return
+
+    # ---------------------------
+    # RESUMO DO PERÍODO
+    # ---------------------------
+    envios, contatos, reativados = (int(df[c].sum()) for c in ["envios", "contatos", "reativados"])
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Envios", envios)
+    c2.metric("Clientes contatados", contatos)
+    c3.metric("Reativados", reativados)
+    c4.metric("Taxa de reativação", f"{_taxa(reativados, contatos)}%")
+
+    # ---------------------------
+    # ENVIOS POR DIA
+    # ---------------------------
+    st.subheader("Envios por dia")
+    por_dia = df.groupby("dia")[["envios", "reativados"]].sum()
+    por_dia.index = pd.to_datetime(por_dia.index)
+    st.line_chart(por_dia)
+
+    # ---------------------------
+    # POR STATUS / POR CAMPANHA
+    # ---------------------------
+    def tabela(chave):
+        t = df.groupby(chave, as_index=False)[["envios", "contatos", "reativados"]].sum()
+        t["taxa (%)"] = [_taxa(r, c) for r, c in zip(t["reativados"], t["contatos"])]
+        return t.sort_values("envios", ascending=False)
+
+    col_s, col_c = st.columns(2)
+    with col_s:
+        st.subheader("Por status")
+        st.dataframe(tabela("status"), use_container_width=True, hide_index=True)
+    with col_c:
+        st.subheader("Por campanha")
+        st.dataframe(tabela("campanha"), use_container_width=True, hide_index=True)
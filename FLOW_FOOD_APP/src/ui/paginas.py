@@ -0,0 +1,79 @@
+# src/ui/paginas.py
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+import time
+
+from src.services.tracing import span
+
+
+# ==========================
+# REGISTRO DE PÁGINAS (import sob demanda)
+# ==========================
+# Nome no menu -> (módulo, função). O módulo da página (e o que ele puxa:
+# pandas, gspread, google.oauth2...) só é importado quando a página é
+# aberta pela primeira vez no processo. Abrir só a Lista Fixa não paga o
+# import do Admin, e o primeiro render depois de reiniciar o container
+# não espera por páginas que ninguém abriu.
+
+PAGINAS: dict[str, tuple[str, str]] = {
+    "Lista Fixa": ("src.ui.pages.lista_do_dia", "page_lista_fixa"),
+    "Campanha Pontual": ("src.ui.pages.campanha_pontual", "page_campanha_pontual"),
+    "Painel": ("src.ui.pages.painel", "page_painel"),
+    "CRM": ("src.ui.pages.crm", "page_crm"),
+    "Admin": ("src.ui.pages.admin", "page_admin"),
+}
+SO_ADMIN = {"CRM", "Admin"}  # fora do APP_MODE "ADMIN" não abrem
+
+# dependências pesadas que vale mostrar quem puxou primeiro
+DEPENDENCIAS_PESADAS = ["pandas", "numpy", "gspread", "google.oauth2"]
+
+_lock = threading.Lock()
+_tempos: list[dict] = []
+
+
+def importar(modulo: str):
+    """
+    importlib.import_module medido: a 1ª vez no processo registra o tempo
+    (com as dependências que vieram junto) e abre um span "import".
+    """
+    if modulo in sys.modules:
+        return sys.modules[modulo]
+
+    antes = set(sys.modules)
+    with span(f"import:{modulo}", "import") as s:
+        t0 = time.perf_counter()
+        mod = importlib.import_module(modulo)
+        ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        novos = set(sys.modules) - antes
+        s["modulos"] = len(novos)
+
+    with _lock:
+        _tempos.append({
+            "modulo": modulo,
+            "import_ms": ms,
+            "modulos_novos": len(novos),
+            "pesadas": ", ".join(d for d in DEPENDENCIAS_PESADAS if d in novos),
+            "em": time.time(),
+        })
+    return mod
+
+
+def carregar_pagina(nome: str, app_mode: str = "ADMIN"):
+    """
+    Função da página do menu (importa o módulo na 1ª vez).
+    Página desconhecida (ou só de admin no CLIENT) -> KeyError;
+    módulo quebrado -> a exceção do import.
+    """
+    if app_mode != "ADMIN" and nome in SO_ADMIN:
+        raise KeyError(nome)
+    modulo, funcao = PAGINAS[nome]
+    return getattr(importar(modulo), funcao)
+
+
+def tempos_import() -> list[dict]:
+    with _lock:
+        return list(_tempos)
@@ -0,0 +1,69 @@
+# tests/test_listas_prontas.py
+"""
+Lista pré-gerada servida depois de envios do dia: quem o índice já deu
+como enviado (registrar_envios) não volta na lista pronta.
+
+Uso (de dentro de FLOW_FOOD_APP):
+    python -m pytest tests
+"""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from src.services import listas_prontas
+from src.services.indice_elegiveis import IndiceElegiveis
+from src.services.listas_prontas import FIXA, PONTUAL, carregar_lista, salvar_lista
+from src.services.tipos import ESQUEMA_CRM, compactar
+
+
+@pytest.fixture(autouse=True)
+def _cache_tmp(tmp_path, monkeypatch):
+    monkeypatch.setattr(listas_prontas, "CACHE_DIR", str(tmp_path))
+
+
+def _indice() -> IndiceElegiveis:
+    crm = pd.DataFrame({
+        "WHATSAPP": ["5585999990001", "(85) 99999-0002", "85 9999-0003", "5585999990004"],
+        "NOME": ["A", "B", "C", "D"],
+        "STATUS": ["ATIVO"] * 4,
+        "ELEGIVEL": ["SIM"] * 4,
+    }, dtype=object)
+    return IndiceElegiveis(compactar(crm, ESQUEMA_CRM))
+
+
+def test_pontual_pronta_sem_enviados_hoje():
+    indice = _indice()
+    lista = pd.DataFrame({
+        "whatsapp": ["5585999990001", "5585999990002", "5585999990003", "5585999990004"],
+        "nome": ["A", "B", "C", "D"],
+    })
+    salvar_lista("sid", PONTUAL, lista, chave="ATIVO")
+
+    # envio depois da pré-geração, com outra máscara e o 8 dígitos sem o 9
+    indice.registrar_envios(["+55 (85) 99999-0002", "8599990003"])
+
+    df = carregar_lista("sid", PONTUAL, chave="ATIVO", indice=indice)
+    assert list(df["whatsapp"]) == ["5585999990001", "5585999990004"]
+    assert list(df.index) == [0, 1]
+
+
+def test_fixa_pronta_sem_enviado_fora_do_crm():
+    indice = _indice()
+    lista = pd.DataFrame({"WHATSAPP": ["5585999990001", "5511988887777"], "NOME": ["A", "Z"]})
+    salvar_lista("sid", FIXA, lista)
+
+    # fora do CRM: não tem linha para bloquear, mas ficou em enviados_hoje
+    indice.registrar_envios(["11 98888-7777"])
+
+    df = carregar_lista("sid", FIXA, indice=indice)
+    assert list(df["WHATSAPP"]) == ["5585999990001"]
+
+
+def test_sem_indice_serve_como_gravada():
+    indice = _indice()
+    salvar_lista("sid", FIXA, pd.DataFrame({"WHATSAPP": ["5585999990001"]}))
+    indice.registrar_envios(["5585999990001"])
+
+    assert carregar_lista("sid", FIXA, consumir=False, indice=indice).empty
+    assert list(carregar_lista("sid", FIXA)["WHATSAPP"]) == ["5585999990001"]
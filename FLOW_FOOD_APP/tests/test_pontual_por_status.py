@@ -0,0 +1,178 @@
+# tests/test_pontual_por_status.py
+"""
+Regressão do POR STATUS contra a versão linha a linha original
+(apply(_parse_date_any) + sort_values().head()):
+  - selecionar_do_indice (IndiceElegiveis.top_k_status): o caminho de produção
+  - selecionar_por_status: o mesmo filtro sem índice (mock_backend)
+  - _top_k
+
+A referência lê data ISO sem dayfirst: a original lia "2026-03-05" como
+3 de maio (correção de propósito, não regressão).
+
+Uso (de dentro de FLOW_FOOD_APP):
+    python -m pytest tests
+"""
+from __future__ import annotations
+
+import re
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.indice_elegiveis import IndiceElegiveis
+from src.services.pontual_backend import _top_k, selecionar_do_indice, selecionar_por_status
+from src.services.tipos import ESQUEMA_CRM, _parse_date_any, _parse_dates_series, compactar
+
+# data fixa (dias <= 12 no intervalo: pega a confusão ISO x dayfirst)
+HOJE = date(2026, 3, 15)
+
+
+# ==========================
+# REFERÊNCIA (lógica original, linha a linha)
+# ==========================
+def _digits_only(s) -> str:
+    return re.sub(r"\D", "", "" if s is None else str(s))
+
+
+def _parse_original(s):
+    # _parse_date_any original, só que ISO sem dayfirst
+    s = "" if s is None else str(s).strip()
+    if not s:
+        return None
+    dt = pd.to_datetime(s, errors="coerce", dayfirst=not re.match(r"\d{4}-", s))
+    return None if pd.isna(dt) else dt.date()
+
+
+def _por_status_original(df: pd.DataFrame, status_escolhido: str, total: int, campanha: str = "") -> pd.DataFrame:
+    df = df.copy()
+
+    df["__status"] = df["STATUS"].astype(str).str.strip()
+    df = df[df["__status"].str.upper() == status_escolhido.upper()].copy()
+
+    df["__prox_date"] = df["PROXIMO CONTATO PERMITIDO"].apply(_parse_original)
+    df = df[(df["__prox_date"].isna()) | (df["__prox_date"] <= HOJE)].copy()
+
+    df["__wpp"] = df["WHATSAPP"].apply(_digits_only)
+    df = df[df["__wpp"].astype(str).str.len() >= 10].copy()
+
+    df["__prio"] = pd.to_numeric(df["PRIORIDADE"], errors="coerce").fillna(0)
+    df["__dias"] = pd.to_numeric(df["DIAS DE INATIVIDADE"], errors="coerce").fillna(0)
+    df = df.sort_values(["__prio", "__dias"], ascending=[False, False])
+    df = df.head(int(total)).copy()
+
+    out = pd.DataFrame({
+        "whatsapp": df["__wpp"],
+        "nome": df["NOME"].astype(str).str.strip(),
+        "status": df["__status"],
+        "campanha": campanha,
+        "enviado": False,
+    })
+    return out.reset_index(drop=True)
+
+
+# ==========================
+# DADOS SINTÉTICOS
+# ==========================
+STATUS = ["ATIVO", "ativo ", "INATIVO", "SUMIDO_VIP"]
+
+
+def _telefone(rng: np.random.Generator) -> str:
+    # válidos nas duas regras (já no formato canônico, com ou sem máscara)
+    # ou curtos demais para as duas; nunca no meio-termo
+    ddd = f"{rng.integers(1, 10)}{rng.integers(1, 10)}"  # DDD sem zero
+    numero = f"55{ddd}9{rng.integers(10_000_000, 99_999_999)}"
+    tipo = rng.integers(0, 5)
+    if tipo == 0:
+        return f"+{numero[:2]} ({numero[2:4]}) {numero[4:9]}-{numero[9:]}"
+    if tipo == 1:
+        return numero[:rng.integers(0, 10)]  # vazio ou curto
+    return numero
+
+
+def _data(rng: np.random.Generator) -> str:
+    d = HOJE + timedelta(days=int(rng.integers(-20, 21)))
+    tipo = rng.integers(0, 6)
+    if tipo == 0:
+        return d.isoformat()
+    if tipo == 1:
+        return d.strftime("%d/%m/%Y")
+    if tipo == 2:
+        return f"{d.day}/{d.month}/{d.year}"  # sem zero à esquerda
+    if tipo == 3:
+        return ""
+    if tipo == 4:
+        return str(rng.choice(["abc", "32/13/2024", "  ", "-"]))
+    return HOJE.isoformat()  # hoje: pode (<= hoje)
+
+
+def _crm(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "WHATSAPP": [_telefone(rng) for _ in range(n)],
+        "NOME": [f" Cliente {i} " for i in range(n)],
+        "STATUS": rng.choice(STATUS, n),
+        # poucos valores distintos: muitos empates em prio e em (prio, dias)
+        "PRIORIDADE": rng.choice(["1", "2", "3", "", "x", "2.5"], n),
+        "DIAS DE INATIVIDADE": rng.choice(["10", "20", "", "30", "abc"], n),
+        "PROXIMO CONTATO PERMITIDO": [_data(rng) for _ in range(n)],
+    }, dtype=object)
+
+
+def _comparar(novo: pd.DataFrame, original: pd.DataFrame) -> None:
+    pd.testing.assert_frame_equal(
+        novo.astype(str).reset_index(drop=True),
+        original.astype(str).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+# ==========================
+# TESTES
+# ==========================
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("total", [0, 1, 7, 37, 10_000])
+@pytest.mark.parametrize("status", ["ATIVO", "inativo", "SUMIDO_VIP", "NAO_EXISTE"])
+def test_indice_igual_a_versao_original(seed, total, status):
+    df = _crm(400, seed)
+    indice = IndiceElegiveis(compactar(df, ESQUEMA_CRM))  # como vem do snapshot
+
+    novo = selecionar_do_indice(indice, status, total=total, campanha="C1", hoje=HOJE)
+    _comparar(novo, _por_status_original(df, status, total=total, campanha="C1"))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("total", [0, 7, 10_000])
+@pytest.mark.parametrize("status", ["ATIVO", "SUMIDO_VIP", "NAO_EXISTE"])
+def test_sem_indice_igual_a_versao_original(seed, total, status):
+    df = _crm(400, seed)
+    antes = df.copy()
+
+    novo = selecionar_por_status(df, status, total=total, campanha="C1", hoje=HOJE)
+    _comparar(novo, _por_status_original(df, status, total=total, campanha="C1"))
+    pd.testing.assert_frame_equal(df, antes)  # não altera o CRM de entrada
+
+
+def test_iso_com_dia_ate_12_nao_vira_dayfirst():
+    assert _parse_date_any("2026-11-05") == date(2026, 11, 5)
+    assert _parse_date_any("05/11/2026") == date(2026, 11, 5)
+    datas = _parse_dates_series(pd.Series(["2026-11-05", "05/11/2026", "5/11/2026"], dtype=object))
+    assert list(datas.dt.date) == [date(2026, 11, 5)] * 3
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("k", [0, 1, 5, 50, 500])
+def test_top_k_igual_sort_head(seed, k):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(0, 200))
+    prio = rng.integers(0, 4, n).astype(float)
+    dias = rng.integers(0, 3, n).astype(float)
+
+    esperado = (
+        pd.DataFrame({"prio": prio, "dias": dias})
+        .sort_values(["prio", "dias"], ascending=[False, False])
+        .head(k)
+        .index.to_numpy()
+    )
+    np.testing.assert_array_equal(_top_k(prio, dias, k), esperado)
@@ -0,0 +1,54 @@
+# tests/test_tipos.py
+"""
+compactar(): colunas do esquema saem com o tipo compacto, venha o texto
+como object (pandas 2) ou como StringDtype (padrão do pandas 3).
+
+Uso (de dentro de FLOW_FOOD_APP):
+    python -m pytest tests
+"""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from src.services.tipos import ESQUEMA_CRM, compactar
+
+
+def _crm(dtype) -> pd.DataFrame:
+    return pd.DataFrame({
+        "WHATSAPP": ["5585999990001", "(85) 99999-0002", ""],
+        "NOME": ["Ana", "Bia", "Caio"],
+        "STATUS": ["ATIVO", "INATIVO", "ATIVO"],
+        "ELEGIVEL": ["SIM", "NÃO", ""],
+        "CAMPANHA DO DIA": ["", "C1", ""],
+        "PRIORIDADE": ["1", "2", ""],
+        "TOTAL DE PEDIDOS": ["10", "", "3"],
+        "DIAS DE INATIVIDADE": ["5", "300", "40000"],
+        "PROXIMO CONTATO PERMITIDO": ["2026-03-05", "05/03/2026", ""],
+        "ULTIMO CONTATO": ["", "", "2026-01-02"],
+    }, dtype=dtype)
+
+
+@pytest.mark.parametrize("dtype", [object, "string", "str"])
+def test_compactar_converte_texto(dtype):
+    out = compactar(_crm(dtype), ESQUEMA_CRM)
+
+    assert isinstance(out["STATUS"].dtype, pd.CategoricalDtype)
+    assert isinstance(out["ELEGIVEL"].dtype, pd.CategoricalDtype)
+    assert isinstance(out["CAMPANHA DO DIA"].dtype, pd.CategoricalDtype)
+    assert out["WHATSAPP"].dtype == "Int64"
+    assert out["PRIORIDADE"].dtype == "Int8"
+    assert out["DIAS DE INATIVIDADE"].dtype == "Int32"
+    assert pd.api.types.is_datetime64_any_dtype(out["PROXIMO CONTATO PERMITIDO"])
+    assert pd.api.types.is_datetime64_any_dtype(out["ULTIMO CONTATO"])
+
+    assert out["WHATSAPP"].tolist()[:2] == [5585999990001, 5585999990002]
+    assert out["WHATSAPP"].isna().tolist()[2]
+    assert out["PROXIMO CONTATO PERMITIDO"].dt.day.tolist()[:2] == [5, 5]
+    assert out["NOME"].tolist() == ["Ana", "Bia", "Caio"]  # fora do esquema
+
+
+def test_compactar_nao_reconverte():
+    uma = compactar(_crm(object), ESQUEMA_CRM)
+    duas = compactar(uma, ESQUEMA_CRM)
+    pd.testing.assert_frame_equal(uma, duas)